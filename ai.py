@@ -0,0 +1,86 @@
+import time
+
+# Уровень детализации -> раз во сколько кадров обновляется монстр
+TIER_RATES = {'engaged': 1, 'nearby': 4, 'idle': 15}
+AI_BUDGET = 0.004  # секунд на обновление монстров за кадр (проверка и ход, включая поиск пути)
+
+
+class AIScheduler:
+    """
+    Распределяет обновления монстров по уровням детализации:
+    engaged (видят игрока или дерутся) - каждый кадр, nearby - реже, idle - совсем редко,
+    dead - никогда. Все обновления ограничены бюджетом времени на кадр: первыми идут монстры в бою,
+    внутри уровня - дольше всех ждавшие, поэтому не успевшие монстры обновляются первыми в следующих кадрах
+
+    Атрибуты
+    ------
+    frame : int
+        Номер текущего кадра
+    last_update : dict
+        Монстр -> кадр, в котором он последний раз обновлялся
+    counts : dict
+        Уровень -> количество монстров на нём в последнем кадре, 'deferred' - сколько монстров
+        не уложились в бюджет (для диагностики)
+    budget : float
+        Бюджет времени в секундах
+    slowdown : int
+        Во сколько раз реже обычного обновляются монстры вне боя (регулятор качества повышает его под нагрузкой)
+
+    Методы
+    ------
+    get_tier() :
+        Определяет уровень детализации монстра
+    run() :
+        Обновляет монстров, которым пора, и возвращает их список
+    """
+
+    def __init__(self, budget: float = AI_BUDGET) -> None:
+        self.frame = 0
+        self.last_update = dict()
+        self.counts = dict()
+        self.budget = budget
+        self.slowdown = 1
+
+    def get_tier(self, monster, player) -> str:
+        if monster.dead:
+            return 'dead'
+        dx, dy = abs(player.pos[0] - monster.pos[0]), abs(player.pos[1] - monster.pos[1])
+        if (monster.health <= 0 or monster.go_to_player or monster.do_slash or player.can_tp or
+                (dx <= monster.view_radius + monster.rect.w and dy <= monster.view_radius + monster.rect.h and
+                 monster.can_see(player))):
+            return 'engaged'
+        if dx <= monster.view_radius * 3 and dy <= monster.view_radius * 3:
+            return 'nearby'
+        return 'idle'
+
+    def run(self, monsters, player, update) -> list:
+        """
+        :param monsters: Все монстры уровня
+        :param player: Игрок
+        :param update: Функция обновления одного монстра
+        :returns: Монстры, обновлённые в этом кадре
+        """
+        self.frame += 1
+        self.counts = dict.fromkeys(('engaged', 'nearby', 'idle', 'dead', 'deferred'), 0)
+        due = []
+        for monster in monsters:
+            tier = self.get_tier(monster, player)
+            self.counts[tier] += 1
+            if tier == 'dead':
+                continue
+            rate = TIER_RATES[tier] if tier == 'engaged' else TIER_RATES[tier] * self.slowdown
+            last = self.last_update.get(monster, -rate)
+            if self.frame - last >= rate:
+                due.append((tier != 'engaged', last, monster))
+        due.sort(key=lambda entry: entry[:2])
+        updated = []
+        start_time = time.perf_counter()
+        for _, _, monster in due:
+            # Хотя бы один монстр обновляется в каждом кадре, даже если бюджет слишком мал
+            if updated and time.perf_counter() - start_time > self.budget:
+                break
+            update(monster)
+            self.last_update[monster] = self.frame
+            updated.append(monster)
+        self.counts['deferred'] = len(due) - len(updated)
+        return updated
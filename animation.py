@@ -0,0 +1,88 @@
+import pygame as pg
+
+
+class AnimationClock:
+    """
+    Единые часы анимаций. Продвигаются один раз за кадр, и все спрайты берут время отсюда
+    вместо собственных вызовов pg.time.get_ticks()
+
+    Атрибуты
+    ------
+    time : float
+        Игровое время в миллисекундах (не идёт на паузе, может быть ускорено или замедлено).
+        Дробная часть копится, чтобы при scale != 1 часы не отставали и не вставали
+    now : int
+        Игровое время в целых миллисекундах (свойство, его берут спрайты)
+    scale : float
+        Множитель скорости времени
+    paused : bool
+        Стоят ли часы
+    fixed_step : int | None
+        Если задан, часы за каждый кадр продвигаются ровно на столько миллисекунд
+        (для запусков без окна, где реальное время не важно)
+    flipped : dict
+        Кадр -> его отражённая копия, общая для всех спрайтов
+
+    Методы
+    ------
+    tick() :
+        Продвигает часы на один кадр
+    pause() :
+        Останавливает часы
+    resume() :
+        Запускает часы
+    frame_index() :
+        Номер кадра анимации для заданного начала и задержки
+    step() :
+        Одним проходом меняет кадры у всех спрайтов
+    get_flipped() :
+        Отражённая копия кадра
+    """
+
+    def __init__(self) -> None:
+        self.time = 0.0
+        self.scale = 1.0
+        self.paused = False
+        self.fixed_step = None
+        self.last_real = pg.time.get_ticks()
+        self.flipped = dict()
+
+    def tick(self) -> int:
+        real = pg.time.get_ticks()
+        delta = self.fixed_step if self.fixed_step is not None else real - self.last_real
+        self.last_real = real
+        if not self.paused:
+            self.time += delta * self.scale
+        return self.now
+
+    @property
+    def now(self) -> int:
+        return int(self.time)
+
+    def pause(self) -> None:
+        self.paused = True
+
+    def resume(self) -> None:
+        self.paused = False
+        self.last_real = pg.time.get_ticks()
+
+    def frame_index(self, start: int, delay: int, frames: int = 4) -> int:
+        return (self.now - start) // delay % frames
+
+    def step(self, sprites, freeze_decor: bool = False) -> None:
+        # Одинаковые декорации (общее начало и задержка) получают один и тот же номер кадра
+        phases = dict()
+        for sprite in sprites:
+            if sprite.do_animation and not (freeze_decor and sprite.decorative):
+                key = sprite.anim_start, sprite.animation_delay
+                index = phases.get(key)
+                if index is None:
+                    index = phases[key] = self.frame_index(*key)
+                if index != sprite.current_image:
+                    sprite.set_frame(index)
+
+    def get_flipped(self, frame: pg.Surface) -> pg.Surface:
+        image = self.flipped.get(frame)
+        if image is None:
+            image = self.flipped[frame] = pg.transform.flip(frame, flip_x=True, flip_y=False)
+        return image
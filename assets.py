@@ -0,0 +1,236 @@
+"""
+Запечённые ресурсы: атласы спрайтов по семействам и кэш раскодированного звука.
+Запекание: python assets.py (при запуске игры устаревшие паки пересобираются сами)
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import pygame as pg
+from constants import *
+
+# Семейство -> (папка с картинками, размер, к которому приводятся кадры или None)
+FAMILIES = {
+    'torches': (TORCHES_DIR, None),
+    'coins': (COINS_DIR, None),
+    'flasks': (FLASKS_DIR, None),
+    'chests': (CHESTS_DIR, None),
+    'keys': (KEYS_DIR, None),
+    'flags': (FLAG_DIR, None),
+    'items': (ITEMS_DIR, None),
+    'players': (PLAYERS_DIR, None),
+    'monsters': (MONSTERS_DIR, None),
+    'slashes': (SLASH_DIR, (32, 32)),
+    'interface': (INTERFACE_DIR, None),
+}
+MAX_PACKED = 256  # картинки крупнее остаются отдельными файлами
+ATLAS_WIDTH = 1024
+SOUND_FILES = [f'{MUSIC_DIR}/{file}' for file in sorted(os.listdir(MUSIC_DIR))]
+
+atlases = dict()  # семейство -> Surface атласа
+frames = dict()  # нормализованный путь -> (семейство, Rect)
+surfaces = dict()  # путь -> готовая картинка
+sounds = dict()  # путь -> (смещение, длина) в кэше PCM
+pcm_cache: mmap.mmap | None = None
+
+
+def list_family(directory: str) -> list[str]:
+    """
+    Все png семейства, отсортированные по пути.
+    :param directory: Папка семейства
+    :returns: Список путей
+    """
+
+    found = []
+    for root, _, files in os.walk(directory):
+        found.extend(os.path.join(root, file) for file in files if file.endswith('.png'))
+    return sorted(found)
+
+
+def content_hash(files: list[str], extra: str = '') -> str:
+    """
+    Хэш содержимого исходных файлов: меняется при любой правке, добавлении или удалении файла.
+    :param files: Исходные файлы
+    :param extra: Дополнительные параметры запекания
+    :returns: sha1 в шестнадцатеричном виде
+    """
+
+    digest = hashlib.sha1(extra.encode())
+    for file in files:
+        digest.update(file.encode())
+        with open(file, 'rb') as source:
+            digest.update(source.read())
+    return digest.hexdigest()
+
+
+def files_stamp(files: list[str], extra: str = '') -> str:
+    """
+    Дешёвая метка исходников по времени изменения и размеру (без чтения файлов).
+    :param files: Исходные файлы
+    :param extra: Дополнительные параметры запекания
+    :returns: sha1 в шестнадцатеричном виде
+    """
+
+    digest = hashlib.sha1(extra.encode())
+    for file in files:
+        stat = os.stat(file)
+        digest.update(f'{file}:{stat.st_mtime_ns}:{stat.st_size}'.encode())
+    return digest.hexdigest()
+
+
+def read_index(path: str) -> dict:
+    try:
+        with open(path, encoding='utf8') as index_file:
+            return json.load(index_file)
+    except (OSError, ValueError):
+        return dict()
+
+
+def write_index(path: str, index: dict) -> None:
+    # Пишем во временный файл и подменяем, чтобы прерванное запекание не оставило битый индекс
+    with open(path + '.tmp', 'w', encoding='utf8') as index_file:
+        json.dump(index, index_file)
+    os.replace(path + '.tmp', path)
+
+
+def bake_family(family: str) -> dict:
+    """
+    Упаковывает кадры семейства в один атлас (укладка полками по высоте).
+    :param family: Название семейства из FAMILIES
+    :returns: Запись индекса: хэш исходников и прямоугольники кадров
+    """
+
+    directory, size = FAMILIES[family]
+    files = list_family(directory)
+    images = dict()
+    for file in files:
+        image = pg.image.load(file)
+        if size is not None:
+            image = pg.transform.scale(image, size)
+        if max(image.get_size()) <= MAX_PACKED:
+            images[file] = image
+    rects = dict()
+    x = y = shelf = 0
+    for file in sorted(images, key=lambda name: (-images[name].get_height(), name)):
+        w, h = images[file].get_size()
+        if x + w > ATLAS_WIDTH:
+            x, y, shelf = 0, y + shelf, 0
+        rects[file] = [x, y, w, h]
+        x += w
+        shelf = max(shelf, h)
+    atlas = pg.Surface((ATLAS_WIDTH, max(y + shelf, 1)), pg.SRCALPHA)
+    for file, rect in rects.items():
+        atlas.blit(images[file], rect[:2])
+    pg.image.save(atlas, f'{ATLAS_DIR}/{family}.png')
+    return {'hash': content_hash(files, str(size)), 'stamp': files_stamp(files, str(size)),
+            'frames': {os.path.normpath(file): rect for file, rect in rects.items()}}
+
+
+def bake_sounds() -> dict:
+    """
+    Раскодирует все звуки в один файл сырого PCM в формате текущего микшера.
+    :returns: Запись индекса: хэш, формат микшера и смещения звуков
+    """
+
+    offsets = dict()
+    offset = 0
+    with open(f'{ATLAS_DIR}/sounds.pcm.tmp', 'wb') as pcm:
+        for file in SOUND_FILES:
+            raw = pg.mixer.Sound(file).get_raw()
+            pcm.write(raw)
+            offsets[file] = [offset, len(raw)]
+            offset += len(raw)
+    os.replace(f'{ATLAS_DIR}/sounds.pcm.tmp', f'{ATLAS_DIR}/sounds.pcm')
+    extra = str(pg.mixer.get_init())
+    return {'hash': content_hash(SOUND_FILES, extra), 'stamp': files_stamp(SOUND_FILES, extra), 'offsets': offsets}
+
+
+def load_packs(rebuild: bool = False) -> None:
+    """
+    Проверяет паки (по времени и размеру исходников, а при их изменении - по хэшу содержимого),
+    пересобирает устаревшие и подключает их.
+    Должна вызываться после pg.init()
+    :param rebuild: Пересобрать всё независимо от хэшей
+    :returns: None
+    """
+
+    global pcm_cache
+    os.makedirs(ATLAS_DIR, exist_ok=True)
+    index = read_index(f'{ATLAS_DIR}/index.json')
+    changed = False
+    for family, (directory, size) in FAMILIES.items():
+        files = list_family(directory)
+        entry = index.get(family)
+        # Хэш содержимого считается, только если у исходников изменились время или размер
+        stamp = files_stamp(files, str(size))
+        if (rebuild or entry is None or not os.path.exists(f'{ATLAS_DIR}/{family}.png') or
+                entry.get('stamp') != stamp and entry['hash'] != content_hash(files, str(size))):
+            index[family] = bake_family(family)
+            changed = True
+        elif entry.get('stamp') != stamp:
+            # Файлы переписаны без изменений (например, скопированы заново) - обновляется только метка
+            entry['stamp'] = stamp
+            changed = True
+        for file, rect in index[family]['frames'].items():
+            frames[file] = family, pg.Rect(rect)
+    if pg.mixer.get_init():
+        entry = index.get('sounds')
+        extra = str(pg.mixer.get_init())
+        stamp = files_stamp(SOUND_FILES, extra)
+        if (rebuild or entry is None or not os.path.exists(f'{ATLAS_DIR}/sounds.pcm') or
+                entry.get('stamp') != stamp and entry['hash'] != content_hash(SOUND_FILES, extra)):
+            index['sounds'] = bake_sounds()
+            changed = True
+        elif entry.get('stamp') != stamp:
+            entry['stamp'] = stamp
+            changed = True
+        sounds.update({file: tuple(offset) for file, offset in index['sounds']['offsets'].items()})
+        with open(f'{ATLAS_DIR}/sounds.pcm', 'rb') as pcm:
+            pcm_cache = mmap.mmap(pcm.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(pcm.name) else None
+    if changed:
+        write_index(f'{ATLAS_DIR}/index.json', index)
+    atlases.clear()
+    surfaces.clear()
+
+
+def load_image(path: str) -> pg.Surface:
+    """
+    Картинка из атласа (или с диска, если её нет в паках).
+    Возвращаемую поверхность нельзя изменять: она общая для всех, кто её загрузил
+    :param path: Путь к исходному png
+    :returns: Surface
+    """
+
+    image = surfaces.get(path)
+    if image is None:
+        frame = frames.get(os.path.normpath(path))
+        if frame is None:
+            image = pg.image.load(path)
+        else:
+            family, rect = frame
+            if family not in atlases:
+                atlas = pg.image.load(f'{ATLAS_DIR}/{family}.png')
+                atlases[family] = atlas.convert_alpha() if pg.display.get_surface() is not None else atlas
+            image = atlases[family].subsurface(rect)
+        surfaces[path] = image
+    return image
+
+
+def load_sound(path: str) -> pg.mixer.Sound:
+    """
+    Звук из кэша PCM (или раскодированный из файла, если его нет в кэше).
+    :param path: Путь к звуковому файлу
+    :returns: Sound
+    """
+
+    if pcm_cache is not None and path in sounds:
+        offset, length = sounds[path]
+        return pg.mixer.Sound(buffer=memoryview(pcm_cache)[offset:offset + length])
+    return pg.mixer.Sound(path)
+
+
+if __name__ == '__main__':
+    pg.init()
+    load_packs(rebuild=True)
+    print(f'{len(frames)} frames in {len(FAMILIES)} atlases, {len(sounds)} sounds -> {ATLAS_DIR}')
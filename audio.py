@@ -0,0 +1,151 @@
+import pygame as pg
+
+# Категория -> количество закреплённых за ней каналов микшера
+CATEGORIES = {
+    'music': 2,
+    'combat': 6,
+    'pickup': 2,
+    'interface': 3,
+}
+
+
+class SoundDispatcher:
+    """
+    Раздаёт каналы микшера звукам, чтобы нагрузка на микшер не зависела от количества дерущихся монстров
+
+    Атрибуты
+    ------
+    groups : dict
+        Категория -> список закреплённых за ней каналов
+    playing : dict
+        Канал -> (звук, приоритет, тик начала)
+    last_play : dict
+        Звук -> тик последнего запуска
+
+    Методы
+    ------
+    register() :
+        Оборачивает звук в DispatchedSound с параметрами категории
+    play() :
+        Запускает звук на канале его категории с учётом лимитов
+    """
+
+    def __init__(self) -> None:
+        total = sum(CATEGORIES.values())
+        pg.mixer.set_num_channels(total)
+        # Закреплённые каналы не достаются Sound.play() в обход диспетчера
+        pg.mixer.set_reserved(total)
+        self.groups = dict()
+        first = 0
+        for category, count in CATEGORIES.items():
+            self.groups[category] = [pg.mixer.Channel(j) for j in range(first, first + count)]
+            first += count
+        self.playing = dict()
+        self.last_play = dict()
+
+    def register(self, sound: pg.mixer.Sound, category: str, max_voices: int = 1,
+                 min_interval: int = 0, priority: int = 1) -> 'DispatchedSound':
+        return DispatchedSound(self, sound, category, max_voices, min_interval, priority)
+
+    def play(self, voice: 'DispatchedSound', loops: int = 0) -> pg.mixer.Channel | None:
+        tick = pg.time.get_ticks()
+        last = self.last_play.get(voice.sound)
+        if last is not None and tick - last < voice.min_interval:
+            return None
+        group = self.groups[voice.category]
+        busy = [channel for channel in group if channel.get_busy()]
+        same = [channel for channel in busy if self.playing.get(channel, (None,))[0] is voice.sound]
+        if len(same) >= voice.max_voices:
+            # Лимит голосов: перезапускаем самый старый голос этого же звука
+            channel = min(same, key=lambda ch: self.playing[ch][2])
+        else:
+            free = [channel for channel in group if not channel.get_busy()]
+            if free:
+                channel = free[0]
+            else:
+                candidates = [channel for channel in busy
+                              if self.playing.get(channel, (None, 0))[1] <= voice.priority]
+                if not candidates:
+                    return None
+                channel = min(candidates, key=lambda ch: (self.playing[ch][1], self.playing[ch][2]))
+        channel.play(voice.sound, loops=loops)
+        self.playing[channel] = voice.sound, voice.priority, tick
+        self.last_play[voice.sound] = tick
+        return channel
+
+
+class DispatchedSound:
+    """
+    Звук, который проигрывается через SoundDispatcher.
+    Повторяет нужную игре часть интерфейса Sound (play, stop, set_volume, get_raw)
+
+    Атрибуты
+    ------
+    sound : Sound
+        Сам звук
+    category : str
+        Категория каналов из CATEGORIES
+    max_voices : int
+        Сколько копий звука может звучать одновременно
+    min_interval : int
+        Минимальное количество миллисекунд между запусками
+    priority : int
+        Приоритет при вытеснении чужих звуков (больше - важнее)
+    """
+
+    def __init__(self, dispatcher: SoundDispatcher, sound: pg.mixer.Sound, category: str,
+                 max_voices: int, min_interval: int, priority: int) -> None:
+        self.dispatcher = dispatcher
+        self.sound = sound
+        self.category = category
+        self.max_voices = max_voices
+        self.min_interval = min_interval
+        self.priority = priority
+
+    def play(self, loops: int = 0) -> pg.mixer.Channel | None:
+        return self.dispatcher.play(self, loops)
+
+    def stop(self) -> None:
+        self.sound.stop()
+
+    def set_volume(self, value: float) -> None:
+        self.sound.set_volume(value)
+
+    def get_raw(self) -> bytes:
+        return self.sound.get_raw()
+
+
+class SilentSound:
+    """
+    Звук, который ничего не делает (когда игра запущена без звука)
+    """
+
+    def play(self, loops: int = 0) -> None:
+        return None
+
+    def stop(self) -> None:
+        pass
+
+    def set_volume(self, value: float) -> None:
+        pass
+
+    def get_raw(self) -> bytes:
+        return b''
+
+
+class SilentMusic:
+    """
+    Замена Music для запуска без звука: микшер не запускается, файлы звуков не загружаются,
+    а любой звук игры (all_music.<имя>) - SilentSound
+    """
+
+    list_music = []
+
+    def __getattr__(self, name: str) -> SilentSound:
+        return SILENT
+
+    def change_all_volumes(self) -> None:
+        pass
+
+
+SILENT = SilentSound()
@@ -0,0 +1,40 @@
+"""
+Прохождение уровней ботом без окна: доходит ли бот до экрана финиша и за сколько кадров.
+Запуск из корня проекта: python -m benchmarks.bench_bot [кадров] [уровень ...]
+Каждый уровень играется в отдельном процессе (python bot.py уровень --headless --frames N),
+исходы берутся из журнала забегов (logs/runs.jsonl)
+"""
+
+import os
+import subprocess
+import sys
+import time
+from constants import TELEMETRY_LOG
+from telemetry import read_log
+
+LEVELS = ['level1', 'level2', 'level3', 'level4', 'level5']
+
+
+def run(frames: int = 6000, *levels: str) -> None:
+    print(f'{"level":<8}{"outcome":>10}{"frames":>8}{"killed":>8}{"hp lost":>9}{"time, s":>9}')
+    finished = 0
+    for lvl in levels or LEVELS:
+        known = len(read_log(TELEMETRY_LOG)) if os.path.exists(TELEMETRY_LOG) else 0
+        start_time = time.perf_counter()
+        subprocess.run([sys.executable, 'bot.py', lvl, '--headless', '--frames', str(frames)],
+                       env=dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT='1'), stdout=subprocess.DEVNULL, check=True)
+        elapsed = time.perf_counter() - start_time
+        # После финиша бот идёт на следующие уровни, важен только первый забег
+        runs = [record for record in read_log(TELEMETRY_LOG)[known:] if record['level'] == lvl]
+        if not runs:
+            print(f'{lvl:<8}{"-":>10}')
+            continue
+        record = runs[0]
+        finished += record['outcome'] == 'finished'
+        print(f'{lvl:<8}{record["outcome"]:>10}{record["frames"]:>8}{record.get("killed", 0):>8}'
+              f'{record.get("hp_lost", 0):>9}{elapsed:>9.1f}')
+    print(f'finished {finished} of {len(levels or LEVELS)}')
+
+
+if __name__ == '__main__':
+    run(*[int(arg) if arg.isdigit() else arg for arg in sys.argv[1:]])
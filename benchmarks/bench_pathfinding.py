@@ -0,0 +1,75 @@
+"""
+Сравнение иерархического поиска пути с прежним поиском в ширину на всех уровнях.
+Запуск из корня проекта: python -m benchmarks.bench_pathfinding
+"""
+
+import random
+import sys
+import time
+from pathfinding import HierarchicalPathfinder, bfs_path_step, build_flow_field, load_walkable, INF, NEIGHBOURS
+
+LEVELS = ['level1', 'level2', 'level3', 'level4', 'level5']
+
+
+def run(queries: int = 200, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    print(f'{"level":<8}{"build, ms":>11}{"bfs, ms":>10}{"hpa, ms":>10}{"speedup":>9}{"path ratio":>12}'
+          f'{"wall starts":>13}{"best step":>11}')
+    for lvl in LEVELS:
+        walkable = load_walkable(lvl, lvl + '.tmx')
+        free = [(x, y) for y, row in enumerate(walkable) for x, cell in enumerate(row) if cell]
+        pairs = [(rng.choice(free), rng.choice(free)) for _ in range(queries)]
+
+        start_time = time.perf_counter()
+        pathfinder = HierarchicalPathfinder(walkable)
+        build_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        for start, target in pairs:
+            bfs_path_step(walkable, start, target)
+        bfs_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        for start, target in pairs:
+            pathfinder.paths.clear()
+            pathfinder.find_path_step(start, target)
+        hpa_time = time.perf_counter() - start_time
+
+        # Проверка: шаг ведёт к цели, путь не сильно длиннее кратчайшего
+        optimal, found = 0, 0
+        for start, target in pairs:
+            field = build_flow_field(walkable, target)
+            step = pathfinder.find_path_step(start, target)
+            if field[start[1]][start[0]] in (0, INF):
+                assert step == start, (lvl, start, target)
+                continue
+            assert abs(step[0] - start[0]) + abs(step[1] - start[1]) == 1, (lvl, start, target)
+            optimal += field[start[1]][start[0]]
+            found += len(pathfinder.find_path(start, target)) - 1
+
+        # Старт в стене (угол объекта): шаг в свободную соседнюю клетку, ближайшую к цели по BFS.
+        # Считаются только старты, из которых цель достижима
+        walls = [(x, y) for y, row in enumerate(walkable) for x, cell in enumerate(row)
+                 if not cell and any(pathfinder.is_free((x + dx, y + dy)) for dx, dy in NEIGHBOURS)]
+        reachable, best = 0, 0
+        for _ in range(queries):
+            start, target = rng.choice(walls), rng.choice(free)
+            field = build_flow_field(walkable, target)
+            distances = [field[start[1] + dy][start[0] + dx] for dx, dy in NEIGHBOURS
+                         if pathfinder.is_free((start[0] + dx, start[1] + dy))]
+            pathfinder.paths.clear()
+            step = pathfinder.find_path_step(start, target)
+            if min(distances) == INF:
+                assert step == start, (lvl, start, target)
+                continue
+            reachable += 1
+            best += field[step[1]][step[0]] == min(distances)
+            # Повторный запрос берётся из кэша
+            assert target in pathfinder.paths and pathfinder.find_path_step(start, target) == step, (lvl, start)
+        print(f'{lvl:<8}{build_time * 1000:>11.2f}{bfs_time * 1000 / queries:>10.3f}'
+              f'{hpa_time * 1000 / queries:>10.3f}{bfs_time / hpa_time:>9.1f}{found / max(optimal, 1):>12.3f}'
+              f'{reachable:>13}{best / max(reachable, 1):>11.3f}')
+
+
+if __name__ == '__main__':
+    run(*map(int, sys.argv[1:]))
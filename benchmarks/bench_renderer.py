@@ -0,0 +1,55 @@
+"""
+Сравнение времени кадра программного и текстурного бэкендов на сцене уровня
+(карта, все анимированные спрайты, инвентарь).
+Запуск из корня проекта: python -m benchmarks.bench_renderer [кадров] [уровень]
+Каждый бэкенд меряется в отдельном процессе, т.к. у pygame может быть только одно окно
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+BACKENDS = ['surface', 'texture']
+
+
+def measure(name: str, frames: int, lvl: str) -> None:
+    import pygame as pg
+    import main
+    pg.init()
+    main.load_packs()
+    main.WIDTH, main.HEIGHT = 800, 640
+    main.backend = main.create_backend(name, (main.WIDTH, main.HEIGHT), "Devil's Massacre")
+    main.screen = main.backend.screen
+    main.castle = main.Castle(lvl, lvl + '.tmx')
+    main.add_items()
+    main.player = main.Player(2 * main.SPRITE_SIZE, 2 * main.SPRITE_SIZE, 'priest3_v2')
+    times = []
+    for _ in range(frames):
+        start_time = time.perf_counter()
+        pg.event.pump()
+        main.castle.render()
+        main.animation_clock.step(main.animated_sprites)
+        for sprite in main.animated_sprites:
+            sprite.draw()
+        main.backend.flush_sprites()
+        main.player.inventory.draw()
+        main.backend.present()
+        times.append(time.perf_counter() - start_time)
+    times.sort()
+    print(f'{name:<10}{sum(times) / frames * 1000:>10.3f}{times[frames // 2] * 1000:>10.3f}'
+          f'{times[int(frames * 0.95)] * 1000:>10.3f}')
+
+
+def run(frames: int = 600, lvl: str = 'level1') -> None:
+    print(f'{"backend":<10}{"mean, ms":>10}{"p50, ms":>10}{"p95, ms":>10}')
+    for name in BACKENDS:
+        subprocess.run([sys.executable, '-m', 'benchmarks.bench_renderer', '--measure', name, str(frames), lvl],
+                       env=dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT='1'), check=True)
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--measure']:
+        measure(sys.argv[2], int(sys.argv[3]), sys.argv[4])
+    else:
+        run(*[int(arg) if arg.isdigit() else arg for arg in sys.argv[1:]])
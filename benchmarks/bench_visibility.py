@@ -0,0 +1,69 @@
+"""
+Сколько поисков пути экономит прямая видимость: для каждого монстра уровня и каждой свободной клетки игрока
+сравнивается прежняя проверка (квадрат обзора) с проверкой видимости, и замеряется,
+сколько стоили бы лишние поиски пути.
+Запуск из корня проекта: python -m benchmarks.bench_visibility
+"""
+
+import json
+import sys
+import time
+from constants import SPRITE_SIZE
+from pathfinding import HierarchicalPathfinder, load_walkable
+from visibility import VisibilityMap
+
+LEVELS = ['level1', 'level2', 'level3', 'level4', 'level5']
+MONSTERS = ['skulls', 'skeleton1', 'vampire']
+VIEW_RADIUS = 100  # Monster.view_radius
+
+
+def run(path_samples: int = 300) -> None:
+    print(f'{"level":<8}{"in box":>8}{"visible":>9}{"saved":>8}{"build, ms":>11}{"query, us":>11}'
+          f'{"path, ms":>10}{"saved, ms":>11}')
+    for lvl in LEVELS:
+        walkable = load_walkable(lvl, lvl + '.tmx')
+        with open(f'maps/{lvl}/elements_pos.json', encoding='utf8') as jsonf:
+            elements = json.load(jsonf)
+        monsters = [tuple(pos) for kind in MONSTERS for pos in elements.get(kind, [])]
+        free = [(x, y) for y, row in enumerate(walkable) for x, cell in enumerate(row) if cell]
+
+        start_time = time.perf_counter()
+        visibility = VisibilityMap(walkable)
+        visibility.precompute()
+        build_time = time.perf_counter() - start_time
+
+        # Пары, в которых монстр пошёл бы к игроку (дальше соседней клетки - иначе он бьёт, а не ищет путь)
+        in_box, visible, queries = [], 0, 0
+        start_time = time.perf_counter()
+        for monster in monsters:
+            for cell in free:
+                if (abs(cell[0] - monster[0]) * SPRITE_SIZE <= VIEW_RADIUS and
+                        abs(cell[1] - monster[1]) * SPRITE_SIZE <= VIEW_RADIUS and
+                        max(abs(cell[0] - monster[0]), abs(cell[1] - monster[1])) >= 2):
+                    queries += 1
+                    if visibility.sees(monster, cell):
+                        visible += 1
+                    else:
+                        in_box.append((monster, cell))
+        query_time = time.perf_counter() - start_time
+        blocked = len(in_box)
+        total = visible + blocked
+
+        # Цена одного поиска пути, который делал бы монстр, заметивший игрока сквозь стену
+        pathfinder = HierarchicalPathfinder(walkable)
+        sample = in_box[::max(1, blocked // path_samples)][:path_samples]
+        start_time = time.perf_counter()
+        for monster, cell in sample:
+            pathfinder.paths.clear()
+            pathfinder.find_path_step(monster, cell)
+        path_time = (time.perf_counter() - start_time) / max(len(sample), 1)
+        print(f'{lvl:<8}{total:>8}{visible:>9}{blocked / max(total, 1):>8.0%}{build_time * 1000:>11.1f}'
+              f'{query_time * 1e6 / max(queries, 1):>11.2f}{path_time * 1000:>10.3f}'
+              f'{blocked * path_time * 1000:>11.1f}')
+    print('in box - пары (монстр, клетка игрока), где прежняя проверка запускала погоню; '
+          'saved - доля тех, где игрок за стеной;\n'
+          'saved, ms - суммарная цена поисков пути, которые больше не делаются (по одному на пару)')
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 300)
@@ -0,0 +1,136 @@
+"""
+Текст из заранее растеризованных символов: для каждого шрифта и размера символы один раз рисуются
+в атлас, а строки собираются копированием символов из него (без кернинга). Строки с символами не из атласа
+(например, кириллица) рисуются шрифтом целиком. Готовые строки тоже кэшируются,
+поэтому подписи кнопок и заголовки не растеризуются заново каждый кадр
+"""
+
+from collections import OrderedDict
+import pygame as pg
+from constants import *
+
+FONT_PATH = INTERFACE_DIR + '/EpilepsySans.ttf'
+ATLAS_CHARS = ''.join(chr(code) for code in range(32, 127))  # печатные символы ASCII
+MAX_STRINGS = 512  # сколько готовых строк хранится (редко нужные вытесняются)
+
+
+class GlyphAtlas:
+    """
+    Символы одного шрифта одного размера, нарисованные белым в одну картинку
+
+    Атрибуты
+    ------
+    font : Font
+        Шрифт (нужен для строк с символами не из атласа)
+    height : int
+        Высота строки: наибольшая из высоты строки шрифта и высот символов (некоторые символы выше строки)
+    image : Surface
+        Атлас (белые символы с попиксельной прозрачностью)
+    glyphs : dict
+        Символ -> Rect символа в атласе
+    colored : dict
+        Цвет -> копия атласа, окрашенная в этот цвет
+
+    Методы
+    ------
+    covers() :
+        Есть ли в атласе все символы строки
+    glyph() :
+        Картинка и Rect символа нужного цвета
+    """
+
+    def __init__(self, path: str | None, size: int) -> None:
+        """
+        :param path: Путь к файлу шрифта (None - шрифт pygame по умолчанию)
+        :param size: Размер шрифта
+        """
+
+        self.font = pg.font.Font(path, size)
+        rendered = [self.font.render(char, True, pg.Color('white')) for char in ATLAS_CHARS]
+        self.height = max(self.font.get_linesize(), *(image.get_height() for image in rendered))
+        self.image = pg.Surface((sum(image.get_width() for image in rendered), self.height), pg.SRCALPHA)
+        self.glyphs = dict()
+        self.colored = dict()
+        x = 0
+        for char, image in zip(ATLAS_CHARS, rendered):
+            self.image.blit(image, (x, 0))
+            self.glyphs[char] = pg.Rect(x, 0, image.get_width(), image.get_height())
+            x += image.get_width()
+
+    def covers(self, text: str) -> bool:
+        return all(char in self.glyphs for char in text)
+
+    def glyph(self, char: str, color: pg.Color) -> tuple[pg.Surface, pg.Rect]:
+        key = tuple(color)
+        image = self.colored.get(key)
+        if image is None:
+            image = self.colored[key] = self.image.copy()
+            image.fill(color, special_flags=pg.BLEND_RGBA_MULT)
+        return image, self.glyphs[char]
+
+
+class TextRenderer:
+    """
+    Отрисовка строк из атласов символов с кэшем готовых строк
+
+    Атрибуты
+    ------
+    atlases : dict
+        (путь к шрифту, размер) -> GlyphAtlas (создаётся при первом использовании)
+    strings : OrderedDict
+        (строка, путь, размер, цвет) -> готовая картинка строки
+
+    Методы
+    ------
+    atlas() :
+        Атлас шрифта нужного размера
+    render() :
+        Картинка строки (её нельзя изменять: она общая для всех вызовов)
+    draw() :
+        Рисует строку на картинке
+    """
+
+    def __init__(self) -> None:
+        self.atlases = dict()
+        self.strings = OrderedDict()
+
+    def atlas(self, size: int, path: str | None = FONT_PATH) -> GlyphAtlas:
+        atlas = self.atlases.get((path, size))
+        if atlas is None:
+            atlas = self.atlases[(path, size)] = GlyphAtlas(path, size)
+        return atlas
+
+    def render(self, text: str, size: int, color=pg.Color('white'), path: str | None = FONT_PATH) -> pg.Surface:
+        """
+        :param text: Строка
+        :param size: Размер шрифта
+        :param color: Цвет
+        :param path: Путь к файлу шрифта (None - шрифт pygame по умолчанию)
+        :returns: Картинка строки с прозрачным фоном
+        """
+
+        color = pg.Color(color)
+        key = text, path, size, tuple(color)
+        image = self.strings.get(key)
+        if image is not None:
+            self.strings.move_to_end(key)
+            return image
+        atlas = self.atlas(size, path)
+        if atlas.covers(text):
+            glyphs = [atlas.glyph(char, color) for char in text]
+            image = pg.Surface((sum(area.w for _, area in glyphs), atlas.height), pg.SRCALPHA)
+            x = 0
+            for source, area in glyphs:
+                image.blit(source, (x, 0), area)
+                x += area.w
+        else:
+            # Символов нет в атласе (кириллица и т.п.): строка рисуется шрифтом целиком, с кернингом
+            image = atlas.font.render(text, True, color)
+        self.strings[key] = image
+        if len(self.strings) > MAX_STRINGS:
+            self.strings.popitem(last=False)
+        return image
+
+    def draw(self, target: pg.Surface, text: str, size: int, pos: tuple[int, int], color=pg.Color('white'),
+             path: str | None = FONT_PATH) -> pg.Rect:
+        return target.blit(self.render(text, size, color, path), pos)
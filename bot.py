@@ -0,0 +1,213 @@
+"""
+Бот, проходящий уровни сам: бьёт монстров, открывает сундуки, собирает предметы и ключ
+и выходит через дверь. Нужен как долгая реалистичная нагрузка для проверки скорости и памяти.
+Запуск: python bot.py [уровень] [--headless] [--frames N] [--profile]
+"""
+
+import argparse
+import os
+import pygame as pg
+from constants import *
+
+ADJACENT = 2  # в клетках: монстры вплотную (их бот бьёт даже по дороге к выходу)
+LOW_HEALTH = 3  # при таком здоровье бот пьёт лечащий пузырёк
+STUCK_FRAMES = 180  # кадров без приближения к цели, после которых цель пропускается
+MENU_DELAY = 90  # кадров ожидания на экранах финиша и смерти
+
+
+def get_cell(sprite) -> tuple[int, int]:
+    return int((sprite.pos[0] + SPRITE_SIZE // 2) // SPRITE_SIZE), int((sprite.pos[1] + SPRITE_SIZE // 2) // SPRITE_SIZE)
+
+
+def distance(a: tuple[int, int], b: tuple[int, int]) -> int:
+    return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+
+def is_walkable(walkable: list[list[bool]], cell: tuple[int, int]) -> bool:
+    x, y = cell
+    return 0 <= y < len(walkable) and 0 <= x < len(walkable[0]) and walkable[y][x]
+
+
+class Bot:
+    """
+    Управление игроком вместо клавиатуры и мыши. Каждый кадр выбирает цель
+    (монстр вплотную; с ключом - сразу выход; без него лечащий пузырёк при малом здоровье,
+    ближайший монстр рядом, ключ и лечащие пузырьки, остальные предметы и сундуки, оставшиеся монстры) и клетку, к которой идти. Удары наносит режим auto
+
+    Атрибуты
+    ------
+    frame : int
+        Количество кадров уровня, сыгранных ботом
+    max_frames : int | None
+        Через сколько кадров закончить игру (None - играть бесконечно)
+    target : tuple | None
+        Текущая цель: (объект или 'exit', клетка)
+    progress : dict
+        Цель -> (самое близкое расстояние до неё, кадр, когда бот последний раз к ней приблизился)
+    ignored : set
+        Цели, до которых бот не смог дойти
+    menu_frames : int
+        Сколько кадров бот ждёт на экране меню
+
+    Методы
+    ------
+    finished() :
+        Пора ли заканчивать игру
+    reset() :
+        Сбрасывает цели при запуске уровня
+    choose_target() :
+        Выбирает цель
+    step() :
+        Решение бота на кадр: куда идти и какие действия выполнить
+    use_flask() :
+        Действия, чтобы выпить пузырёк из инвентаря
+    menu_click() :
+        Нажатие кнопки на экране меню после небольшой паузы
+    """
+
+    def __init__(self, max_frames: int | None = None) -> None:
+        self.frame = 0
+        self.max_frames = max_frames
+        self.target = None
+        self.progress = dict()
+        self.ignored = set()
+        self.menu_frames = 0
+
+    def finished(self) -> bool:
+        return self.max_frames is not None and self.frame >= self.max_frames
+
+    def reset(self) -> None:
+        self.target = None
+        self.progress.clear()
+        self.ignored.clear()
+
+    def choose_target(self, player, enemies, items, chests, exit_cells: list[tuple[int, int]]) -> tuple | None:
+        """
+        :param player: Игрок
+        :param enemies: Монстры
+        :param items: Предметы, которые можно подобрать
+        :param chests: Сундуки
+        :param exit_cells: Клетки выхода
+        :returns: Цель (объект или 'exit', клетка) или None
+        """
+
+        cell = get_cell(player)
+        alive = [enemy for enemy in enemies if not enemy.dead and enemy not in self.ignored]
+        # От монстра вплотную не убежать (он догоняет и бьёт в спину), поэтому он бьётся в любом случае
+        adjacent = [enemy for enemy in alive if distance(get_cell(enemy), cell) <= ADJACENT]
+        if adjacent:
+            enemy = min(adjacent, key=lambda e: distance(get_cell(e), cell))
+            return enemy, get_cell(enemy)
+        exit_cell = min(exit_cells, key=lambda c: distance(c, cell)) if player.has_key() else None
+        if player.health <= LOW_HEALTH:
+            # Лечиться нечем: сначала за лечащим пузырьком (с ключом - только если он ближе выхода)
+            heal = [item for item in items if item.do_blit and 'flasks_4' in item.filename and item not in self.ignored
+                    and player.has_free_space(item.dir + '/' + item.filename)]
+            if heal:
+                obj = min(heal, key=lambda c: distance(get_cell(c), cell))
+                if exit_cell is None or distance(get_cell(obj), cell) < distance(exit_cell, cell):
+                    return obj, get_cell(obj)
+        if exit_cell is not None:
+            return 'exit', exit_cell
+        # Телепортирующие пузырьки бот не использует: они только занимали бы ячейки инвентаря
+        candidates = [item for item in items if item.do_blit and item not in self.ignored and
+                      'flasks_2' not in item.filename and player.has_free_space(item.dir + '/' + item.filename)]
+        # Ключ и лечащие пузырьки (запас на бой у выхода) важнее монет и сундуков
+        needed = [item for item in candidates if 'keys' in item.filename or 'flasks_4' in item.filename]
+        if needed:
+            obj = min(needed, key=lambda c: distance(get_cell(c), cell))
+            return obj, get_cell(obj)
+        candidates += [chest for chest in chests if not chest.opened and chest not in self.ignored]
+        if candidates:
+            obj = min(candidates, key=lambda c: distance(get_cell(c), cell))
+            return obj, get_cell(obj)
+        if alive and player.health > LOW_HEALTH:
+            enemy = min(alive, key=lambda e: distance(get_cell(e), cell))
+            return enemy, get_cell(enemy)
+        return None
+
+    def step(self, player, enemies, items, chests, exit_cells: list[tuple[int, int]],
+             walkable: list[list[bool]]) -> tuple:
+        """
+        Параметры - как у choose_target(), walkable - сетка проходимости карты
+        :returns: Клетка, к которой нужно идти (или None), и список действий (имена из controls.ACTIONS
+                  и 'use_item' - использовать выбранный предмет)
+        """
+
+        self.frame += 1
+        actions = []
+        if player.health <= LOW_HEALTH:
+            actions += self.use_flask(player, 'flasks_4')
+        elif any('keys' in item.filename and item.do_blit and not player.has_free_space(item.dir + '/' + item.filename)
+                 for item in items):
+            # Под ключ нет места: освобождаем ячейку, выпивая пузырьки
+            actions += self.use_flask(player, 'flasks_4')
+            if not actions and not player.can_tp:
+                actions += self.use_flask(player, 'flasks_2')
+        cell = get_cell(player)
+        close = [enemy for enemy in enemies if not enemy.dead and distance(get_cell(enemy), cell) <= ADJACENT]
+        if close:
+            # Удар наносит режим auto, бот только выбирает его вид
+            actions.append('attack_1')
+        if self.target is not None and self.target[0] == 'exit' and cell in exit_cells:
+            return None, actions + ['exit_level']
+        target = self.choose_target(player, enemies, items, chests, exit_cells)
+        if target is None and self.ignored:
+            # Больше идти некуда: пробуем пропущенные цели ещё раз
+            self.reset()
+            target = self.choose_target(player, enemies, items, chests, exit_cells)
+        if target is None:
+            self.target = None
+            return None, actions
+        obj, target_cell = target
+        if not is_walkable(walkable, target_cell):
+            # Сундуки и предметы у стен: идём к ближайшей свободной соседней клетке
+            free = [(target_cell[0] + dx, target_cell[1] + dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+                    if is_walkable(walkable, (target_cell[0] + dx, target_cell[1] + dy))]
+            if free:
+                target_cell = min(free, key=lambda c: distance(c, cell))
+        self.target = obj, target_cell
+        current = distance(target_cell, cell)
+        best, since = self.progress.get(obj, (current + 1, self.frame))
+        if current < best:
+            self.progress[obj] = current, self.frame
+        elif self.frame - since > STUCK_FRAMES and obj != 'exit':
+            # Выход не пропускается: к нему не подойти только из-за боя по дороге
+            self.ignored.add(obj)
+            self.target = None
+        return target_cell, actions
+
+    def use_flask(self, player, name: str) -> list[str]:
+        for slot, items_images in enumerate(player.inventory.items_images):
+            if items_images and name in items_images[0]:
+                return [f'slot_{slot + 1}', 'use_item', 'slot_1']
+        return []
+
+    def menu_click(self, button) -> list[pg.event.Event]:
+        self.menu_frames += 1
+        if self.menu_frames < MENU_DELAY:
+            return []
+        self.menu_frames = 0
+        return [pg.event.Event(pg.MOUSEBUTTONDOWN, button=1, pos=button.rect.center)]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Бот, проходящий уровни')
+    parser.add_argument('level', nargs='?', default='level1')
+    parser.add_argument('--headless', action='store_true', help='без окна, звука и ограничения FPS')
+    parser.add_argument('--frames', type=int, default=None, help='сколько кадров уровня сыграть')
+    parser.add_argument('--profile', action='store_true', help='записывать профиль каждой сцены')
+    args = parser.parse_args()
+    if args.headless:
+        os.environ['SDL_VIDEODRIVER'] = 'dummy'
+        os.environ['SDL_AUDIODRIVER'] = 'dummy'
+    import main
+    main.init_game()
+    if args.headless:
+        main.fps = 0
+        main.animation_clock.fixed_step = 1000 // FPS
+    main.profiler.auto = args.profile
+    main.bot = Bot(args.frames)
+    main.auto = True
+    main.level, main.n_level = args.level, main.list_of_levels.index(args.level)
+    main.run_level(args.level)
@@ -0,0 +1,57 @@
+"""
+Столкновения прямоугольника со стенами карты. Движение за кадр проверяется целиком:
+по каждой оси перебираются только клетки, в которые входит передний край прямоугольника,
+поэтому он не проскакивает сквозь стены на любой скорости и скользит вдоль них
+"""
+
+import math
+from constants import *
+
+EPS = 1e-6  # правая и нижняя границы прямоугольника не входят в него
+
+
+def is_wall(walkable: list[list[bool]], x: int, y: int) -> bool:
+    return not (0 <= y < len(walkable) and 0 <= x < len(walkable[0]) and walkable[y][x])
+
+
+def sweep_axis(walkable: list[list[bool]], pos: float, delta: float, low: float, size: float, length: float,
+               horizontal: bool) -> tuple[float, bool]:
+    """
+    Движение по одной оси.
+    :param walkable: Сетка проходимости
+    :param pos: Координата прямоугольника по оси движения
+    :param delta: Смещение
+    :param low: Координата прямоугольника по другой оси
+    :param size: Размер прямоугольника по оси движения
+    :param length: Размер прямоугольника по другой оси
+    :param horizontal: Движение по x
+    :returns: Новая координата и было ли столкновение
+    """
+
+    if delta == 0:
+        return pos, False
+    lanes = range(int(low // SPRITE_SIZE), int((low + length - EPS) // SPRITE_SIZE) + 1)
+    if delta > 0:
+        cells = range(int((pos + size - EPS) // SPRITE_SIZE) + 1, int((pos + size + delta - EPS) // SPRITE_SIZE) + 1)
+    else:
+        cells = range(math.floor(pos / SPRITE_SIZE) - 1, math.floor((pos + delta) / SPRITE_SIZE) - 1, -1)
+    for cell in cells:
+        if any(is_wall(walkable, cell, lane) if horizontal else is_wall(walkable, lane, cell) for lane in lanes):
+            return (cell * SPRITE_SIZE - size if delta > 0 else (cell + 1) * SPRITE_SIZE), True
+    return pos + delta, False
+
+
+def sweep_box(walkable: list[list[bool]], pos: tuple[float, float], delta: tuple[float, float],
+              size: tuple[int, int] = (SPRITE_SIZE, SPRITE_SIZE)) -> tuple[tuple[float, float], tuple[bool, bool]]:
+    """
+    Перемещение прямоугольника на delta со скольжением вдоль стен (сначала по x, потом по y).
+    :param walkable: Сетка проходимости, walkable[y][x]
+    :param pos: Левый верхний угол
+    :param delta: Смещение за кадр
+    :param size: Размер прямоугольника
+    :returns: Новый левый верхний угол и были ли столкновения по x и по y
+    """
+
+    x, hit_x = sweep_axis(walkable, pos[0], delta[0], pos[1], size[0], size[1], True)
+    y, hit_y = sweep_axis(walkable, pos[1], delta[1], x, size[1], size[0], False)
+    return (x, y), (hit_x, hit_y)
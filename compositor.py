@@ -0,0 +1,61 @@
+import pygame as pg
+
+
+class Compositor:
+    """
+    Слоистая отрисовка экранов-переходов (затемнение, финиш, смерть).
+    Неизменные слои ниже самого нижнего изменённого сводятся в закэшированную картинку,
+    а слои от изменённого и выше рисуются поверх неё прямо на экран. Пока слой анимируется
+    (затемнение меняется каждый кадр), кадр стоит столько же, сколько вывод слоёв без кэша.
+    Нижний слой должен закрывать весь экран (обычно это снимок игры)
+
+    Атрибуты
+    ------
+    order : list
+        Имена слоёв снизу вверх
+    layers : dict
+        Имя слоя -> список пар (Surface, позиция)
+    cache : Surface
+        Сведённые нижние слои
+    baked : int
+        Сколько нижних слоёв сведено в cache
+    changed : int
+        Номер самого нижнего слоя, изменённого с прошлого вывода (len(order), если таких нет)
+
+    Методы
+    ------
+    set() :
+        Заменяет содержимое слоя
+    touch() :
+        Помечает слой изменённым (например, у его картинки поменялась прозрачность)
+    draw() :
+        Выводит сведённые слои на экран
+    """
+
+    def __init__(self, size: tuple[int, int], order: list[str]) -> None:
+        self.order = order
+        self.layers = {name: [] for name in order}
+        self.cache = pg.Surface(size)
+        self.baked = 0
+        self.changed = 0
+
+    def set(self, name: str, items: list[tuple[pg.Surface, tuple[int, int] | pg.Rect]]) -> None:
+        self.layers[name] = items
+        self.changed = min(self.changed, self.order.index(name))
+
+    def touch(self, name: str) -> None:
+        if self.layers[name]:
+            self.changed = min(self.changed, self.order.index(name))
+
+    def draw(self, target: pg.Surface) -> None:
+        if self.changed < self.baked:
+            # Изменился уже сведённый слой - кэш собирается заново с самого низа
+            self.baked = 0
+        for name in self.order[self.baked:self.changed]:
+            self.cache.blits(self.layers[name], doreturn=False)
+        self.baked = self.changed
+        if self.baked:
+            target.blit(self.cache, (0, 0))
+        for name in self.order[self.baked:]:
+            target.blits(self.layers[name], doreturn=False)
+        self.changed = len(self.order)
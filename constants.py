@@ -1,8 +1,10 @@
 FPS = 60
+RENDERER = 'surface'  # 'surface' - Surface.blit, 'texture' - pygame._sdl2.video
 TORCHES_DIR = 'tiles/2D Pixel Dungeon Asset Pack/items and trap_animation/torch'
 COINS_DIR = 'tiles/2D Pixel Dungeon Asset Pack/items and trap_animation/coin'
 CHESTS_DIR = 'tiles/2D Pixel Dungeon Asset Pack/items and trap_animation/chest'
 PLAYERS_DIR = 'tiles/2D Pixel Dungeon Asset Pack/Character_animation/priests_idle/priest3/v2'
+GUEST_DIR = 'tiles/2D Pixel Dungeon Asset Pack/Character_animation/priests_idle/priest2/v2'
 INTERFACE_DIR = 'tiles/2D Pixel Dungeon Asset Pack/interface'
 FLASKS_DIR = 'tiles/2D Pixel Dungeon Asset Pack/items and trap_animation/flasks'
 SLASH_DIR = 'tiles/2D Pixel Dungeon Asset Pack/items and trap_animation/Sword Slashes'
@@ -15,7 +17,20 @@ SKELETON1_DIR_V1 = 'tiles/2D Pixel Dungeon Asset Pack/Character_animation/monste
 SKELETON1_DIR_V2 = 'tiles/2D Pixel Dungeon Asset Pack/Character_animation/monsters_idle/skeleton1/v2'
 SKELETON2_DIR_V1 = 'tiles/2D Pixel Dungeon Asset Pack/Character_animation/monsters_idle/skeleton2/v1'
 SKELETON2_DIR_V2 = 'tiles/2D Pixel Dungeon Asset Pack/Character_animation/monsters_idle/skeleton2/v2'
+MONSTERS_DIR = 'tiles/2D Pixel Dungeon Asset Pack/Character_animation/monsters_idle'
 VAMPIRE_DIR_V2 = 'tiles/2D Pixel Dungeon Asset Pack/Character_animation/monsters_idle/vampire/v2'
+MUSIC_DIR = 'music'
+ATLAS_DIR = 'cache'
+TELEMETRY_LOG = 'logs/runs.jsonl'
+PROGRESS_DB = 'levels/progress.db'
+PROFILE_DIR = 'logs/profiles'
 SPRITE_SIZE = 16
+WALL_TILES = (0, 1, 2, 3, 4, 5,
+              10, 15, 20, 25, 30, 35,
+              40, 41, 42, 43, 44, 45,
+              50, 51, 52, 53, 54, 55,
+              36, 37)  # индексы тайлов стен
+EXIT_CELLS = [(43, 37), (44, 37), (45, 37), (46, 37),
+              (43, 38), (44, 38), (45, 48), (46, 38)]  # клетки у ворот, через которые можно выйти с уровня
 PLAYER_SPEED = 120   # [px/fps]
 PLAYER_SPEED /= FPS  # [px] - изменение координат за кадр
@@ -0,0 +1,76 @@
+import pygame as pg
+
+# Действия, которые игрок может переназначить (в порядке записи в config/cfg.txt)
+ACTIONS = ['upward', 'downward', 'left', 'right', 'attack_1', 'attack_2', 'pause']
+# Действия с фиксированными клавишами и кнопками мыши
+FIXED_KEYS = {pg.K_1: 'slot_1', pg.K_2: 'slot_2', pg.K_3: 'slot_3', pg.K_4: 'slot_4', pg.K_e: 'exit_level',
+              pg.K_F9: 'profile'}
+FIXED_BUTTONS = {1: 'primary', 3: 'point'}
+
+
+def key_code(name: str) -> int:
+    """
+    Код клавиши по её имени из конфига (K_w, K_LSHIFT, K_space, ...).
+    :param name: Имя клавиши
+    :returns: Код клавиши pygame
+    """
+
+    code = getattr(pg, name, None)
+    if code is None:
+        code = getattr(pg, name.upper(), None)
+    if code is None:
+        code = pg.key.key_code(name[2:] if name.startswith('K_') else name)
+    return code
+
+
+class InputMap:
+    """
+    Таблица привязок: физические клавиши и кнопки мыши -> действия
+
+    Атрибуты
+    ------
+    names : dict
+        Действие -> имя клавиши, как оно записано в конфиге
+    codes : dict
+        Действие -> код клавиши
+    keys : dict
+        Код клавиши -> действие
+    buttons : dict
+        Кнопка мыши -> действие
+
+    Методы
+    ------
+    load() :
+        Читает привязки и громкость из конфига
+    save() :
+        Записывает привязки и громкость в конфиг
+    bind() :
+        Меняет привязки и сразу перестраивает таблицы
+    pressed() :
+        Зажата ли клавиша действия
+    """
+
+    def __init__(self) -> None:
+        self.names = dict()
+        self.codes = dict()
+        self.keys = dict()
+        self.buttons = dict(FIXED_BUTTONS)
+
+    def load(self, path: str) -> float:
+        with open(path, 'r', encoding='utf8') as read_cfg:
+            reader = read_cfg.read().split(', ')
+        self.bind(reader[:-1:])
+        return float(reader[-1])
+
+    def save(self, path: str, volume: float) -> None:
+        with open(path, 'w', encoding='utf8') as save_cfg:
+            save_cfg.write(', '.join([self.names[action] for action in ACTIONS]) + ', ' + str(volume))
+
+    def bind(self, names: list[str]) -> None:
+        self.names = dict(zip(ACTIONS, names))
+        self.codes = {action: key_code(name) for action, name in self.names.items()}
+        self.keys = dict(FIXED_KEYS)
+        self.keys.update({code: action for action, code in self.codes.items()})
+
+    def pressed(self, keys: pg.key.ScancodeWrapper, action: str) -> bool:
+        return keys[self.codes[action]]
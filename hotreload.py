@@ -0,0 +1,142 @@
+"""
+Горячая перезагрузка уровня для дизайнеров карт (ключ --watch): файлы карты (.tmx) и расстановки
+объектов (elements_pos.json) идущего уровня проверяются по времени изменения, и после сохранения
+в уровне обновляются только изменившиеся клетки и объекты, без перезапуска уровня
+"""
+
+import os
+import time
+from collections import Counter
+
+WATCH_INTERVAL = 0.5  # как часто проверять файлы, в секундах
+LAYOUT_FILE = 'elements_pos.json'
+TILE_LAYERS = (0, 1)  # стены и пол, декорации (как в Castle)
+
+
+def level_files(level: str) -> dict[str, str]:
+    """
+    :param level: Имя уровня
+    :returns: 'map' и 'layout' -> путь к файлу уровня
+    """
+
+    return {'map': f'maps/{level}/{level}.tmx', 'layout': f'maps/{level}/{LAYOUT_FILE}'}
+
+
+def tile_keys(tiled_map) -> dict[int, tuple]:
+    """
+    :param tiled_map: Карта (TiledMap)
+    :returns: Внутренний номер тайла pytmx -> (gid из Tiled, отражения тайла)
+    """
+
+    keys = {0: (0, None)}
+    for key, value in tiled_map.imagemap.items():
+        if isinstance(value, tuple):
+            keys[value[0]] = key
+    return keys
+
+
+def diff_tiles(old_map, new_map) -> list[tuple[int, int]] | None:
+    """
+    Клетки, в которых у карт различается тайл хотя бы в одном слое.
+    Тайлы сравниваются по gid из Tiled и отражениям: внутренние номера pytmx у двух загрузок могут не совпадать.
+    :param old_map: Текущая карта (TiledMap)
+    :param new_map: Заново прочитанная карта
+    :returns: Список клеток (None, если изменился размер карты и клетки сравнить нельзя)
+    """
+
+    if (old_map.width, old_map.height) != (new_map.width, new_map.height):
+        return None
+    old_keys, new_keys = tile_keys(old_map), tile_keys(new_map)
+    cells = []
+    for layer in TILE_LAYERS:
+        old_data, new_data = old_map.layers[layer].data, new_map.layers[layer].data
+        for y in range(new_map.height):
+            old_row, new_row = old_data[y], new_data[y]
+            for x in range(new_map.width):
+                if old_keys[old_row[x]] != new_keys[new_row[x]]:
+                    cells.append((x, y))
+    return list(dict.fromkeys(cells))
+
+
+def diff_layout(old: dict[str, list], new: dict[str, list]) -> tuple[list, list]:
+    """
+    Разница двух расстановок объектов (вид объекта -> список клеток).
+    Одинаковые объекты в одной клетке считаются поштучно.
+    :param old: Текущая расстановка
+    :param new: Заново прочитанная расстановка
+    :returns: Пары (вид, клетка), которые нужно убрать, и пары, которые нужно добавить
+    """
+
+    removed, added = [], []
+    for kind in dict.fromkeys([*old, *new]):
+        old_cells = Counter(tuple(cell) for cell in old.get(kind, []))
+        new_cells = Counter(tuple(cell) for cell in new.get(kind, []))
+        removed += [(kind, cell) for cell in (old_cells - new_cells).elements()]
+        added += [(kind, cell) for cell in (new_cells - old_cells).elements()]
+    return removed, added
+
+
+class LevelWatcher:
+    """
+    Следит за файлами идущего уровня
+
+    Атрибуты
+    ------
+    interval : float
+        Как часто проверять файлы, в секундах
+    level : str | None
+        Уровень, за файлами которого идёт слежение
+    paths : dict
+        'map' и 'layout' -> путь к файлу
+    stamps : dict
+        Путь -> (время изменения, размер) при последней проверке
+    checked : float
+        Время последней проверки по time.monotonic()
+
+    Методы
+    ------
+    watch() :
+        Начинает следить за файлами уровня
+    poll() :
+        Файлы, изменившиеся с прошлой проверки
+    """
+
+    def __init__(self, interval: float = WATCH_INTERVAL) -> None:
+        self.interval = interval
+        self.level = None
+        self.paths = dict()
+        self.stamps = dict()
+        self.checked = 0.0
+
+    @staticmethod
+    def stamp(path: str) -> tuple[int, int] | None:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def watch(self, level: str) -> None:
+        if level == self.level:
+            return
+        self.level = level
+        self.paths = level_files(level)
+        self.stamps = {path: self.stamp(path) for path in self.paths.values()}
+        self.checked = time.monotonic()
+
+    def poll(self) -> list[str]:
+        """
+        :returns: Изменившиеся файлы ('map', 'layout'); пока файл не сохранён заново, он не возвращается
+        """
+
+        now = time.monotonic()
+        if now - self.checked < self.interval:
+            return []
+        self.checked = now
+        changed = []
+        for name, path in self.paths.items():
+            stamp = self.stamp(path)
+            if stamp is not None and stamp != self.stamps[path]:
+                self.stamps[path] = stamp
+                changed.append(name)
+        return changed
@@ -0,0 +1,110 @@
+"""
+Освещение уровня: статичный свет факелов запекается в карту освещения один раз при загрузке,
+а вокруг игрока каждый кадр рисуется только закэшированный круг света
+"""
+
+import heapq
+import math
+import pygame as pg
+from constants import *
+
+AMBIENT = 0.4  # освещённость там, куда не достаёт свет факелов
+PLAYER_LIGHT = 56  # радиус света вокруг игрока в пикселях
+PLAYER_LIGHT_COLOR = (70, 55, 30)
+# Имя картинки источника -> радиус света в клетках
+LIGHT_RADII = {'torch': 7, 'side_torch': 6, 'candlestick_2': 4}
+NEIGHBOURS = [(dx, dy, math.hypot(dx, dy)) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy]
+
+
+def spread_light(walkable: list[list[bool]], source: tuple[int, int], radius: int, light: list[list[float]]) -> None:
+    """
+    Распространяет свет источника по проходимым клеткам (стены свет не пропускают, но сами освещаются).
+    :param walkable: Сетка проходимости
+    :param source: Клетка источника
+    :param radius: Радиус света в клетках
+    :param light: Освещённость клеток, дополняется на месте
+    :returns: None
+    """
+
+    height, width = len(walkable), len(walkable[0])
+    dist = {source: 0.0}
+    heap = [(0.0, source)]
+    while heap:
+        d, (x, y) = heapq.heappop(heap)
+        if d > dist[(x, y)]:
+            continue
+        light[y][x] = max(light[y][x], 1 - d / radius)
+        # Из стены (кроме самого источника) свет дальше не идёт
+        if (x, y) != source and not walkable[y][x]:
+            continue
+        for dx, dy, cost in NEIGHBOURS:
+            nx, ny = x + dx, y + dy
+            nd = d + cost
+            if 0 <= nx < width and 0 <= ny < height and nd < radius and nd < dist.get((nx, ny), radius):
+                dist[(nx, ny)] = nd
+                heapq.heappush(heap, (nd, (nx, ny)))
+
+
+def make_glow(radius: int, color: tuple[int, int, int]) -> pg.Surface:
+    """
+    Радиальный градиент для добавляющего наложения.
+    :param radius: Радиус в пикселях
+    :param color: Цвет в центре
+    :returns: Картинка градиента
+    """
+
+    glow = pg.Surface((radius * 2, radius * 2))
+    for r in range(radius, 0, -1):
+        k = (1 - r / radius) ** 1.5
+        pg.draw.circle(glow, [round(c * k) for c in color], (radius, radius), r)
+    return glow
+
+
+class Lighting:
+    """
+    Слой освещения уровня. Каждый кадр стоит два blit: карта освещения и свет игрока
+
+    Атрибуты
+    ------
+    lightmap : Surface
+        Затемнение всей карты (чёрный с попиксельной прозрачностью), запечённое из факелов
+    glow : Surface
+        Круг света вокруг игрока
+    enabled : bool
+        Рисуется ли освещение
+
+    Методы
+    ------
+    bake() :
+        Запекает карту освещения
+    draw() :
+        Накладывает освещение на экран
+    """
+
+    def __init__(self, walkable: list[list[bool]], lights: list[tuple[tuple[int, int], int]]) -> None:
+        """
+        :param walkable: Сетка проходимости
+        :param lights: Пары (клетка источника, радиус в клетках)
+        """
+
+        self.lightmap = self.bake(walkable, lights)
+        self.glow = make_glow(PLAYER_LIGHT, PLAYER_LIGHT_COLOR)
+        self.enabled = True
+
+    @staticmethod
+    def bake(walkable: list[list[bool]], lights: list[tuple[tuple[int, int], int]]) -> pg.Surface:
+        height, width = len(walkable), len(walkable[0])
+        light = [[0.0] * width for _ in range(height)]
+        for source, radius in lights:
+            spread_light(walkable, source, radius, light)
+        # Карта считается по клеткам и сглаживается растяжением до размера в пикселях
+        cells = pg.Surface((width, height), pg.SRCALPHA)
+        for y in range(height):
+            for x in range(width):
+                cells.set_at((x, y), (0, 0, 0, round(255 * (1 - max(light[y][x], AMBIENT)))))
+        return pg.transform.smoothscale(cells, (width * SPRITE_SIZE, height * SPRITE_SIZE))
+
+    def draw(self, target: pg.Surface, center: tuple[float, float]) -> None:
+        if self.enabled:
+            target.blit(self.lightmap, (0, 0))
+            target.blit(self.glow, (center[0] - PLAYER_LIGHT, center[1] - PLAYER_LIGHT), special_flags=pg.BLEND_RGB_ADD)
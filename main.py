@@ -1,53 +1,74 @@
+import os
 import random
 import pygame as pg
 from random import choice
 import sys
-import pytmx
 import json
+import time
+import argparse
 from datetime import datetime
 from constants import *
+from compositor import Compositor
+from renderer import LAYER_ACTORS, LAYER_EFFECTS, LAYER_ITEMS, LAYER_POINTER, create_backend, load_map
+from controls import ACTIONS, InputMap
+from audio import DispatchedSound, SilentMusic, SoundDispatcher
+from ai import AIScheduler
+from collision import sweep_box
+from lighting import LIGHT_RADII, Lighting
+from pooling import SpritePool
+from profiling import SceneProfiler
+from visibility import VisibilityMap
+from progress import ProgressStore
+from hotreload import LevelWatcher, diff_layout, diff_tiles
+from registry import EntityRegistry
+from animation import AnimationClock
+from bitmap_font import TextRenderer
+from snapshot import LevelSnapshot
+from telemetry import RunRecorder
+from bot import Bot
+from quality import AI_SLOWDOWN, QualityGovernor
+from netplay import CoopClient, CoopHost, NetStats
+from assets import load_image, load_packs, load_sound
+from pathfinding import HierarchicalPathfinder, PathWorker, step_on_field
 
 list_of_levels = ['level1', 'level2', 'level3', 'level4', 'level5']
 
-with open('levels/available_levels.txt') as f:
-    available_levels = f.read().split(', ')
+progress: ProgressStore | None = None  # открытые уровни и очки (открываются в init_game)
 n_level = 0
 level = list_of_levels[n_level]
 
 auto = False
-count_killed = 0
-hp_lost = 0
+bot: Bot | None = None  # бот, управляющий игроком вместо клавиатуры и мыши
+fps = FPS  # ограничение кадров в секунду (0 - без ограничения)
+seed: int | None = None  # зерно расстановки объектов (None - новое при каждой загрузке уровня)
+frame_limit: int | None = None  # через сколько кадров выйти из игры (None - не выходить)
+frames_played = 0
+coop: CoopHost | None = None  # хост совместной игры по сети
+watcher: LevelWatcher | None = None  # слежение за файлами уровня для горячей перезагрузки (--watch)
+count_killed = 0  # убито монстров за текущий забег (обнуляется в run_level)
+hp_lost = 0  # потеряно здоровья за текущий забег
 
 chests = pg.sprite.Group()
 coins = pg.sprite.Group()
 animated_sprites = pg.sprite.Group()
+animation_clock = AnimationClock()
+telemetry = RunRecorder()
+profiler = SceneProfiler()
+quality = QualityGovernor()
+sprite_pool = SpritePool()
+fonts = TextRenderer()
 flasks = pg.sprite.Group()
 can_be_opened = pg.sprite.Group()
 keys_group = pg.sprite.Group()
 can_be_picked_up = pg.sprite.Group()
 in_chests = pg.sprite.Group()
 enemies = pg.sprite.Group()
+entities = EntityRegistry()  # все объекты уровня по классам
+level_groups = [chests, coins, animated_sprites, flasks, can_be_opened, keys_group, can_be_picked_up, in_chests,
+                enemies, entities]
 
-# Считываем конфиг игрока
-with open('config/cfg.txt', 'r', encoding='utf8') as read_cfg:
-    reader = read_cfg.read().split(', ')
-    reader, music = reader[:-1:], float(reader[-1])
-    text_names = list()
-    config = list()
-    for i in reader:
-        try:
-            config.append(eval(f'pg.{i}'))
-            text_names.append(str(i))
-        except AttributeError:
-            config.append(eval(f'pg.{str(i).upper()}'))
-            text_names.append(str(i).upper())
-    upward = config[0]
-    downward = config[1]
-    left = config[2]
-    right = config[3]
-    attack_1 = config[4]
-    attack_2 = config[5]
-    pause = config[6]
+controls = InputMap()
+music: float  # громкость (читается из конфига игрока в init_game)
 
 
 class AnimatedObject(pg.sprite.Sprite):
@@ -70,64 +91,84 @@ class AnimatedObject(pg.sprite.Sprite):
     current_image : int
         Индекс пути к изображению в списке images.
         Нужен для смены кадра в анимации
-    last_tick : int
-        Миллисекунда, когда была совершена последняя смена кадра анимации.
-        Нужен для измерения времени до изменения кадра
+    anim_start : int
+        Время часов анимации, от которого отсчитываются кадры.
+        У одинаковых декораций оно общее (0), поэтому они анимируются синхронно
     animation_delay : int
         Количество миллисекунд, на которые нужно задерживать смену кадра анимации
     pos : tuple
         Координаты левого верхнего угла прямоугольника, описанного около изображения объекта
     image : Surface
         Текущий кадр анимации объекта
+    frame : Surface
+        Текущий кадр до отражения (из него текстурный бэкенд рисует отражённый спрайт сам)
     mask : Mask
         Маска объекта.
         Нужна для определения столкновения с игроком
     rect : Rect
         Прямоугольник, в который вписано изображение объекта.
+    spawn_groups : list
+        Группы, в которые объект добавляется при создании (и при повторном появлении из пула)
+    entity_id : int
+        Номер объекта в реестре entities
 
     Методы
     ------
-    animate() :
-        Изменяет кадр анимации.
+    set_frame() :
+        Изменяет кадр анимации (вызывается из AnimationClock.step()).
+    draw() :
+        Отправляет текущий кадр в список отрисовки кадра (повторная отправка заменяет прежнюю).
+    respawn() :
+        Возвращает объект из пула на карту в заданную точку.
     """
 
+    shared_phase = False
+    layer = LAYER_ITEMS  # слой в списке отрисовки кадра
+    decorative = False  # декорации замирают, когда регулятор качества отключает их анимацию
+
     def __init__(self, group: list | None, directory: str, x: int | None, y: int | None, filename: str) -> None:
         """
         Если x и y - None, то объект не должен появиться на карте.
         Это сделано для того, чтобы объект можно было "положить" в сундук,
         при этом не потерять возможность работать с ним как с полноценным объектом
         """
-        super().__init__(*group)
+        self.spawn_groups = [*group, entities]
+        super().__init__(*self.spawn_groups)
         self.filename = filename
         self.dir = directory
         self.images = [directory + f'/{filename}_{k}.png' for k in range(1, 5)]
         if x is not None and y is not None:
             self.do_blit = True
             self.current_image = 0
-            self.last_tick = pg.time.get_ticks()
+            self.anim_start = 0 if self.shared_phase else animation_clock.now
             self.animation_delay = 100
             self.flip = False
             self.do_animation = True
             self.pos = x, y
-            self.image = pg.image.load(self.images[self.current_image])
+            self.frame = load_image(self.images[self.current_image])
+            self.image = self.frame
             self.mask = pg.mask.from_surface(self.image)
             self.rect = self.image.get_rect()
             self.rect.topleft = self.pos
-            screen.blit(self.image, (x, y))
-
-    def animate(self) -> None:
-        if self.do_animation:
-            tick = pg.time.get_ticks()
-            if tick - self.last_tick >= self.animation_delay:
-                self.current_image = (self.current_image + 1) % 4
-                if not self.flip:
-                    self.image = pg.image.load(self.images[self.current_image])
-                else:
-                    self.image = pg.transform.flip(
-                        pg.image.load(self.images[self.current_image]), flip_x=True, flip_y=False)
-                self.last_tick = pg.time.get_ticks()
+
+    def set_frame(self, index: int) -> None:
+        self.current_image = index
+        self.frame = load_image(self.images[self.current_image])
+        self.image = animation_clock.get_flipped(self.frame) if self.flip else self.frame
+
+    def draw(self) -> None:
         if self.do_blit:
-            screen.blit(self.image, self.pos)
+            backend.post(self, self.image, self.pos, self.frame, self.flip, self.layer)
+
+    def respawn(self, x: int, y: int) -> None:
+        self.do_blit = True
+        self.do_animation = True
+        self.flip = False
+        self.anim_start = 0 if self.shared_phase else animation_clock.now
+        self.pos = x, y
+        self.set_frame(0)
+        self.rect.topleft = self.pos
+        self.add(*self.spawn_groups)
 
 
 class MovingObject(AnimatedObject):
@@ -149,6 +190,8 @@ class MovingObject(AnimatedObject):
     ------
     move_by_delta() :
         Изменяет положение объекта на dx и dy по осям x и y соответственно за один кадр
+    draw_slash() :
+        Отправляет кадр удара в список отрисовки над спрайтами
     get_left_up_cell() :
         Возвращает клетку, в которой находится левый верхний угол объекта
     get_left_down_cell() :
@@ -163,8 +206,10 @@ class MovingObject(AnimatedObject):
         Возвращает координаты центра объекта
     """
 
+    layer = LAYER_ACTORS
+
     def __init__(self, x: int, y: int, filename: str) -> None:
-        directory = PLAYERS_DIR if 'priest' in filename else SKULL_DIR_V2 if 'skull' in filename \
+        directory = GUEST_DIR if 'priest2' in filename else PLAYERS_DIR if 'priest' in filename else SKULL_DIR_V2 if 'skull' in filename \
             else SKELETON1_DIR_V2 if 'skeleton' in filename else VAMPIRE_DIR_V2
         groups = [animated_sprites] if 'priest' in filename else [animated_sprites, enemies]
         super().__init__(groups, directory, x, y, filename)
@@ -178,7 +223,12 @@ class MovingObject(AnimatedObject):
         self.x += dx
         self.y += dy
         self.rect.x, self.rect.y = self.pos[0], self.pos[1]
-        screen.blit(self.image, self.pos)
+
+    def draw_slash(self, image: pg.Surface) -> None:
+        # Отражённый удар смещён на клетку влево; повторная отправка за кадр заменяет прежнюю
+        x = self.pos[0] - SPRITE_SIZE if self.flip else self.pos[0]
+        backend.post((self, 'slash'), pg.transform.flip(image, flip_x=True, flip_y=False) if self.flip else image,
+                     (x, self.pos[1] - 10), image, self.flip, LAYER_EFFECTS)
 
     def get_left_up_cell(self) -> tuple[int, int]:
         return int(self.pos[0] // SPRITE_SIZE), int(self.pos[1] // SPRITE_SIZE)
@@ -205,6 +255,9 @@ class Torch(AnimatedObject):
     Класс для анимирования факелов
     """
 
+    shared_phase = True
+    decorative = True
+
     def __init__(self, x: int, y: int, filename: str) -> None:
         super().__init__([animated_sprites], TORCHES_DIR, x, y, filename)
 
@@ -214,6 +267,9 @@ class Flag(AnimatedObject):
     Класс для анимирования флагов
     """
 
+    shared_phase = True
+    decorative = True
+
     def __init__(self, x: int, y: int, filename: str) -> None:
         super().__init__([animated_sprites], FLAG_DIR, x, y, filename)
 
@@ -228,6 +284,8 @@ class Key(AnimatedObject):
         Прекращает анимацию, если есть пересечение с игроком.
     """
 
+    shared_phase = True
+
     def __init__(self, x: int | None, y: int | None, filename: str) -> None:
         if x is not None and y is not None:
             group = [keys_group, animated_sprites, can_be_picked_up]
@@ -252,6 +310,8 @@ class Coin(AnimatedObject):
         Прекращает анимацию, если есть пересечение с игроком.
     """
 
+    shared_phase = True
+
     def __init__(self, x: int | None, y: int | None, filename: str) -> None:
         if x is not None and y is not None:
             group = [coins, animated_sprites, can_be_picked_up]
@@ -277,6 +337,8 @@ class TeleportFlask(AnimatedObject):
         Прекращает анимацию, если есть пересечение с игроком.
     """
 
+    shared_phase = True
+
     def __init__(self, x: int | None, y: int | None, filename: str) -> None:
         if x is not None and y is not None:
             group = [flasks, animated_sprites, can_be_picked_up]
@@ -302,6 +364,8 @@ class HealFlask(AnimatedObject):
         Прекращает анимацию, если есть пересечение с игроком.
     """
 
+    shared_phase = True
+
     def __init__(self, x: int | None, y: int | None, filename: str) -> None:
         if x is not None and y is not None:
             group = [flasks, animated_sprites, can_be_picked_up]
@@ -353,16 +417,15 @@ class Chest(AnimatedObject):
     def animate_opening(self) -> None:
         all_music.chest_opened_music.play()
         self.images = [CHESTS_DIR + f'/chest_open_{j}.png' for j in range(1, 5)]
-        self.current_image = 0
-        self.image = pg.image.load(self.images[self.current_image])
-        self.animate()
+        self.anim_start = animation_clock.now
+        self.set_frame(0)
+        self.draw()
 
-    def get_drop(self) -> pg.sprite.Sprite:
+    def get_drop(self) -> str:
+        # Дроп выбирается по пути к картинке, объект создаёт (или берёт из пула) spawn_object()
         if not self.dropped:
             self.dropped = True
-            return choice([HealFlask(None, None, 'flasks_4'),
-                           TeleportFlask(None, None, 'flasks_2'),
-                           Coin(None, None, 'coin')])
+            return choice([FLASKS_DIR + '/flasks_4', FLASKS_DIR + '/flasks_2', COINS_DIR + '/coin'])
 
 
 class Player(MovingObject):
@@ -391,6 +454,8 @@ class Player(MovingObject):
     ------
     handle_keypress() :
         Обрабатывает нажатия на WASD и в соответствии с нажатыми клавишами передвигает игрока
+    walk() :
+        Передвигает игрока в заданном направлении со скольжением вдоль стен
     move_by_pointer() :
         Передвигает игрока к поставленному указателю
     slash() :
@@ -406,8 +471,8 @@ class Player(MovingObject):
     def __init__(self, x: int, y: int, filename: str) -> None:
         super().__init__(x, y, filename)
         self.current_slash = -1
-        self.slash_tick = pg.time.get_ticks()
-        self.attack_tick = pg.time.get_ticks()
+        self.slash_tick = animation_clock.now
+        self.attack_tick = animation_clock.now
         self.do_slash = False
         self.dead = False
         self.health = 5
@@ -415,37 +480,22 @@ class Player(MovingObject):
         self.inventory = Inventory()
 
     def handle_keypress(self, keys: pg.key.ScancodeWrapper) -> None:
+        self.walk(controls.pressed(keys, 'right') - controls.pressed(keys, 'left'),
+                  controls.pressed(keys, 'downward') - controls.pressed(keys, 'upward'))
+
+    def walk(self, x_direction: int, y_direction: int) -> None:
         if not self.dead:
-            current_pos_rd = self.get_right_down_cell()
-            current_pos_lu = self.get_left_up_cell()
-            current_pos_ru = self.get_right_up_cell()
-            current_pos_ld = self.get_left_down_cell()
-            if keys[downward]:
-                if castle.is_free(current_pos_rd) and castle.is_free(current_pos_ld) and \
-                        castle.is_free((current_pos_rd[0], (self.pos[1] + PLAYER_SPEED) // SPRITE_SIZE + 1)) and \
-                        castle.is_free((current_pos_ld[0], (self.pos[1] + PLAYER_SPEED) // SPRITE_SIZE + 1)):
-                    self.move_by_delta(dx=0, dy=PLAYER_SPEED)
-                    self.current_direction = (0, 1)
-            if keys[upward]:
-                if castle.is_free(current_pos_ru) and castle.is_free(current_pos_lu) and \
-                        castle.is_free((current_pos_ru[0], (self.pos[1] - PLAYER_SPEED) // SPRITE_SIZE)) and \
-                        castle.is_free((current_pos_lu[0], (self.pos[1] - PLAYER_SPEED) // SPRITE_SIZE)):
-                    self.move_by_delta(dx=0, dy=-PLAYER_SPEED)
-                    self.current_direction = (0, -1)
-            if keys[left]:
-                if castle.is_free(current_pos_lu) and castle.is_free(current_pos_ld) and \
-                        castle.is_free(((self.pos[0] - PLAYER_SPEED) // SPRITE_SIZE, current_pos_lu[1])) and \
-                        castle.is_free(((self.pos[0] - PLAYER_SPEED) // SPRITE_SIZE, current_pos_ld[1])):
-                    self.move_by_delta(dx=-PLAYER_SPEED, dy=0)
-                    self.flip = True
-                    self.current_direction = (-1, 0)
-            if keys[right]:
-                if castle.is_free(current_pos_ru) and castle.is_free(current_pos_rd) and \
-                        castle.is_free(((self.pos[0] + PLAYER_SPEED) // SPRITE_SIZE + 1, current_pos_ru[1])) and \
-                        castle.is_free(((self.pos[0] + PLAYER_SPEED) // SPRITE_SIZE + 1, current_pos_rd[1])):
-                    self.move_by_delta(dx=PLAYER_SPEED, dy=0)
-                    self.flip = False
-                    self.current_direction = (1, 0)
+            dx, dy = x_direction * PLAYER_SPEED, y_direction * PLAYER_SPEED
+            if dx or dy:
+                (x, y), _ = sweep_box(castle.walkable, self.pos, (dx, dy))
+                moved_x, moved_y = x - self.pos[0], y - self.pos[1]
+                if moved_x or moved_y:
+                    self.move_by_delta(dx=moved_x, dy=moved_y)
+                if moved_x:
+                    self.flip = moved_x < 0
+                    self.current_direction = (1 if moved_x > 0 else -1, 0)
+                elif moved_y:
+                    self.current_direction = (0, 1 if moved_y > 0 else -1)
 
     def slash(self, foldername: str, frames=6) -> None:
         if not self.dead:
@@ -458,14 +508,15 @@ class Player(MovingObject):
                 slash_delay = 70
             if self.do_slash:
                 images = [SLASH_DIR + '/' + foldername + f'/File{j}.png' for j in range(1, frames + 1)]
-                tick = pg.time.get_ticks()
-                image = pg.transform.scale(pg.image.load(images[self.current_slash]), (32, 32))
+                tick = animation_clock.now
+                # Кадры ударов запечены в атлас уже в размере 32x32 (assets.FAMILIES)
+                image = load_image(images[self.current_slash])
                 if tick - self.slash_tick >= slash_delay:
                     if 'Group' in foldername and self.current_slash in [2, 5, 7, 10, 12, 15, 17]:
                         all_music.slash_player_music.play()
                     self.current_slash = (self.current_slash + 1) % frames
-                    image = pg.transform.scale(pg.image.load(images[self.current_slash]), (32, 32))
-                    self.slash_tick = pg.time.get_ticks()
+                    image = load_image(images[self.current_slash])
+                    self.slash_tick = tick
                     for e in enemies:
                         if self.current_slash == 0:
                             if (abs(self.get_center_coordinates()[1] - e.get_center_coordinates()[
@@ -483,15 +534,11 @@ class Player(MovingObject):
                                   - e.get_center_coordinates()[1]) <= SPRITE_SIZE + 4
                               and abs(self.get_center_coordinates()[0]
                                       - e.get_center_coordinates()[0]) <= SPRITE_SIZE + 4
-                              and 'Group' in foldername) and pg.time.get_ticks() - self.attack_tick >= 300:
+                              and 'Group' in foldername) and tick - self.attack_tick >= 300:
                             e.health -= 1
                             e.hit_delay = 700
-                            self.attack_tick = pg.time.get_ticks()
-                if not self.flip:
-                    screen.blit(image, (self.pos[0], self.pos[1] - 10))
-                else:
-                    screen.blit(pg.transform.flip(image, flip_x=True, flip_y=False),
-                                (self.pos[0] - SPRITE_SIZE, self.pos[1] - 10))
+                            self.attack_tick = tick
+                self.draw_slash(image)
             if (self.current_slash + 1) % 4 == 0:
                 if 'Group' not in foldername or self.current_slash == 19:
                     all_music.slash_player_music.play()
@@ -523,8 +570,8 @@ class Player(MovingObject):
     def update(self):
         if self.health <= 0:
             self.dead = True
-            screen.blit(pg.image.load(INTERFACE_DIR + '/UI_Flat_Cross_Large.png'),
-                        (self.pos[0] - SPRITE_SIZE // 2, self.pos[1] - SPRITE_SIZE // 2))
+            backend.post((self, 'cross'), load_image(INTERFACE_DIR + '/UI_Flat_Cross_Large.png'),
+                         (self.pos[0] - SPRITE_SIZE // 2, self.pos[1] - SPRITE_SIZE // 2), layer=LAYER_EFFECTS)
         if self.do_slash and auto:
             self.slash('Blue Slash Thin')
 
@@ -534,6 +581,8 @@ class Pointer(AnimatedObject):
     Класс, реализующий указатель, к которому объект игрока будет идти.
     """
 
+    layer = LAYER_POINTER
+
     def __init__(self, x: int, y: int, filename: str) -> None:
         super().__init__([animated_sprites], INTERFACE_DIR, x, y, filename)
 
@@ -563,6 +612,10 @@ class Inventory:
         Показывает индекс выбранного предмета в инвентаре
     tick_now : int
         Тик в данный момент
+    cur_item_mark : Surface
+        Рамка выбранной ячейки
+    cell_images : dict
+        Путь к картинке предмета -> уменьшенная картинка для ячейки
 
     Методы
     ------
@@ -570,6 +623,7 @@ class Inventory:
         Прорисовывает сердечки и инвентарь
     update() :
         Уменьшает или увеличивает y_pos при приближении курсора к нижней части экрана
+        (при snap панель сразу встаёт на место без плавного выдвижения)
     add() :
         Добавляет объект в инвентарь
     remove() :
@@ -580,35 +634,40 @@ class Inventory:
 
     def __init__(self) -> None:
         self.items_images = [[ITEMS_DIR + '/sword12.png'], [], [], []]
-        self.image = pg.transform.scale(pg.image.load(INTERFACE_DIR + '/inventory1.png'), (170, 50))
-        self.health_image = pg.transform.scale(pg.image.load(INTERFACE_DIR + '/heart.png'), (32, 32))
+        self.image = pg.transform.scale(load_image(INTERFACE_DIR + '/inventory1.png'), (170, 50))
+        self.health_image = pg.transform.scale(load_image(INTERFACE_DIR + '/heart.png'), (32, 32))
         self.y_pos = HEIGHT
         self.mouse_collide = False
         self.throwing = None
         self.thrown_elem = None
         self.current_item = 0
-        self.tick_now = pg.time.get_ticks()
+        self.tick_now = animation_clock.now
+        self.cur_item_mark = pg.transform.scale(load_image(INTERFACE_DIR + '/UI_Flat_Select_01a1.png'), (39, 44))
+        self.cell_images = dict()
 
     def draw(self) -> None:
-        screen.blit(self.image, (315, self.y_pos))
+        backend.draw_sprite(self.image, (315, self.y_pos))
         for j in range(player.health):
-            screen.blit(self.health_image, (20 + 50 * j, self.y_pos + 10))
+            backend.draw_sprite(self.health_image, (20 + 50 * j, self.y_pos + 10))
         for ind, cell in enumerate(self.items_images):
             for item in cell:
-                item_image = pg.transform.scale(pg.image.load(item), (30, 30))
-                screen.blit(item_image, (330 + item_image.get_width() * ind + 7 * ind, self.y_pos + 13))
+                if item not in self.cell_images:
+                    self.cell_images[item] = pg.transform.scale(load_image(item), (30, 30))
+                item_image = self.cell_images[item]
+                backend.draw_sprite(item_image, (330 + item_image.get_width() * ind + 7 * ind, self.y_pos + 13))
                 amount = len(cell)
                 if amount > 1:
-                    font = pg.font.Font(None, 15)
-                    rendered = font.render(f'x{amount}', 1, pg.Color('white'))
+                    rendered = fonts.render(f'x{amount}', 15, pg.Color('white'), path=None)
                     screen.blit(rendered, (348 + item_image.get_width() * ind + 7 * ind, self.y_pos + 35))
-        cur_item_mark = pg.transform.scale(pg.image.load(INTERFACE_DIR + '/UI_Flat_Select_01a1.png'), (39, 44))
-        screen.blit(cur_item_mark, (325 + cur_item_mark.get_width() *
+        cur_item_mark = self.cur_item_mark
+        backend.draw_sprite(cur_item_mark, (325 + cur_item_mark.get_width() *
                                     self.current_item - self.current_item - bool(self.current_item)
                                     - self.current_item // 3, self.y_pos + 7))
 
-    def update(self) -> None:
-        if self.mouse_collide and self.y_pos >= 590:
+    def update(self, snap: bool = False) -> None:
+        if snap:
+            self.y_pos = 590 if self.mouse_collide else HEIGHT
+        elif self.mouse_collide and self.y_pos >= 590:
             self.y_pos -= PLAYER_SPEED
         elif self.y_pos <= HEIGHT and not self.mouse_collide:
             self.y_pos += PLAYER_SPEED
@@ -631,9 +690,8 @@ class Inventory:
                     else:
                         all_music.pickup_other_music.play()
                     self.items_images[cell].append(file)
-            for j in can_be_picked_up:
-                if j is obj:
-                    j.kill()
+            if obj in can_be_picked_up:
+                obj.kill()
 
     def remove(self) -> None:
         del self.items_images[self.current_item][0]
@@ -641,7 +699,7 @@ class Inventory:
     def throw(self) -> None:
         if self.current_item != 0:
             if self.items_images[self.current_item]:
-                self.throwing = pg.image.load(self.items_images[self.current_item][0])
+                self.throwing = load_image(self.items_images[self.current_item][0])
             mx, my = pg.mouse.get_pos()
             if self.throwing is not None:
                 screen.blit(self.throwing, (mx - 15, my - 15))
@@ -663,13 +721,39 @@ class Castle:
         Ширина карты в клетках
     walls : list
         Хранит индексы тайлов, обозначающих стены
+    background : Surface
+        Карта, один раз собранная из тайлов при загрузке
+    walkable : list
+        Сетка проходимости, walkable[y][x] - True, если клетка не стена
+    pathfinder : HierarchicalPathfinder
+        Иерархический поиск пути (кластеры и входы считаются при загрузке уровня)
+    path_worker : PathWorker
+        Фоновый поток, считающий пути монстров по снимку walkable
+    visibility : VisibilityMap
+        Прямая видимость между клетками (монстры замечают игрока, только если видят его)
+    name : str
+        Имя уровня
+    snapshot : LevelSnapshot | None
+        Состояние уровня сразу после расстановки объектов (для быстрого перезапуска)
+    seed : int | None
+        Зерно random, с которым расставлены объекты уровня
+    lighting : Lighting | None
+        Освещение уровня, запечённое по расставленным факелам
+    layout : dict
+        Расстановка объектов из elements_pos.json: вид объекта -> список клеток
+    placed : dict
+        (вид, клетка) -> список объектов, поставленных по этой записи расстановки
 
     Методы
     ------
     render() :
         Отрисовывает карту на экране
+    draw_tile() :
+        Рисует тайлы клетки в фон карты
+    update_tiles() :
+        Заменяет карту заново прочитанной, перерисовывая только изменившиеся клетки
     find_path_step() :
-        Алгоритм пошагового поиска клеток пути
+        Следующая клетка пути к цели
     get_tile_id() :
         Определяет id тайла по координатам клетки
     is_free() :
@@ -681,45 +765,81 @@ class Castle:
     """
 
     def __init__(self, foldername: str, filename: str) -> None:
-        self.map = pytmx.load_pygame(f'maps/{foldername}/{filename}')
+        self.map = load_map(f'maps/{foldername}/{filename}')
         self.height, self.width = self.map.height, self.map.width
-        self.walls = [0, 1, 2, 3, 4, 5,
-                      10, 15, 20, 25, 30, 35,
-                      40, 41, 42, 43, 44, 45,
-                      50, 51, 52, 53, 54, 55,
-                      36, 37]
-
-    def render(self) -> None:
+        self.walls = WALL_TILES
+        self.background = pg.Surface((self.width * SPRITE_SIZE, self.height * SPRITE_SIZE))
         for y in range(self.height):
             for x in range(self.width):
-                wall_image = self.map.get_tile_image(x, y, 0)
-                decoration_image = self.map.get_tile_image(x, y, 1)
-                screen.blit(wall_image, (x * SPRITE_SIZE, y * SPRITE_SIZE))
-                if decoration_image is not None:
-                    screen.blit(decoration_image, (x * SPRITE_SIZE, y * SPRITE_SIZE))
-
-    def find_path_step(self, start: tuple[int, int], target: tuple[int, int]) -> tuple[int, int]:
-        inf = 1000
-        x, y = start
-        distance = [[inf] * self.width for _ in range(self.height)]
-        distance[y][x] = 0
-        prev = [[(None, None)] * self.width for _ in range(self.height)]
-        queue = [(x, y)]
-        while queue:
-            x, y = queue.pop(0)
-            for dx, dy in (1, 0), (0, 1), (-1, 0), (0, -1):
-                next_x, next_y = x + dx, y + dy
-                if 0 <= next_x <= self.width and 0 <= next_y <= self.height and \
-                        self.is_free((next_x, next_y)) and distance[next_y][next_x] == inf:
-                    distance[next_y][next_x] = distance[y][x] + 1
-                    prev[next_y][next_x] = (x, y)
-                    queue.append((next_x, next_y))
-        x, y = target
-        if distance[y][x] == inf or start == target:
+                self.draw_tile(x, y)
+        self.walkable = [[self.is_free((x, y)) for x in range(self.width)] for y in range(self.height)]
+        self.pathfinder = HierarchicalPathfinder(self.walkable)
+        self.path_worker = PathWorker(self.walkable)
+        self.path_worker.start()
+        self.visibility = VisibilityMap(self.walkable)
+        self.name = foldername
+        self.snapshot = None
+        self.seed = None
+        self.lighting = None
+        self.layout = dict()
+        self.placed = dict()
+
+    def render(self) -> None:
+        backend.draw_map(self)
+
+    def draw_tile(self, x: int, y: int) -> None:
+        area = pg.Rect(x * SPRITE_SIZE, y * SPRITE_SIZE, SPRITE_SIZE, SPRITE_SIZE)
+        self.background.fill(pg.Color('black'), area)
+        wall_image = self.map.get_tile_image(x, y, 0)
+        decoration_image = self.map.get_tile_image(x, y, 1)
+        self.background.blit(wall_image, area)
+        if decoration_image is not None:
+            self.background.blit(decoration_image, area)
+
+    def update_tiles(self, tiled_map, cells: list[tuple[int, int]]) -> list[tuple[int, int]]:
+        """
+        Сетка walkable меняется на месте (на неё ссылаются поиск пути и видимость),
+        а производные от неё данные пересчитываются, только если изменились стены.
+        :param tiled_map: Заново прочитанная карта того же размера
+        :param cells: Клетки, в которых изменились тайлы
+        :returns: Клетки, у которых изменилась проходимость
+        """
+
+        self.map = tiled_map
+        walls_changed = []
+        for x, y in cells:
+            self.draw_tile(x, y)
+            free = self.is_free((x, y))
+            if free != self.walkable[y][x]:
+                self.walkable[y][x] = free
+                walls_changed.append((x, y))
+        backend.refresh_map(self, [pg.Rect(x * SPRITE_SIZE, y * SPRITE_SIZE, SPRITE_SIZE, SPRITE_SIZE)
+                                   for x, y in cells])
+        if walls_changed:
+            # Входы кластеров зависят от соседних кластеров, поэтому граф пересобирается целиком (мс)
+            self.pathfinder = HierarchicalPathfinder(self.walkable)
+            self.path_worker.stop()
+            self.path_worker = PathWorker(self.walkable)
+            self.path_worker.start()
+            self.visibility.invalidate(walls_changed)
+        return walls_changed
+
+    def find_path_step(self, start: tuple[int, int], target: tuple[int, int],
+                       wait: bool = True) -> tuple[int, int]:
+        """
+        Если wait - False, путь не считается в текущем кадре: цель уходит в path_worker,
+        а объект идёт по последнему готовому полю (к последней известной цели).
+        Иначе путь ищется иерархически через pathfinder
+        """
+        field = self.path_worker.get_field(target)
+        if field is not None:
+            return step_on_field(field, start)
+        if wait:
+            return self.pathfinder.find_path_step(start, target)
+        self.path_worker.request(target)
+        if self.path_worker.latest is None:
             return start
-        while prev[y][x] != start:
-            x, y = prev[y][x]
-        return x, y
+        return step_on_field(self.path_worker.latest, start)
 
     def get_tile_id(self, position: tuple[int, int]) -> int:
         return self.map.tiledgidmap[self.map.get_tile_gid(*position, layer=0)] - 1
@@ -785,7 +905,7 @@ class Monster(MovingObject, Castle):
     view_radius : int
         Радиус обзора
     go_to_player : bool
-        Нужно ли идти к игроку
+        Нужно ли идти к игроку (начинает, только увидев игрока, и идёт, пока он в радиусе обзора)
     x, y : float, float
         Координаты
     hit_delay : int
@@ -803,6 +923,10 @@ class Monster(MovingObject, Castle):
     ------
     check() :
         Проверяет все показатели противника
+    think() :
+        Обновление монстра за кадр (вызывается из AIScheduler.run())
+    can_see() :
+        Видит ли монстр объект (стены закрывают обзор)
     move_to_player() :
         Движение к игроку
     hit() :
@@ -814,7 +938,7 @@ class Monster(MovingObject, Castle):
     def __init__(self, x: int, y: int, filename: str) -> None:
         super().__init__(x, y, filename)
         self.current_slash = -1
-        self.slash_tick = pg.time.get_ticks()
+        self.slash_tick = animation_clock.now
         self.do_slash = False
         self.health = 5
         self.current_direction = 1, 0
@@ -829,8 +953,9 @@ class Monster(MovingObject, Castle):
 
     def check(self):
         self.rect.topleft = self.x, self.y
-        self.go_to_player = (abs(player.pos[0] - self.pos[0]) <= self.view_radius and
-                             abs(player.pos[1] - self.pos[1]) <= self.view_radius)
+        in_range = (abs(player.pos[0] - self.pos[0]) <= self.view_radius and
+                    abs(player.pos[1] - self.pos[1]) <= self.view_radius)
+        self.go_to_player = in_range and (self.go_to_player or self.can_see(player))
 
         if self.health <= 0:
             self.die()
@@ -861,6 +986,14 @@ class Monster(MovingObject, Castle):
             self.images = [self.dir.rstrip('v2') + 'v1' + f'/{self.filename.rstrip("_v2") + "_v1"}_{j}.png'
                            for j in range(1, 5)]
 
+    def can_see(self, obj: MovingObject) -> bool:
+        return castle.visibility.sees(self.get_center_cell(), obj.get_center_cell())
+
+    def think(self) -> None:
+        # Сначала проверка (замечает игрока, бьёт, умирает), затем ход
+        self.check()
+        self.move_to_player()
+
     def move_to_player(self):
         if not self.dead:
             player_collide = pg.sprite.spritecollide(player, enemies, dokill=False)
@@ -868,42 +1001,36 @@ class Monster(MovingObject, Castle):
                     (abs(self.get_center_cell()[0] - player.get_center_cell()[0]) >= 2 or
                      abs(self.get_center_cell()[1] - player.get_center_cell()[1]) >= 2) and
                     not player_collide):
-                move_by_pointer(self, player.get_center_cell())
+                move_by_pointer(self, player.get_center_cell(), wait=False)
 
             if player_collide and player_collide[0] is self:
+                # Игрок толкает монстра
                 self.current_direction = player.current_direction
-                if castle.is_free((
-                        (self.get_center_coordinates()[0] + SPRITE_SIZE // 2 * self.current_direction[0] +
-                         PLAYER_SPEED * self.current_direction[0]) // SPRITE_SIZE,
-                        (self.get_center_coordinates()[1] + SPRITE_SIZE // 2 * self.current_direction[1] +
-                         PLAYER_SPEED * self.current_direction[1]) // SPRITE_SIZE)):
-                    self.move_by_delta(
-                        PLAYER_SPEED * self.current_direction[0], PLAYER_SPEED * self.current_direction[1])
+                (x, y), _ = sweep_box(castle.walkable, self.pos, (PLAYER_SPEED * self.current_direction[0],
+                                                                  PLAYER_SPEED * self.current_direction[1]))
+                if (x, y) != self.pos:
+                    self.move_by_delta(x - self.pos[0], y - self.pos[1])
 
     def hit(self, foldername: str, frames=6) -> None:
         slash_delay = 50
-        if self.do_slash and pg.time.get_ticks() - self.last >= self.hit_delay:
+        tick = animation_clock.now
+        if self.do_slash and tick - self.last >= self.hit_delay:
             images = [SLASH_DIR + '/' + foldername + f'/File{j}.png' for j in range(1, frames + 1)]
-            tick = pg.time.get_ticks()
-            image = pg.transform.scale(pg.image.load(images[self.current_slash]), (32, 32))
+            image = load_image(images[self.current_slash])
             if tick - self.slash_tick >= slash_delay:
                 self.current_slash = (self.current_slash + 1) % frames
-                image = pg.transform.scale(pg.image.load(images[self.current_slash]), (32, 32))
-                self.slash_tick = pg.time.get_ticks()
+                image = load_image(images[self.current_slash])
+                self.slash_tick = tick
                 if self.current_slash == frames - 2:
                     global hp_lost
                     player.health -= 1
                     hp_lost += 1
-            if not self.flip:
-                screen.blit(image, (self.pos[0], self.pos[1] - 10))
-            else:
-                screen.blit(pg.transform.flip(image, flip_x=True, flip_y=False),
-                            (self.pos[0] - SPRITE_SIZE, self.pos[1] - 10))
+            self.draw_slash(image)
         if self.current_slash == frames - 1:
             all_music.slash_monster_music.play()
             self.current_slash = -1
             self.do_slash = False
-            self.last = pg.time.get_ticks()
+            self.last = tick
 
     def die(self):
         if not self.dead:
@@ -950,7 +1077,7 @@ class Button:
         Изменить группу картинок
     update() :
         Меняет изображение кнопки в зависимости от количества нажатий и
-        увеличивает или уменьшает y_pos.
+        увеличивает или уменьшает y_pos (при snap кнопка сразу встаёт на место).
     """
 
     def __init__(self, image: pg.Surface, pressed_image: pg.Surface,
@@ -990,8 +1117,10 @@ class Button:
             all_music.button_press_music.play()
         screen.blit(self.current_image, (self.x, self.y_pos))
 
-    def update(self) -> None:
-        if self.mouse_collide and self.y_pos >= 590:
+    def update(self, snap: bool = False) -> None:
+        if snap:
+            self.y_pos = 590 if self.mouse_collide else HEIGHT
+        elif self.mouse_collide and self.y_pos >= 590:
             self.y_pos -= PLAYER_SPEED
         elif self.y_pos <= HEIGHT and not self.mouse_collide:
             self.y_pos += PLAYER_SPEED
@@ -1040,8 +1169,8 @@ class ScreenDesigner:
 
     Атрибуты
     ------
-    font : Font
-        Пиксельный шрифт
+    font_size : int
+        Размер пиксельного шрифта надписей
     not_pressed : Surface
         Изображение кнопки в ненажатом состоянии
     pressed : Surface
@@ -1083,6 +1212,8 @@ class ScreenDesigner:
         Отрисовка кнопки для перехода на стартовый экран
     draw_title() :
         Отрисовка заголовка
+    render_title() :
+        Заголовок и его прямоугольник (для отрисовки слоем)
     draw_start_button() :
         Отрисовка кнопки для запуска уровня
     draw_level_button() :
@@ -1094,9 +1225,9 @@ class ScreenDesigner:
     """
 
     def __init__(self) -> None:
-        self.font = pg.font.Font(INTERFACE_DIR + '/EpilepsySans.ttf', 50)
-        self.not_pressed = pg.image.load(INTERFACE_DIR + '/UI_Flat_Banner_01_Upward.png')
-        self.pressed = pg.image.load(INTERFACE_DIR + '/UI_Flat_Banner_01_Downward.png')
+        self.font_size = 50
+        self.not_pressed = load_image(INTERFACE_DIR + '/UI_Flat_Banner_01_Upward.png')
+        self.pressed = load_image(INTERFACE_DIR + '/UI_Flat_Banner_01_Downward.png')
         self.start_button = Button(pg.transform.scale(self.not_pressed, (200, 100)),
                                    pg.transform.scale(self.pressed, (200, 100)), WIDTH // 2 - 100, HEIGHT // 2 - 60,
                                    select=pg.transform.scale(self.pressed, (200, 100)))
@@ -1135,7 +1266,7 @@ class ScreenDesigner:
         self.death_screen_created = False
 
     def render_start_window(self) -> None:
-        screen.blit(pg.transform.scale(pg.image.load(INTERFACE_DIR + '/start_screen_3.jpg'), (WIDTH, HEIGHT)), (0, 0))
+        screen.blit(pg.transform.scale(load_image(INTERFACE_DIR + '/start_screen_3.jpg'), (WIDTH, HEIGHT)), (0, 0))
         self.draw_title("Devil`s Massacre", WIDTH // 2, HEIGHT // 4)
         self.draw_exit_button(WIDTH // 2 - 100, HEIGHT // 2 + 165)
         self.draw_start_button()
@@ -1143,20 +1274,17 @@ class ScreenDesigner:
         self.draw_settings_button(WIDTH // 2 - 100, HEIGHT // 2 + 90)
 
     def render_settings_window(self, slider, cross_indexes, boxes_list, box_to_text) -> None:
-        font = pg.font.Font(INTERFACE_DIR + '/EpilepsySans.ttf', 25)
-        screen.blit(pg.transform.scale(pg.image.load(INTERFACE_DIR + '/start_screen_3.jpg'), (WIDTH, HEIGHT)), (0, 0))
+        screen.blit(pg.transform.scale(load_image(INTERFACE_DIR + '/start_screen_3.jpg'), (WIDTH, HEIGHT)), (0, 0))
         self.draw_back_button(WIDTH // 2 - 100, HEIGHT // 2 + 220)
         for k in cross_indexes:
-            screen.blit(pg.transform.scale(pg.image.load(
+            screen.blit(pg.transform.scale(load_image(
                 INTERFACE_DIR + '/UI_Flat_Cross_Large.png'), (33, 33)), (k[0], k[1]))
         for box in boxes_list:
-            text = font.render(box_to_text[box], True, pg.Color('bisque'))
+            text = fonts.render(box_to_text[box], 25, pg.Color('bisque'))
             screen.blit(text, (250, 105 + boxes_list.index(box) * 60))
             box.draw()
-        txt = font.render("Note: before using new settings, restart the game", True, pg.Color('red'))
-        screen.blit(txt, ((WIDTH - txt.get_width()) // 2, 50))
         slider.draw()
-        text = font.render("Music", True, pg.Color('bisque'))
+        text = fonts.render('Music', 25, pg.Color('bisque'))
         screen.blit(text, (250, 105 + 7 * 60))
 
     def render_pause_window(self) -> None:
@@ -1178,15 +1306,15 @@ class ScreenDesigner:
             self.draw_exit_button(self.exit_button.x, self.exit_button.y_pos)
 
     def render_level_window(self) -> None:
-        screen.blit(pg.transform.scale(pg.image.load(INTERFACE_DIR + '/start_screen_3.jpg'), (WIDTH, HEIGHT)), (0, 0))
+        screen.blit(pg.transform.scale(load_image(INTERFACE_DIR + '/start_screen_3.jpg'), (WIDTH, HEIGHT)), (0, 0))
         for btn in self.list_levels_buttons:
-            if f'level{self.list_levels_buttons.index(btn) + 1}' in available_levels:
+            if progress.is_unlocked(f'level{self.list_levels_buttons.index(btn) + 1}'):
                 btn.draw_changing_pic()
             else:
                 btn.draw_changing_pic()
                 self.draw_lock(btn.x, btn.y_pos)
-            screen.blit(self.font.render(f'Level {self.list_levels_buttons.index(btn) + 1}',
-                                         1, (0, 0, 0)), (btn.x + 43, btn.y_pos + 21))
+            screen.blit(fonts.render(f'Level {self.list_levels_buttons.index(btn) + 1}', self.font_size, (0, 0, 0)),
+                        (btn.x + 43, btn.y_pos + 21))
         self.draw_title('Choose level', WIDTH // 2, HEIGHT // 4)
         self.draw_menu_button(WIDTH // 2 - 100, HEIGHT // 4 + 70 * 3 + 80)
 
@@ -1205,11 +1333,11 @@ class ScreenDesigner:
         self.restart_button.x = x
         self.restart_button.y_pos = y
         self.restart_button.draw_changing_pic()
-        screen.blit(self.font.render('RETRY', 1, (0, 0, 0)),
+        screen.blit(fonts.render('RETRY', self.font_size, (0, 0, 0)),
                     (self.restart_button.x + 40, self.restart_button.y_pos + 22))
 
     def draw_choose_level_button(self, j: int, x: int, y: int) -> None:
-        text = self.font.render(f'Level {j + 1} ', 1, (0, 0, 0))
+        text = fonts.render(f'Level {j + 1} ', self.font_size, (0, 0, 0))
         self.level_button = Button(pg.transform.scale(self.not_pressed, (225, 100)),
                                    pg.transform.scale(self.pressed, (225, 100)), x, y,
                                    select=pg.transform.scale(self.pressed, (225, 100)))
@@ -1225,11 +1353,10 @@ class ScreenDesigner:
             if not inv[j]:
                 continue
             counter += 1
-            item_image = pg.transform.scale(pg.image.load(inv[j][0]), (90, 90))
+            item_image = pg.transform.scale(load_image(inv[j][0]), (90, 90))
             amount = len(inv[counter])
             if amount > 1:
-                font = pg.font.Font(None, 20)
-                rendered = font.render(f'x{amount}', 1, pg.Color('white'))
+                rendered = fonts.render(f'x{amount}', 20, pg.Color('white'), path=None)
                 item_image.blit(rendered, (item_image.get_width() - 20, 5))
             screen.blit(item_image, (x + item_image.get_width() * counter + (
                 45 if unique == 1 else -45 if unique == 3 else 0), y))
@@ -1238,52 +1365,54 @@ class ScreenDesigner:
         self.next_button.x = x
         self.next_button.y_pos = y
         self.next_button.draw_changing_pic()
-        screen.blit(self.font.render('NEXT LEVEL', 1, (0, 0, 0)),
+        screen.blit(fonts.render('NEXT LEVEL', self.font_size, (0, 0, 0)),
                     (self.next_button.x + 64, self.next_button.y_pos + 21))
 
     def draw_back_button(self, x: int, y: int):
         self.back_button.x = x
         self.back_button.y_pos = y
         self.back_button.draw_changing_pic()
-        screen.blit(self.font.render('BACK', 1, (0, 0, 0)), (x + 50, y + 21))
+        screen.blit(fonts.render('BACK', self.font_size, (0, 0, 0)), (x + 50, y + 21))
 
     def draw_settings_button(self, x: int, y: int):
         self.settings_button.x = x
         self.settings_button.y_pos = y
         self.settings_button.draw_changing_pic()
-        screen.blit(self.font.render('SETS', 1, (0, 0, 0)),
+        screen.blit(fonts.render('SETS', self.font_size, (0, 0, 0)),
                     (x + 55, y + 21))
 
     def draw_menu_button(self, x: int, y: int) -> None:
         self.menu_button.x = x
         self.menu_button.y_pos = y
         self.menu_button.draw_changing_pic()
-        screen.blit(self.font.render('MENU', 1, (0, 0, 0)), (x + 43, y + 21))
+        screen.blit(fonts.render('MENU', self.font_size, (0, 0, 0)), (x + 43, y + 21))
 
     def draw_title(self, text_in: str, x: int, y: int) -> None:
-        text = self.font.render(text_in, True, pg.Color('bisque'))
-        text_rect = text.get_rect(center=(x, y))
-        screen.blit(text, text_rect)
+        screen.blit(*self.render_title(text_in, x, y))
+
+    def render_title(self, text_in: str, x: int, y: int) -> tuple[pg.Surface, pg.Rect]:
+        text = fonts.render(text_in, self.font_size, pg.Color('bisque'))
+        return text, text.get_rect(center=(x, y))
 
     def draw_start_button(self) -> None:
         self.start_button.draw_changing_pic()
-        screen.blit(self.font.render('START', 1, (0, 0, 0)),
+        screen.blit(fonts.render('START', self.font_size, (0, 0, 0)),
                     (self.start_button.x + 42, self.start_button.y_pos + 21))
 
     def draw_level_button(self) -> None:
         self.level_button.draw_changing_pic()
-        screen.blit(self.font.render('LEVEL', 1, (0, 0, 0)),
+        screen.blit(fonts.render('LEVEL', self.font_size, (0, 0, 0)),
                     (self.level_button.x + 42, self.level_button.y_pos + 21))
 
     def draw_exit_button(self, x: int, y: int) -> None:
         self.exit_button.x = x
         self.exit_button.y_pos = y
         self.exit_button.draw_changing_pic()
-        screen.blit(self.font.render('EXIT', 1, (0, 0, 0)),
+        screen.blit(fonts.render('EXIT', self.font_size, (0, 0, 0)),
                     (x + 65, y + 21))
 
     def draw_lock(self, x: int, y: int):
-        img = pg.transform.scale(pg.image.load(INTERFACE_DIR + '/lock.png'), (64, 64))
+        img = pg.transform.scale(load_image(INTERFACE_DIR + '/lock.png'), (64, 64))
         screen.blit(img, (x + 80, y + 15))
 
 
@@ -1301,8 +1430,8 @@ class InputBox:
         Цвет поля, если оно выбрано
     text : str
         Текст в поле
-    font : Font
-        Шрифт текста в поле
+    font_size : int
+        Размер шрифта текста в поле
     active : bool
         Активно ли поле, или же нет
 
@@ -1320,7 +1449,7 @@ class InputBox:
         self.color_active = pg.Color('bisque')
         self.color = self.color_inactive
         self.text = ''
-        self.font = pg.font.Font(INTERFACE_DIR + '/EpilepsySans.ttf', font_size)
+        self.font_size = font_size
         self.active = False
 
     def handle_event(self, event):
@@ -1352,9 +1481,8 @@ class InputBox:
                                 self.text = 'K_RSHIFT'
 
     def draw(self):
-        width = max(200, self.font.size(self.text)[0] + 10)
-        self.rect.w = width
-        text_surface = self.font.render(self.text, True, pg.Color('white'))
+        text_surface = fonts.render(self.text, self.font_size, pg.Color('white'))
+        self.rect.w = max(200, text_surface.get_width() + 10)
         screen.blit(text_surface, (self.rect.x + 5, self.rect.y + 5))
         pg.draw.rect(screen, self.color, self.rect, 2)
 
@@ -1395,6 +1523,8 @@ class Music:
         Звук подбора других предметов
     list_music : list
         Вся музыка
+    dispatcher : SoundDispatcher
+        Раздаёт звукам каналы микшера по категориям
 
     Методы
     ------
@@ -1403,23 +1533,34 @@ class Music:
     """
 
     def __init__(self):
-        self.slash_player_music = make_music_file('energichnyiy-rezkiy-vzmah-mechom.ogg')
-        self.slash_monster_music = make_music_file('rezkiy-vzmah-mechom.ogg')
-        self.death_monster_music = make_music_file('kriper-smert.ogg')
-        self.use_current_item_music = make_music_file('zvuk-kogda-zakinuli-ryukzak-na-plecho.ogg')
-        self.throw_item_music = make_music_file('shumnyiy-sbros-ryukzaka-s-plecha.ogg')
-        self.door_opened_music = make_music_file('otkryivanie-i-zakryivanie-dverey-sborka-31873.ogg')
-        self.door_opened_music = make_buffer(self.door_opened_music.get_raw()[0:80000])
-        self.chest_opened_music = make_music_file('inecraft_chest_open.ogg')
-        self.finish_window_music = make_music_file('e5d80a096ce432d.mp3')
-        self.death_window_music = make_music_file('1de2d2611347013.mp3')
-        self.button_press_music = make_music_file('kompyuternaya-klaviatura-odinochnoe-najatie-klavish-38325.mp3')
-        self.button_press_music = make_buffer(self.button_press_music.get_raw()[70000:80000])
-        self.level_window_music = make_music_file('silent.wav')  # 'e74ba825d98595d.mp3'
-        self.start_window_music = make_music_file('449359103103a80.mp3')
-        self.pickup_coin_music = make_music_file('d212724b45e541e.mp3')
-        self.pickup_other_music = make_music_file('11986c2f439eb45.mp3')
-        self.list_music = [attr_value for attr_name, attr_value in self.__dict__.items()]
+        self.dispatcher = SoundDispatcher()
+        register = self.dispatcher.register
+        self.slash_player_music = register(make_music_file('energichnyiy-rezkiy-vzmah-mechom.ogg'),
+                                           'combat', max_voices=2, min_interval=60, priority=3)
+        self.slash_monster_music = register(make_music_file('rezkiy-vzmah-mechom.ogg'),
+                                            'combat', max_voices=2, min_interval=80, priority=2)
+        self.death_monster_music = register(make_music_file('kriper-smert.ogg'),
+                                            'combat', max_voices=2, min_interval=100, priority=4)
+        self.use_current_item_music = register(make_music_file('zvuk-kogda-zakinuli-ryukzak-na-plecho.ogg'),
+                                               'pickup', priority=2)
+        self.throw_item_music = register(make_music_file('shumnyiy-sbros-ryukzaka-s-plecha.ogg'),
+                                         'pickup', priority=2)
+        door_opened = make_music_file('otkryivanie-i-zakryivanie-dverey-sborka-31873.ogg')
+        self.door_opened_music = register(make_buffer(door_opened.get_raw()[0:80000]), 'interface', priority=3)
+        self.chest_opened_music = register(make_music_file('inecraft_chest_open.ogg'), 'interface', priority=2)
+        self.finish_window_music = register(make_music_file('e5d80a096ce432d.mp3'), 'music', priority=5)
+        self.death_window_music = register(make_music_file('1de2d2611347013.mp3'), 'music', priority=5)
+        button_press = make_music_file('kompyuternaya-klaviatura-odinochnoe-najatie-klavish-38325.mp3')
+        self.button_press_music = register(make_buffer(button_press.get_raw()[70000:80000]),
+                                           'interface', max_voices=1, min_interval=40, priority=1)
+        self.level_window_music = register(make_music_file('silent.wav'), 'music', priority=5)  # 'e74ba825d98595d.mp3'
+        self.start_window_music = register(make_music_file('449359103103a80.mp3'), 'music', priority=5)
+        self.pickup_coin_music = register(make_music_file('d212724b45e541e.mp3'),
+                                          'pickup', max_voices=2, min_interval=50, priority=1)
+        self.pickup_other_music = register(make_music_file('11986c2f439eb45.mp3'),
+                                           'pickup', max_voices=2, min_interval=50, priority=1)
+        self.list_music = [attr_value for attr_value in self.__dict__.values()
+                           if isinstance(attr_value, DispatchedSound)]
 
     def change_all_volumes(self):
         for j in self.list_music:
@@ -1433,7 +1574,7 @@ def make_music_file(file: str) -> pg.mixer.Sound:
     :returns: Звук, используемый в pygame
     """
 
-    return pg.mixer.Sound(f'music/{file}')
+    return load_sound(f'{MUSIC_DIR}/{file}')
 
 
 def make_buffer(array: bytes):
@@ -1446,11 +1587,12 @@ def make_buffer(array: bytes):
     return pg.mixer.Sound(buffer=array)
 
 
-def move_by_pointer(obj, to_where: tuple[int, int]) -> None:
+def move_by_pointer(obj, to_where: tuple[int, int], wait: bool = True) -> None:
     """
     Передвигает объект к указанной точке
     :param obj: Передвигаемый объект
     :param to_where: Куда передвинуть
+    :param wait: Считать ли путь в этом кадре (иначе - в фоновом потоке)
     :returns: None
     """
 
@@ -1494,13 +1636,35 @@ def move_by_pointer(obj, to_where: tuple[int, int]) -> None:
                 obj.collide_vertex = obj.get_right_down_cell()
             else:
                 obj.collide_vertex = obj.get_center_cell()
-        next_pos = castle.find_path_step(obj.collide_vertex, to_where)
+        next_pos = castle.find_path_step(obj.collide_vertex, to_where, wait)
         dir_x, dir_y = next_pos[0] - obj.collide_vertex[0], next_pos[1] - obj.collide_vertex[1]
         obj.current_direction = (dir_x, dir_y)
         obj.flip = dir_x < 0
         obj.move_by_delta(dx=dir_x * PLAYER_SPEED, dy=dir_y * PLAYER_SPEED)
 
 
+def scene_events(scene: str) -> list[pg.event.Event]:
+    """
+    События кадра сцены. Заодно отмечает кадр для профилировщика;
+    клавиша профилирования обрабатывается здесь и в сцену не попадает.
+    :param scene: Имя сцены
+    :returns: Список событий
+    """
+
+    global frames_played
+    profiler.enter(scene)
+    frames_played += 1
+    if frame_limit is not None and frames_played > frame_limit:
+        terminate()
+    events = []
+    for event in pg.event.get():
+        if event.type == pg.KEYDOWN and controls.keys.get(event.key) == 'profile':
+            profiler.toggle()
+        else:
+            events.append(event)
+    return events
+
+
 def start_window() -> None:
     """
     Работа стартового экрана
@@ -1511,7 +1675,7 @@ def start_window() -> None:
     if len(animated_sprites) != 0:
         fade_screen('menu')
     while True:
-        for evt in pg.event.get():
+        for evt in scene_events('menu'):
             if evt.type == pg.QUIT:
                 terminate()
                 break
@@ -1527,7 +1691,7 @@ def start_window() -> None:
                     terminate()
                     break
         start_menu.render_start_window()
-        pg.display.flip()
+        backend.present()
 
 
 def finish_window(play_time: float) -> None:
@@ -1537,24 +1701,38 @@ def finish_window(play_time: float) -> None:
     :returns: None
     """
 
-    global level, available_levels, n_level, hp_lost
+    global level, n_level
     window = ScreenDesigner()
-    text_copy_created = False
-    screen_cpy = screen.copy()
-    text_copy = screen.copy()
-    copy_created = False
+    layers = Compositor((WIDTH, HEIGHT), ['snapshot', 'dim', 'text'])
+    layers.set('snapshot', [(backend.snapshot(), (0, 0))])
     surf_alpha = pg.Surface((WIDTH, HEIGHT))
     alpha = 1
-    available_levels.append(level)
-    tick = pg.time.get_ticks()
+    surf_alpha.set_alpha(alpha)
+    layers.set('dim', [(surf_alpha, (0, 0))])
+    finished = level
+    progress.unlock(level)
+    tick = animation_clock.now
     try:
-        available_levels.append(list_of_levels[list_of_levels.index(level) + 1])
-        level = available_levels[-1]
+        level = list_of_levels[list_of_levels.index(level) + 1]
+        progress.unlock(level)
     except IndexError:
         pass
+    count_collected, count_coins = count_inventory()
+    score_value = score_formula(count_killed, count_coins, hp_lost, play_time, count_collected)
+    # Одни и те же показатели этого забега (счётчики обнуляются в run_level) идут в журнал и в таблицу рекордов
+    run_fields = dict(killed=count_killed, coins=count_coins, hp_lost=hp_lost, play_time=play_time,
+                      collected=count_collected)
+    telemetry.end('finished', score=score_value, **run_fields, **take_run_fields())
+    best = progress.best(finished)
+    progress.add_score(finished, score_value, seed=castle.seed, **run_fields)
+    progress.flush()
+    score = f'Score: {score_value} ' + ('(new best!)' if best is None or score_value > best else f'(best {best})')
     all_music.finish_window_music.play(-1)
     while True:
-        for evt in pg.event.get():
+        events = scene_events('finish')
+        if bot is not None and window.next_button.y_pos > HEIGHT // 4 + 150:
+            events += bot.menu_click(window.next_button)
+        for evt in events:
             if evt.type == pg.QUIT:
                 terminate()
                 break
@@ -1568,41 +1746,60 @@ def finish_window(play_time: float) -> None:
                 if window.next_button.rect.collidepoint(evt.pos):
                     all_music.finish_window_music.stop()
                     n_level += 1
-                    if n_level == 5:
+                    if n_level == 5 and bot is None:
                         start_window()
                     else:
                         run_level(level)
-        window.render_finish_window()
-        if not copy_created:
-            screen_cpy = screen.copy()
-            copy_created = True
-        if window.next_button.y_pos <= HEIGHT // 4 + 150:
-            animate_buttons([window.next_button, window.exit_button, window.menu_button])
-        elif pg.time.get_ticks() - tick >= 50 and copy_created:
-            window.current_ind[1] += 1
-            tick = pg.time.get_ticks()
-            count_collected = 0
-            count_coins = 0
-            for item in player.inventory.items_images[1::]:
-                count_collected += len(item)
-                for j in item:
-                    if 'coin' in j:
-                        count_coins += 1
-            window.draw_title(f'Level complete!'[window.current_ind[0]:window.current_ind[1]], WIDTH // 2, HEIGHT // 4)
-            window.draw_title(f'Score: {score_formula(count_killed, count_coins, hp_lost, play_time, count_collected)}'
-                              [window.current_ind[0]:window.current_ind[1]],
-                              WIDTH // 2, HEIGHT // 4 + 50)
-            text_copy = screen.copy()
-            text_copy_created = True
-        if text_copy_created:
-            screen.blit(text_copy, (0, 0))
-        pg.display.flip()
-        clock.tick(FPS)
         if alpha < 128:
             alpha += 3
             surf_alpha.set_alpha(alpha)
-        screen.blit(screen_cpy, (0, 0))
-        screen.blit(surf_alpha, (0, 0))
+            layers.touch('dim')
+        if window.next_button.y_pos <= HEIGHT // 4 + 150:
+            animate_buttons([window.next_button, window.exit_button, window.menu_button])
+        elif animation_clock.now - tick >= 50:
+            window.current_ind[1] += 1
+            tick = animation_clock.now
+            layers.set('text', [
+                window.render_title('Level complete!'[window.current_ind[0]:window.current_ind[1]],
+                                    WIDTH // 2, HEIGHT // 4),
+                window.render_title(score[window.current_ind[0]:window.current_ind[1]], WIDTH // 2, HEIGHT // 4 + 50)
+            ])
+        layers.draw(screen)
+        window.render_finish_window()
+        backend.present()
+        clock.tick(fps)
+        animation_clock.tick()
+
+
+def count_inventory() -> tuple[int, int]:
+    """
+    Подсчёт собранного игроком (без оружия).
+    :returns: Количество собранных предметов и количество монет среди них
+    """
+
+    count_collected = 0
+    count_coins = 0
+    for item in player.inventory.items_images[1::]:
+        count_collected += len(item)
+        for j in item:
+            if 'coin' in j:
+                count_coins += 1
+    return count_collected, count_coins
+
+
+def take_run_fields() -> dict:
+    """
+    Забирает показатели регулятора качества и рассылки снимков за забег для журнала
+    (и начинает считать их заново).
+    :returns: Поля записи журнала
+    """
+
+    fields = quality.summary()
+    quality.reset()
+    if coop is not None:
+        fields.update(coop.stats.summary(coop.tick_rate))
+        coop.stats = NetStats()
+    return fields
 
 
 def score_formula(killed: int, count_coins: int, lost: int,  playtime: float, collected: int) -> float:
@@ -1628,7 +1825,7 @@ def level_window() -> None:
     global level, n_level
     window = ScreenDesigner()
     while True:
-        for evt in pg.event.get():
+        for evt in scene_events('level_select'):
             if evt.type == pg.QUIT:
                 terminate()
                 break
@@ -1638,11 +1835,11 @@ def level_window() -> None:
                 if any([j.rect.collidepoint(evt.pos) for j in window.list_levels_buttons]):
                     n_level = [j.rect.collidepoint(evt.pos) for j in window.list_levels_buttons].index(True)
                     level = list_of_levels[n_level]
-                    if level in available_levels:
+                    if progress.is_unlocked(level):
                         all_music.start_window_music.stop()
                         run_level(level)
         window.render_level_window()
-        pg.display.flip()
+        backend.present()
 
 
 def settings_window() -> None:
@@ -1662,8 +1859,8 @@ def settings_window() -> None:
         boxes_list[6]: 'Pause'
     }
     cross_indexes = list()
-    for k in range(7):
-        boxes_list[k].text = text_names[k]
+    for k, action in enumerate(ACTIONS):
+        boxes_list[k].text = controls.names[action]
     window = ScreenDesigner()
     slider = Slider(400, 530, 200, 10)
     pressed = False
@@ -1671,16 +1868,15 @@ def settings_window() -> None:
         texts = [k.text for k in boxes_list]
         if all(texts) and not len(set(texts)) < len(texts):
             cross_indexes.clear()
-        for evt in pg.event.get():
+        for evt in scene_events('settings'):
             if evt.type == pg.QUIT:
                 terminate()
                 break
             elif evt.type == pg.MOUSEBUTTONDOWN:
                 if window.back_button.rect.collidepoint(evt.pos):
                     if all(texts) and not len(set(texts)) < len(texts):
-                        with open('config/cfg.txt', 'w', encoding='utf8') as save_cfg:
-                            out = ', '.join([field.text for field in boxes_list]) + ', ' + str(music)
-                            save_cfg.write(out)
+                        controls.bind(texts)
+                        controls.save('config/cfg.txt', music)
                         return
                     else:
                         for ind, t in enumerate(boxes_list):
@@ -1696,7 +1892,7 @@ def settings_window() -> None:
             for box in boxes_list:
                 box.handle_event(evt)
         window.render_settings_window(slider, cross_indexes, boxes_list, box_to_text)
-        pg.display.flip()
+        backend.present()
 
 
 def pause_window(pause_button: Button) -> None:
@@ -1707,37 +1903,43 @@ def pause_window(pause_button: Button) -> None:
     """
 
     pause_menu = ScreenDesigner()
-    screen_cpy = screen.copy()
+    screen_cpy = backend.snapshot()
+    animation_clock.pause()
     all_music.start_window_music.play(-1)
     while True:
-        for evt in pg.event.get():
+        for evt in scene_events('pause'):
             if evt.type == pg.QUIT:
                 terminate()
                 break
             elif evt.type == pg.KEYDOWN:
                 all_music.start_window_music.stop()
-                if evt.key == pause:
+                if controls.keys.get(evt.key) == 'pause':
                     pause_button.clicks += 1
             elif evt.type == pg.MOUSEBUTTONDOWN:
                 if pause_button.rect.collidepoint(evt.pos) and evt.button == 1:
                     all_music.start_window_music.stop()
                     pause_button.clicks += 1
                 if pause_menu.menu_button.rect.collidepoint(evt.pos):
+                    # Из меню пауза уже не снимается: часы запускаются до выхода с экрана
+                    animation_clock.resume()
                     start_window()
                 if pause_menu.exit_button.rect.collidepoint(evt.pos):
+                    animation_clock.resume()
                     terminate()
                     break
                 if pause_menu.settings_button.rect.collidepoint(evt.pos):
                     settings_window()
         pause_button.y_pos = 590
         if pause_button.unpause:
+            animation_clock.resume()
             all_music.level_window_music.play(-1)
             return
         screen.blit(screen_cpy, (0, 0))
         pause_menu.render_pause_window()
         pause_button.update()
-        pg.display.flip()
-        clock.tick(FPS)
+        backend.present()
+        clock.tick(fps)
+        animation_clock.tick()
 
 
 def death_window(lvl: str) -> None:
@@ -1748,54 +1950,52 @@ def death_window(lvl: str) -> None:
     """
 
     death_menu = ScreenDesigner()
+    layers = Compositor((WIDTH, HEIGHT), ['snapshot', 'dim', 'text'])
+    layers.set('snapshot', [(backend.snapshot(), (0, 0))])
     surf_alpha = pg.Surface((WIDTH, HEIGHT))
     surf_alpha.set_alpha(1)
+    layers.set('dim', [(surf_alpha, (0, 0))])
     count = -1
-    copy_created = False
-    text_copy_created = False
-    screen_cpy = screen.copy()
-    text_copy = screen.copy()
-    tick = pg.time.get_ticks()
+    tick = animation_clock.now
     all_music.death_window_music.play(-1)
     while True:
         count += 1
-        for evt in pg.event.get():
+        events = scene_events('death')
+        if bot is not None and count >= 30:
+            events += bot.menu_click(death_menu.start_button)
+        for evt in events:
             if evt.type == pg.QUIT:
                 terminate()
                 break
             elif evt.type == pg.MOUSEBUTTONDOWN:
                 if death_menu.start_button.rect.collidepoint(evt.pos):
                     all_music.death_window_music.stop()
-                    run_level(lvl)
+                    run_level(lvl, restart=True)
                 if death_menu.menu_button.rect.collidepoint(evt.pos):
                     all_music.death_window_music.stop()
                     start_window()
                 if death_menu.exit_button.rect.collidepoint(evt.pos):
                     terminate()
                     break
-        if count == 30:
-            if not copy_created:
-                screen_cpy = screen.copy()
-                copy_created = True
-            death_menu.render_death_window()
         if count <= 30 and count % 2 == 0:
-            screen.blit(surf_alpha, (0, 0))
-        if copy_created:
-            screen.blit(screen_cpy, (0, 0))
+            # Постепенное затемнение, как от наложения полупрозрачного слоя каждые два кадра
+            surf_alpha.set_alpha(count // 2 + 1)
+            layers.touch('dim')
+        layers.draw(screen)
+        if count >= 30:
             death_menu.render_death_window()
-        if death_menu.restart_button.y_pos <= HEIGHT // 2 - 60:
-            animate_buttons([death_menu.restart_button, death_menu.menu_button, death_menu.exit_button])
-        elif pg.time.get_ticks() - tick >= 50 and copy_created:
-            death_menu.current_ind[1] += 1
-            tick = pg.time.get_ticks()
-            death_menu.draw_title(death_menu.death_text[death_menu.current_ind[0]:death_menu.current_ind[1]],
-                                  WIDTH // 2, HEIGHT // 4)
-            text_copy = screen.copy()
-            text_copy_created = True
-        if text_copy_created:
-            screen.blit(text_copy, (0, 0))
-        pg.display.flip()
-        clock.tick(FPS)
+            if death_menu.restart_button.y_pos <= HEIGHT // 2 - 60:
+                animate_buttons([death_menu.restart_button, death_menu.menu_button, death_menu.exit_button])
+            elif animation_clock.now - tick >= 50:
+                death_menu.current_ind[1] += 1
+                tick = animation_clock.now
+                layers.set('text', [
+                    death_menu.render_title(death_menu.death_text[death_menu.current_ind[0]:death_menu.current_ind[1]],
+                                            WIDTH // 2, HEIGHT // 4)
+                ])
+        backend.present()
+        clock.tick(fps)
+        animation_clock.tick()
 
 
 def add_items() -> None:
@@ -1807,36 +2007,109 @@ def add_items() -> None:
     # Считываем координаты для анимированных декораций из json
     with open(f'maps/{level}/elements_pos.json', 'r', encoding='utf8') as jsonf:
         coordinates = json.load(jsonf)
+    castle.layout = coordinates
+    castle.placed = dict()
     for elem, crd in coordinates.items():
         for pos in crd:
-            pos_x, pos_y = pos[0] * SPRITE_SIZE, pos[1] * SPRITE_SIZE
-            if elem == 'torches':
-                Torch(pos_x, pos_y, 'torch')
-            elif elem == 'side-torches':
-                Torch(pos_x, pos_y, 'side_torch')
-            elif elem == 'coins':
-                Coin(pos_x, pos_y, 'coin')
-            elif elem == 'teleport-flasks':
-                TeleportFlask(pos_x, pos_y, 'flasks_2')
-            elif elem == 'heal-flasks':
-                HealFlask(pos_x, pos_y, 'flasks_4')
-            elif elem == 'key':
-                Key(pos_x, pos_y, 'keys_2')
-            elif elem == 'big-chests':
-                Chest(pos_x, pos_y, 'chest')
-            elif elem == 'candle-stick':
-                Torch(pos_x, pos_y, 'candlestick_2')
-            elif elem == 'flag':
-                Flag(pos_x, pos_y, 'flag')
-            elif elem == 'skulls':
-                x = Monster(pos_x, pos_y, 'skull_v2')
-                x.flip = random.randint(0, 1)
-            elif elem == 'skeleton1':
-                x = Monster(pos_x, pos_y, 'skeleton_v2')
-                x.flip = random.randint(0, 1)
-            elif elem == 'vampire':
-                x = Monster(pos_x, pos_y, 'vampire_v2')
-                x.flip = random.randint(0, 1)
+            place_element(elem, tuple(pos))
+
+
+def place_element(elem: str, cell: tuple[int, int]) -> AnimatedObject | None:
+    """
+    Ставит на карту объект из расстановки уровня и запоминает его в castle.placed.
+    :param elem: Вид объекта (ключ elements_pos.json)
+    :param cell: Клетка
+    :returns: Объект (None для неизвестного вида)
+    """
+
+    pos_x, pos_y = cell[0] * SPRITE_SIZE, cell[1] * SPRITE_SIZE
+    if elem == 'torches':
+        x = Torch(pos_x, pos_y, 'torch')
+    elif elem == 'side-torches':
+        x = Torch(pos_x, pos_y, 'side_torch')
+    elif elem == 'coins':
+        x = Coin(pos_x, pos_y, 'coin')
+    elif elem == 'teleport-flasks':
+        x = TeleportFlask(pos_x, pos_y, 'flasks_2')
+    elif elem == 'heal-flasks':
+        x = HealFlask(pos_x, pos_y, 'flasks_4')
+    elif elem == 'key':
+        x = Key(pos_x, pos_y, 'keys_2')
+    elif elem == 'big-chests':
+        x = Chest(pos_x, pos_y, 'chest')
+    elif elem == 'candle-stick':
+        x = Torch(pos_x, pos_y, 'candlestick_2')
+    elif elem == 'flag':
+        x = Flag(pos_x, pos_y, 'flag')
+    elif elem == 'skulls':
+        x = Monster(pos_x, pos_y, 'skull_v2')
+        x.flip = random.randint(0, 1)
+    elif elem == 'skeleton1':
+        x = Monster(pos_x, pos_y, 'skeleton_v2')
+        x.flip = random.randint(0, 1)
+    elif elem == 'vampire':
+        x = Monster(pos_x, pos_y, 'vampire_v2')
+        x.flip = random.randint(0, 1)
+    else:
+        return None
+    castle.placed.setdefault((elem, cell), []).append(x)
+    return x
+
+
+def light_level() -> Lighting:
+    """
+    Запекает освещение уровня по факелам, стоящим на карте.
+    :returns: Освещение
+    """
+
+    return Lighting(castle.walkable, [
+        ((int(sprite.pos[0] // SPRITE_SIZE), int(sprite.pos[1] // SPRITE_SIZE)), LIGHT_RADII[sprite.filename])
+        for sprite in entities.of(Torch)])
+
+
+def hot_reload() -> None:
+    """
+    Обновляет идущий уровень по сохранённым файлам карты и расстановки (ключ --watch).
+    Файл, который не удалось прочитать, пропускается до следующего сохранения.
+    :returns: None
+    """
+
+    for name in watcher.poll():
+        path = watcher.paths[name]
+        try:
+            if name == 'map':
+                tiled_map = load_map(path)
+                cells = diff_tiles(castle.map, tiled_map)
+                if cells is None:
+                    print(f'hot reload: {path}: map size changed, restart the level to apply')
+                    continue
+                walls_changed = castle.update_tiles(tiled_map, cells)
+                if walls_changed:
+                    castle.lighting = light_level()
+                print(f'hot reload: {path}: {len(cells)} tiles, {len(walls_changed)} walls')
+            else:
+                with open(path, encoding='utf8') as jsonf:
+                    layout = json.load(jsonf)
+                removed, added = diff_layout(castle.layout, layout)
+                relight = False
+                for elem, cell in removed:
+                    sprites = castle.placed.get((elem, cell))
+                    if sprites:
+                        sprite = sprites.pop()
+                        relight = relight or isinstance(sprite, Torch)
+                        # Поднятые и убитые объекты уже не на карте
+                        sprite.kill()
+                for elem, cell in added:
+                    sprite = place_element(elem, cell)
+                    relight = relight or isinstance(sprite, Torch)
+                castle.layout = layout
+                # Снимок для перезапуска помнит прежнюю расстановку: перезапуск загрузит уровень заново
+                castle.snapshot = None
+                if relight:
+                    castle.lighting = light_level()
+                print(f'hot reload: {path}: {len(removed)} removed, {len(added)} added')
+        except (OSError, ValueError, KeyError, SyntaxError) as error:
+            print(f'hot reload: {path}: {error}')
 
 
 def spawn_object(elem_dir: str, from_chest: bool = False) -> None:
@@ -1860,11 +2133,11 @@ def spawn_object(elem_dir: str, from_chest: bool = False) -> None:
     else:
         spawn_pos = player.get_left_up_cell()[0] * SPRITE_SIZE, player.get_left_up_cell()[1] * SPRITE_SIZE
     if 'coin' in elem_dir:
-        Coin(spawn_pos[0], spawn_pos[1], 'coin')
+        sprite_pool.acquire(Coin, spawn_pos[0], spawn_pos[1], 'coin')
     elif 'flasks_2' in elem_dir:
-        TeleportFlask(spawn_pos[0], spawn_pos[1], 'flasks_2')
+        sprite_pool.acquire(TeleportFlask, spawn_pos[0], spawn_pos[1], 'flasks_2')
     elif 'flasks_4' in elem_dir:
-        HealFlask(spawn_pos[0], spawn_pos[1], 'flasks_4')
+        sprite_pool.acquire(HealFlask, spawn_pos[0], spawn_pos[1], 'flasks_4')
 
 
 def animate_buttons(buttons: list[Button]):
@@ -1884,15 +2157,7 @@ def clear_all_groups() -> None:
     :returns: None
     """
 
-    chests.empty()
-    coins.empty()
-    animated_sprites.empty()
-    flasks.empty()
-    can_be_opened.empty()
-    keys_group.empty()
-    can_be_picked_up.empty()
-    in_chests.empty()
-    enemies.empty()
+    entities.reset()
 
 
 def show_exit_text() -> None:
@@ -1901,63 +2166,72 @@ def show_exit_text() -> None:
     :return: None
     """
 
-    font = pg.font.Font(INTERFACE_DIR + '/EpilepsySans.ttf', 20)
-    rendered = font.render('Press "E" to exit level', 1, pg.Color('white'))
+    rendered = fonts.render('Press "E" to exit level', 20, pg.Color('white'))
     screen.blit(rendered, (player.pos[0] - (rendered.get_size()[0] - SPRITE_SIZE) // 2, player.pos[1] - 20))
 
 
-def fade_screen(end_window: str) -> None:
+def fade_screen(end_window: str) -> float:
     """
     Работа экрана при анимации затемнения.
     :param end_window: Указывает на окно после анимации
-    :returns: None
+    :returns: Время создания новой сцены в секундах (без ожидания кадров анимации)
     """
 
     fade_surface = pg.Surface(screen.get_size())
     fade_surface.fill(pg.Color('black'))
+    layers = Compositor(screen.get_size(), ['snapshot', 'dim'])
+    layers.set('snapshot', [(backend.snapshot(), (0, 0))])
+    layers.set('dim', [(fade_surface, (0, 0))])
     alpha = 1
+    visible = 1.0  # доля яркости снимка, оставшаяся после затемнения
     fade_back = False
     create = True
-    start_menu = ScreenDesigner()
+    create_time = 0.0
     while True:
-        for e in pg.event.get():
+        for e in scene_events('fade'):
             if e.type == pg.QUIT:
                 terminate()
                 break
         if not fade_back:
             alpha += 1
-            fade_surface.set_alpha(alpha)
-            screen.blit(fade_surface, (0, 0))
+            # Такое же затемнение, как от наложения слоя с прозрачностью alpha в каждом кадре
+            visible *= 1 - alpha / 255
+            fade_surface.set_alpha(round(255 * (1 - visible)))
             if alpha == 50:
                 fade_back = True
                 alpha = 255
         else:
             alpha -= 5
             if create:
+                # Сцена рисуется один раз и дальше проявляется как неподвижный снимок
+                create_start = time.perf_counter()
                 if end_window == 'level':
                     add_items()
                     Player(2 * SPRITE_SIZE, 2 * SPRITE_SIZE, 'priest3_v2')
-                    create = False
+                    castle.render()
                 elif end_window == 'menu':
                     animated_sprites.empty()
-                    start_menu.render_start_window()
-            if end_window == 'level':
-                castle.render()
-            for sp in animated_sprites:
-                sp.animate()
+                    ScreenDesigner().render_start_window()
+                animation_clock.step(animated_sprites)
+                for sp in animated_sprites:
+                    sp.draw()
+                layers.set('snapshot', [(backend.snapshot(), (0, 0))])
+                create_time = time.perf_counter() - create_start
+                create = False
             fade_surface.set_alpha(alpha)
-            screen.blit(fade_surface, (0, 0))
+        layers.touch('dim')
+        layers.draw(screen)
 
         if alpha == 0:
-            for sp in animated_sprites:
-                if isinstance(sp, Player):
-                    sp.kill()
-            return
-        pg.display.flip()
-        clock.tick(FPS)
+            for sp in entities.of(Player):
+                sp.kill()
+            return create_time
+        backend.present()
+        clock.tick(fps)
+        animation_clock.tick()
 
 
-def run_level(lvl: str) -> None:
+def run_level(lvl: str, restart: bool = False) -> None:
     """
     Запуск уровня
 
@@ -1965,64 +2239,105 @@ def run_level(lvl: str) -> None:
     ------
     lvl : str
         Уровень, который нужно запустить
+    restart : bool
+        Перезапуск после смерти: уровень возвращается к снимку начального состояния
+        без загрузки карты и объектов
     :returns: None
     """
 
-    global throw, player, castle
-    clear_all_groups()
-    for j in animated_sprites:
-        if isinstance(j, Player):
-            j.kill()
-    castle = Castle(lvl, lvl + '.tmx')
-    pause_button = Button(pg.transform.scale(
-        pg.image.load(
-            INTERFACE_DIR + '/UI_Flat_Button_Large_Lock_01a1.png'), (50, 50)),
-        pg.transform.scale(pg.image.load(
-            INTERFACE_DIR + '/UI_Flat_Button_Large_Lock_01a2.png'), (50, 50)), 745)
-    fade_screen('level')
-    player = Player(2 * SPRITE_SIZE, 2 * SPRITE_SIZE, 'priest3_v2')
+    global throw, player, castle, guest, count_killed, hp_lost
+    load_start = time.perf_counter()
+    # Счёт, журнал забегов и таблица рекордов считают убитых и потерянное здоровье за один забег
+    count_killed = hp_lost = 0
+    # Уровень всегда начинается с идущими часами, каким бы путём из паузы сюда ни попали
+    animation_clock.resume()
+    restart = restart and castle is not None and castle.name == lvl and castle.snapshot is not None
+    if restart:
+        castle.snapshot.restore()
+        pause_button = castle.snapshot.objects['pause_button']
+        load_time = time.perf_counter() - load_start
+    else:
+        clear_all_groups()
+        if castle is not None:
+            castle.path_worker.stop()
+        castle = Castle(lvl, lvl + '.tmx')
+        pause_button = Button(pg.transform.scale(
+            load_image(
+                INTERFACE_DIR + '/UI_Flat_Button_Large_Lock_01a1.png'), (50, 50)),
+            pg.transform.scale(load_image(
+                INTERFACE_DIR + '/UI_Flat_Button_Large_Lock_01a2.png'), (50, 50)), 745)
+        castle.seed = seed if seed is not None else random.randrange(1 << 32)
+        random.seed(castle.seed)
+        load_time = time.perf_counter() - load_start
+        # В загрузку входит расстановка объектов в затемнении, но не ожидание его кадров
+        load_time += fade_screen('level')
+        load_start = time.perf_counter()
+        player = Player(2 * SPRITE_SIZE, 2 * SPRITE_SIZE, 'priest3_v2')
+        guest = Player(3 * SPRITE_SIZE, 2 * SPRITE_SIZE, 'priest2_v2') if coop is not None else None
+        castle.lighting = light_level()
+        castle.snapshot = LevelSnapshot(level_groups, pause_button=pause_button)
+        castle.snapshot.capture()
+        load_time += time.perf_counter() - load_start
     slash_name = 'Blue Slash Thin'
     running = True
     pointed = False
     throw = False
-    shift_pressed = False
-    ctrl_pressed = False
+    held = set()  # зажатые сейчас действия
+    ai_scheduler = AIScheduler()
     move_to_cell = None
     lmb_pressed = False
     inv_collide = False
     continued = False
     can_finish = False
+    guest_attacks = coop.input['attacks'] if coop is not None else 0
     start = datetime.now()
+    telemetry.start(lvl, castle.seed, load_time, restart)
+    quality.reset()
+    if watcher is not None:
+        watcher.watch(lvl)
+    if bot is not None:
+        bot.reset()
+
+    def select_item(index: int) -> None:
+        player.inventory.current_item = index
+
+    def press_pause() -> None:
+        pause_button.clicks += 1
+        pause_button.y_pos = 590
+
+    def exit_level() -> None:
+        if can_finish:
+            all_music.level_window_music.stop()
+            all_music.door_opened_music.play()
+            finish = datetime.now()
+            finish_window(round((finish - start).total_seconds(), 3))
+
+    # Действие -> обработчик нажатия
+    on_press = {
+        'slot_1': lambda: select_item(0),
+        'slot_2': lambda: select_item(1),
+        'slot_3': lambda: select_item(2),
+        'slot_4': lambda: select_item(3),
+        'pause': press_pause,
+        'exit_level': exit_level,
+    }
     all_music.level_window_music.play(-1)
     while running:
+        frame_start = time.perf_counter()
         pressed = pg.key.get_pressed()
-        for event in pg.event.get():
+        for event in scene_events(lvl):
             if event.type == pg.QUIT:
                 running = False
                 terminate()
             elif event.type == pg.KEYDOWN:
-                if event.key == attack_1:
-                    shift_pressed = True
-                elif event.key == attack_2:
-                    ctrl_pressed = True
-                elif event.key == pg.K_1:
-                    player.inventory.current_item = 0
-                elif event.key == pg.K_2:
-                    player.inventory.current_item = 1
-                elif event.key == pg.K_3:
-                    player.inventory.current_item = 2
-                elif event.key == pg.K_4:
-                    player.inventory.current_item = 3
-                elif event.key == pause:
-                    pause_button.clicks += 1
-                    pause_button.y_pos = 590
-                elif event.key == pg.K_e and can_finish:
-                    all_music.level_window_music.stop()
-                    all_music.door_opened_music.play()
-                    finish = datetime.now()
-                    finish_window(round((finish - start).total_seconds(), 3))
+                action = controls.keys.get(event.key)
+                if action is not None:
+                    held.add(action)
+                    if action in on_press:
+                        on_press[action]()
             elif event.type == pg.MOUSEBUTTONDOWN:
-                if event.button == 1:
+                action = controls.buttons.get(event.button)
+                if action == 'primary':
                     lmb_pressed = True
                     inv_collide = pg.Rect((330 + 33 * player.inventory.current_item + 3 * player.inventory.current_item,
                                            player.inventory.y_pos + 15, 33, 33)).collidepoint(event.pos)
@@ -2033,76 +2348,107 @@ def run_level(lvl: str) -> None:
                             player.inventory.current_item = cur
                     elif pause_button.rect.collidepoint(event.pos):
                         pause_button.clicks += 1
-                    elif (not shift_pressed and not ctrl_pressed and
+                    elif ('attack_1' not in held and 'attack_2' not in held and
                           not player.do_slash and player.inventory.current_item == 0):
                         player.do_slash = True
                         slash_name = 'Blue Slash Thin'
-                    elif shift_pressed and not player.do_slash and player.inventory.current_item == 0 and not auto:
+                    elif 'attack_1' in held and not player.do_slash and player.inventory.current_item == 0 and not auto:
                         player.do_slash = True
                         slash_name = 'Blue Slash Wide'
-                    elif ctrl_pressed and not player.do_slash and player.inventory.current_item == 0 and not auto:
+                    elif 'attack_2' in held and not player.do_slash and player.inventory.current_item == 0 and not auto:
                         player.do_slash = True
                         slash_name = 'Blue Group Slashes'
                     elif player.inventory.current_item != 0:
                         player.use_current_item()
-                elif event.button == 3:
+                elif action == 'point':
                     pointed = True
                     move_to_cell = event.pos[0] // SPRITE_SIZE, event.pos[1] // SPRITE_SIZE
-                    if len([j for j in animated_sprites if j.filename == 'arrow']):
+                    if entities.count(Pointer):
                         kill_arrow()
                     if castle.is_free((move_to_cell[0], move_to_cell[1])):
-                        Pointer(event.pos[0] - 10, event.pos[1] - 15, 'arrow')
+                        sprite_pool.acquire(Pointer, event.pos[0] - 10, event.pos[1] - 15, 'arrow')
             elif event.type == pg.MOUSEBUTTONUP:
-                if event.button == 1:
+                if controls.buttons.get(event.button) == 'primary':
                     lmb_pressed = False
                     throw = False
             elif event.type == pg.KEYUP:
-                if event.key == attack_1:
-                    shift_pressed = False
-                elif event.key == attack_2:
-                    ctrl_pressed = False
+                held.discard(controls.keys.get(event.key))
             elif event.type == pg.MOUSEMOTION:
                 collide = lower_rect.collidepoint(event.pos)
                 player.inventory.mouse_collide = collide
                 pause_button.mouse_collide = collide
                 if inv_collide:
                     throw = lmb_pressed
-        if pointed:
+        if bot is not None:
+            if bot.finished():
+                terminate()
+            bot_cell, bot_actions = bot.step(player, enemies, can_be_picked_up, chests, EXIT_CELLS,
+                                             castle.walkable)
+            for action in bot_actions:
+                if action == 'use_item':
+                    player.use_current_item()
+                elif action == 'attack_1':
+                    if not player.do_slash:
+                        slash_name = 'Blue Slash Wide'
+                elif action == 'attack_2':
+                    if not player.do_slash:
+                        slash_name = 'Blue Group Slashes'
+                else:
+                    on_press[action]()
+            if bot_cell is not None:
+                # Поле потока из фонового потока даёт точные шаги к цели бота
+                castle.path_worker.request(bot_cell)
+                move_by_pointer(player, bot_cell)
+        elif pointed:
             move_by_pointer(player, move_to_cell)
         else:
             player.handle_keypress(pressed)
+        if coop is not None:
+            guest_input = coop.poll()
+            held_remote = guest_input['held']
+            guest.walk(('right' in held_remote) - ('left' in held_remote),
+                       ('downward' in held_remote) - ('upward' in held_remote))
+            if guest_input['attacks'] > guest_attacks and not guest.do_slash:
+                guest.do_slash = True
+            guest_attacks = guest_input['attacks']
         if player.collide_vertex == move_to_cell:
             pointed = False
             kill_arrow()
-        for enemy in enemies:
-            enemy.check()
+        if watcher is not None:
+            hot_reload()
+        ai_scheduler.slowdown = AI_SLOWDOWN if quality.sheds('ai') else 1
+        castle.lighting.enabled = not quality.sheds('lighting')
         castle.render()
-        for enemy in enemies:
-            enemy.move_to_player()
+        active_enemies = ai_scheduler.run(enemies, player, Monster.think)
         if player.do_slash:
             if slash_name != 'Blue Group Slashes':
                 player.slash(slash_name)
             else:
                 player.slash(slash_name, frames=20)
+        if guest is not None and guest.do_slash:
+            guest.slash('Blue Slash Thin')
+        animation_clock.step(animated_sprites, freeze_decor=quality.sheds('decor'))
         for sprite in animated_sprites:
-            sprite.animate()
+            sprite.draw()
         for chest in chests:
             chest.update()
             if chest.opened and not chest.dropped:
-                drop = chest.get_drop()
-                spawn_object(drop.dir + drop.filename, from_chest=True)
+                spawn_object(chest.get_drop(), from_chest=True)
         for sprite in can_be_picked_up:
             sprite.update()
-        for enemy in enemies:
+        for enemy in active_enemies:
             if (abs(player.get_center_coordinates()[1] - enemy.get_center_coordinates()[1]) <= SPRITE_SIZE and
                     abs(player.get_center_coordinates()[0] - enemy.get_center_coordinates()[0]) <= SPRITE_SIZE and
                     not enemy.dead and auto):
                 player.do_slash = True
-            enemy.check()
+        # Удар и крест игрока тоже идут в список кадра, поэтому обновление игрока - до его вывода
+        player.update()
+        backend.flush_sprites()
+        castle.lighting.draw(screen, player.get_center_coordinates())
         player.inventory.draw()
-        player.inventory.update()
+        player.inventory.update(snap=quality.sheds('hud'))
         pause_button.draw()
-        pause_button.update()
+        pause_button.update(snap=quality.sheds('hud'))
         if throw:
             player.inventory.throw()
         elif player.inventory.throwing is not None:
@@ -2113,12 +2459,21 @@ def run_level(lvl: str) -> None:
             player.inventory.throwing = None
         if can_finish:
             show_exit_text()
-        player.update()
         if player.health <= 0:
             all_music.level_window_music.stop()
+            count_collected, count_coins = count_inventory()
+            telemetry.end('died', killed=count_killed, coins=count_coins, hp_lost=hp_lost,
+                          play_time=round((datetime.now() - start).total_seconds(), 3), collected=count_collected,
+                          **take_run_fields())
             death_window(lvl)
-        pg.display.flip()
-        clock.tick(FPS)
+        if coop is not None:
+            coop.tick(animation_clock.now, lvl, entities)
+        backend.present()
+        frame_time = time.perf_counter() - frame_start
+        telemetry.frame(frame_time)
+        quality.frame(frame_time)
+        clock.tick(fps)
+        animation_clock.tick()
         if continued and not pause_button.unpause:
             all_music.level_window_music.stop()
             pause_window(pause_button)
@@ -2126,20 +2481,61 @@ def run_level(lvl: str) -> None:
         if not pause_button.unpause:
             all_music.level_window_music.play(-1)
             continued = True
-        can_finish = (player.get_center_cell() in [(43, 37), (44, 37), (45, 37), (46, 37),
-                                                   (43, 38), (44, 38), (45, 48), (46, 38)] and player.has_key())
+        can_finish = player.get_center_cell() in EXIT_CELLS and player.has_key()
+
+
+def run_guest(client: CoopClient) -> None:
+    """
+    Клиент совместной игры: отправляет хосту нажатия и рисует присланное им состояние уровня.
+    :param client: Подключение к хосту
+    :returns: None
+    """
+
+    global castle
+    held = set()  # зажатые сейчас действия
+    attacks = 0
+    while True:
+        for event in scene_events('coop_guest'):
+            if event.type == pg.QUIT:
+                client.close()
+                terminate()
+            elif event.type == pg.KEYDOWN:
+                action = controls.keys.get(event.key)
+                if action is not None:
+                    held.add(action)
+            elif event.type == pg.KEYUP:
+                held.discard(controls.keys.get(event.key))
+            elif event.type == pg.MOUSEBUTTONDOWN and controls.buttons.get(event.button) == 'primary':
+                attacks += 1
+        client.send_input(sorted(held), attacks)
+        client.poll()
+        if client.level is not None and (castle is None or castle.name != client.level):
+            if castle is not None:
+                castle.path_worker.stop()
+            castle = Castle(client.level, client.level + '.tmx')
+        if castle is None:
+            screen.fill(pg.Color('black'))
+            rendered = fonts.render('Waiting for host...', 20, pg.Color('white'))
+            screen.blit(rendered, rendered.get_rect(center=(WIDTH // 2, HEIGHT // 2)))
+        else:
+            castle.render()
+            for key, (images, index, x, y, flip) in enumerate(client.view(clock.get_time())):
+                frame = load_image(f'{images}_{index + 1}.png')
+                backend.post(key, animation_clock.get_flipped(frame) if flip else frame, (x, y), frame, flip)
+        backend.present()
+        clock.tick(fps)
+        animation_clock.tick()
 
 
 def kill_arrow() -> None:
     """
-    Убирает объект указателя из группы animated_sprites,
+    Убирает объект указателя из всех групп,
     тем самым он перестаёт отрисовываться.
     :returns: None
     """
 
-    for obj in animated_sprites:
-        if obj.filename == 'arrow':
-            obj.kill()
+    for obj in entities.of(Pointer):
+        obj.kill()
 
 
 def terminate() -> None:
@@ -2148,28 +2544,78 @@ def terminate() -> None:
     :returns: None
     """
 
-    with open('levels/available_levels.txt', 'w', encoding='utf8') as fl:
-        line = ', '.join(list(set(available_levels)))
-        fl.write(line)
+    telemetry.end('quit', **take_run_fields())
+    profiler.stop()
+    if coop is not None:
+        coop.close()
+    if progress is not None:
+        progress.close()
     pg.quit()
     sys.exit()
 
 
-# Самые часто используемые переменные
-throw: bool
-player: Player
-castle: Castle
+def init_game(renderer: str = RENDERER, audio: bool = True) -> None:
+    """
+    Инициализация pygame, конфига игрока, прогресса, ресурсов, звука и окна.
+    :param renderer: Бэкенд отрисовки
+    :param audio: Нужен ли звук (без него микшер не запускается, а звуки не загружаются)
+    :returns: None
+    """
 
-# ЗАПУСК
-if __name__ == '__main__':
-    pg.init()
-    all_music = Music()
+    global all_music, backend, screen, WIDTH, HEIGHT, lower_rect, inventory_rect, clock, music, progress
+    if audio:
+        pg.init()
+    else:
+        pg.display.init()
+        pg.font.init()
+    music = controls.load('config/cfg.txt')
+    progress = ProgressStore()
+    load_packs()
+    all_music = Music() if audio else SilentMusic()
     all_music.change_all_volumes()
-    pg.display.set_caption("Devil's Massacre")
-    screen = pg.display.set_mode((WIDTH := 800, HEIGHT := 640))
+    WIDTH, HEIGHT = 800, 640
+    backend = create_backend(renderer, (WIDTH, HEIGHT), "Devil's Massacre")
+    screen = backend.screen
     screen.fill(pg.Color('black'))
     lower_rect = pg.Rect(0, 590, 800, 50)
     inventory_rect = pg.Rect(315, 590, 170, 50)
     clock = pg.time.Clock()
-    all_music.start_window_music.play(-1)
-    start_window()
+
+
+# Самые часто используемые переменные
+throw: bool
+player: Player
+guest: Player | None = None  # второй игрок, которым управляет клиент совместной игры
+castle: Castle | None = None
+
+
+# ЗАПУСК
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Devil's Massacre")
+    parser.add_argument('--level', choices=list_of_levels, help='сразу запустить уровень, минуя меню')
+    parser.add_argument('--seed', type=int, help='зерно расстановки объектов на уровнях')
+    parser.add_argument('--renderer', choices=['surface', 'texture'], default=RENDERER, help='бэкенд отрисовки')
+    parser.add_argument('--headless', action='store_true',
+                        help='без окна, звука и ограничения FPS (по умолчанию сразу запускает level1)')
+    parser.add_argument('--frames', type=int, help='через сколько кадров выйти из игры')
+    parser.add_argument('--no-audio', action='store_true', help='без звука')
+    parser.add_argument('--profile', action='store_true', help='записывать профиль каждой сцены (F9 - вкл/выкл)')
+    parser.add_argument('--watch', action='store_true',
+                        help='обновлять идущий уровень при сохранении его .tmx и elements_pos.json')
+    args = parser.parse_args()
+    if args.headless:
+        os.environ['SDL_VIDEODRIVER'] = 'dummy'
+        args.level = args.level or list_of_levels[0]
+    seed, frame_limit, profiler.auto = args.seed, args.frames, args.profile
+    if args.watch:
+        watcher = LevelWatcher()
+    init_game(args.renderer, audio=not (args.no_audio or args.headless))
+    if args.headless:
+        fps = 0
+        animation_clock.fixed_step = 1000 // FPS
+    if args.level is not None:
+        level, n_level = args.level, list_of_levels.index(args.level)
+        run_level(level)
+    else:
+        all_music.start_window_music.play(-1)
+        start_window()
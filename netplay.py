@@ -0,0 +1,361 @@
+"""
+Совместная игра вдвоём по UDP. Хост считает уровень сам и с постоянной частотой рассылает снимки
+состояния объектов, сжатые относительно последнего снимка, который подтвердил клиент.
+Клиент отправляет хосту свои нажатия и рисует объекты, плавно интерполируя их между снимками.
+В снимки попадают только спрайты объектов: удары и крест над погибшим игроком (эффекты из списка
+кадра) клиенту не передаются, и у него их не видно.
+Запуск: python netplay.py host [уровень] [--bind адрес] [--port N] [--tick N]
+        python netplay.py join [--host адрес] [--port N]
+Хост по умолчанию ждёт клиента только на этой машине; для игры по сети: --bind 0.0.0.0
+"""
+
+import argparse
+import json
+import socket
+import time
+import zlib
+
+NET_PORT = 50505
+NET_BIND = '127.0.0.1'  # адрес, на котором хост ждёт клиента
+TICK_RATE = 20  # снимков в секунду
+HISTORY = 32  # сколько последних снимков хост помнит как возможную базу для сжатия
+INTERP_TICKS = 2  # на сколько снимков клиент отстаёт от последнего полученного, чтобы было между чем интерполировать
+MAX_PACKET = 65507
+# Поля состояния объекта: общая часть имени кадров, номер кадра, x, y, отражён ли
+X, Y = 2, 3
+
+
+def capture_state(sprites) -> dict[str, list]:
+    """
+    Состояние видимых объектов для отправки.
+    :param sprites: Объекты уровня (реестр entities)
+    :returns: Номер объекта -> [путь к кадрам, номер кадра, x, y, отражён ли]
+    """
+
+    state = dict()
+    for sprite in sprites:
+        if getattr(sprite, 'do_blit', False):
+            state[str(sprite.entity_id)] = [sprite.dir + '/' + sprite.filename, sprite.current_image,
+                                            round(sprite.pos[0], 1), round(sprite.pos[1], 1), sprite.flip]
+    return state
+
+
+def make_delta(base: dict[str, list], state: dict[str, list]) -> tuple[dict, list[str]]:
+    """
+    Отличия состояния от базы. Новые объекты передаются целиком (список),
+    изменившиеся - только изменившимися полями (номер поля -> значение).
+    :param base: Состояние, которое уже есть у клиента
+    :param state: Текущее состояние
+    :returns: Изменения и номера исчезнувших объектов
+    """
+
+    changed = dict()
+    for key, fields in state.items():
+        old = base.get(key)
+        if old is None:
+            changed[key] = fields
+        elif old != fields:
+            changed[key] = {str(i): value for i, (was, value) in enumerate(zip(old, fields)) if was != value}
+    return changed, [key for key in base if key not in state]
+
+
+def apply_delta(base: dict[str, list], changed: dict, removed: list[str]) -> dict[str, list]:
+    state = {key: fields for key, fields in base.items() if key not in removed}
+    for key, fields in changed.items():
+        if isinstance(fields, list):
+            state[key] = fields
+        else:
+            state[key] = list(state[key])
+            for i, value in fields.items():
+                state[key][int(i)] = value
+    return state
+
+
+def encode(message: dict) -> bytes:
+    return zlib.compress(json.dumps(message, separators=(',', ':')).encode('utf8'), 1)
+
+
+def decode(packet: bytes) -> dict | None:
+    try:
+        return json.loads(zlib.decompress(packet))
+    except (zlib.error, ValueError):
+        return None
+
+
+class NetStats:
+    """
+    Стоимость рассылки снимков: размер пакетов и время их подготовки
+
+    Атрибуты
+    ------
+    ticks : int
+        Количество отправленных снимков
+    full : int
+        Сколько из них отправлено целиком (без базы)
+    sent_bytes : int
+        Всего байт отправлено
+    largest : int
+        Самый большой пакет в байтах
+    encode_time : float
+        Суммарное время снятия состояния, сжатия и кодирования в секундах
+    encode_worst : float
+        Самое долгое кодирование снимка в секундах
+
+    Методы
+    ------
+    add() :
+        Учитывает один отправленный снимок
+    summary() :
+        Сводка для журнала и консоли
+    """
+
+    def __init__(self) -> None:
+        self.ticks = 0
+        self.full = 0
+        self.sent_bytes = 0
+        self.largest = 0
+        self.encode_time = 0.0
+        self.encode_worst = 0.0
+
+    def add(self, size: int, duration: float, full: bool) -> None:
+        self.ticks += 1
+        self.full += full
+        self.sent_bytes += size
+        self.largest = max(self.largest, size)
+        self.encode_time += duration
+        self.encode_worst = max(self.encode_worst, duration)
+
+    def summary(self, tick_rate: int) -> dict:
+        ticks = max(self.ticks, 1)
+        return {'net_ticks': self.ticks, 'net_full': self.full, 'net_avg_bytes': round(self.sent_bytes / ticks, 1),
+                'net_max_bytes': self.largest, 'net_kbps': round(self.sent_bytes / ticks * tick_rate * 8 / 1000, 2),
+                'net_avg_encode_ms': round(self.encode_time / ticks * 1000, 3),
+                'net_worst_encode_ms': round(self.encode_worst * 1000, 3)}
+
+
+class CoopHost:
+    """
+    Сторона хоста: принимает нажатия клиента и рассылает ему снимки с постоянной частотой
+
+    Атрибуты
+    ------
+    sock : socket
+        Неблокирующий UDP-сокет
+    tick_rate : int
+        Снимков в секунду
+    peer : tuple | None
+        Адрес клиента (известен после его первого пакета)
+    seq : int
+        Номер последнего снимка
+    history : dict
+        Номер снимка -> состояние (для сжатия относительно подтверждённого)
+    acked : int
+        Последний снимок, который клиент получил
+    last_tick : float
+        Время часов анимации последней рассылки
+    input : dict
+        Последние нажатия клиента: {'held': действия, 'attacks': сколько раз нажат удар}
+    stats : NetStats
+        Размер и стоимость снимков
+
+    Методы
+    ------
+    poll() :
+        Читает пакеты клиента
+    tick() :
+        Рассылает снимок, если подошло время
+    send() :
+        Сжимает и отправляет снимок
+    close() :
+        Закрывает сокет
+    """
+
+    def __init__(self, port: int = NET_PORT, tick_rate: int = TICK_RATE, address: str = NET_BIND) -> None:
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((address, port))
+        self.sock.setblocking(False)
+        self.tick_rate = tick_rate
+        self.peer = None
+        self.seq = 0
+        self.history = dict()
+        self.acked = 0
+        self.last_tick = None
+        self.input = {'held': [], 'attacks': 0}
+        self.stats = NetStats()
+
+    def poll(self) -> dict:
+        """
+        :returns: Последние нажатия клиента
+        """
+
+        while True:
+            try:
+                packet, address = self.sock.recvfrom(MAX_PACKET)
+            except (BlockingIOError, ConnectionResetError):
+                return self.input
+            message = decode(packet)
+            if message is None:
+                continue
+            self.peer = address
+            self.acked = max(self.acked, message.get('ack', 0))
+            self.input = message
+
+    def tick(self, now: float, level: str, sprites) -> None:
+        """
+        :param now: Время часов анимации в миллисекундах
+        :param level: Имя уровня (клиент загружает ту же карту)
+        :param sprites: Объекты уровня
+        """
+
+        if self.last_tick is None or now - self.last_tick >= 1000 / self.tick_rate:
+            # Если кадры не успевают за тиком, догонять отставание пачкой снимков не нужно
+            self.last_tick = now if self.last_tick is None or now - self.last_tick > 2000 / self.tick_rate \
+                else self.last_tick + 1000 / self.tick_rate
+            if self.peer is not None:
+                self.send(level, sprites)
+
+    def send(self, level: str, sprites) -> None:
+        encode_start = time.perf_counter()
+        self.seq += 1
+        state = capture_state(sprites)
+        self.history[self.seq] = state
+        self.history.pop(self.seq - HISTORY, None)
+        base = self.acked if self.acked in self.history else 0
+        changed, removed = make_delta(self.history.get(base, {}), state)
+        packet = encode({'seq': self.seq, 'base': base, 'level': level, 'set': changed, 'del': removed})
+        self.stats.add(len(packet), time.perf_counter() - encode_start, base == 0)
+        try:
+            self.sock.sendto(packet, self.peer)
+        except OSError:
+            pass
+
+    def close(self) -> None:
+        self.sock.close()
+
+
+class CoopClient:
+    """
+    Сторона клиента: восстанавливает снимки из изменений и интерполирует их для отрисовки
+
+    Атрибуты
+    ------
+    sock : socket
+        Неблокирующий UDP-сокет
+    address : tuple
+        Адрес хоста
+    tick_ms : float
+        Длительность тика хоста в миллисекундах
+    states : dict
+        Номер снимка -> восстановленное состояние
+    latest : int
+        Номер последнего полученного снимка
+    level : str | None
+        Уровень хоста
+    render_seq : float
+        Дробный номер снимка, который сейчас рисуется
+    sent : int
+        Количество отправленных пакетов нажатий
+
+    Методы
+    ------
+    send_input() :
+        Отправляет нажатия и подтверждает полученный снимок
+    poll() :
+        Читает снимки хоста
+    view() :
+        Интерполированное состояние на текущий кадр
+    close() :
+        Закрывает сокет
+    """
+
+    def __init__(self, address: tuple[str, int] = ('127.0.0.1', NET_PORT), tick_rate: int = TICK_RATE) -> None:
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.address = address
+        self.tick_ms = 1000 / tick_rate
+        self.states = {0: dict()}
+        self.latest = 0
+        self.level = None
+        self.render_seq = 0.0
+        self.sent = 0
+
+    def send_input(self, held: list[str], attacks: int) -> None:
+        """
+        :param held: Зажатые действия
+        :param attacks: Сколько раз всего нажат удар (так потерянный пакет не теряет удар)
+        """
+
+        self.sent += 1
+        try:
+            self.sock.sendto(encode({'ack': self.latest, 'held': held, 'attacks': attacks}), self.address)
+        except OSError:
+            pass
+
+    def poll(self) -> None:
+        while True:
+            try:
+                packet = self.sock.recv(MAX_PACKET)
+            except (BlockingIOError, ConnectionResetError):
+                return
+            message = decode(packet)
+            # Устаревшие снимки и снимки, база которых уже забыта, пропускаются
+            if message is None or message['seq'] <= self.latest or message['base'] not in self.states:
+                continue
+            self.states[message['seq']] = apply_delta(self.states[message['base']], message['set'], message['del'])
+            self.latest = message['seq']
+            self.level = message['level']
+            for seq in [seq for seq in self.states if 0 < seq < self.latest - 2 * HISTORY]:
+                del self.states[seq]
+
+    def view(self, elapsed: float) -> list[list]:
+        """
+        :param elapsed: Миллисекунд с прошлого кадра
+        :returns: Состояния объектов для отрисовки
+        """
+
+        target = self.latest - INTERP_TICKS
+        self.render_seq += elapsed / self.tick_ms
+        if abs(self.render_seq - target) > INTERP_TICKS:
+            # Отстали или убежали слишком далеко (потери, подвисание): перескакиваем
+            self.render_seq = float(target)
+        self.render_seq = min(self.render_seq, self.latest)
+        older = int(self.render_seq)
+        while older > 0 and older not in self.states:
+            older -= 1
+        newer = older + 1
+        while newer < self.latest and newer not in self.states:
+            newer += 1
+        a = self.states.get(older, dict())
+        b = self.states.get(newer, a)
+        t = 0.0 if newer == older else min(max((self.render_seq - older) / (newer - older), 0.0), 1.0)
+        objects = []
+        for key, fields in a.items():
+            fields = list(fields)
+            to = b.get(key)
+            if to is not None and to[0] == fields[0]:
+                fields[X] += (to[X] - fields[X]) * t
+                fields[Y] += (to[Y] - fields[Y]) * t
+            objects.append(fields)
+        return objects
+
+    def close(self) -> None:
+        self.sock.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Совместная игра по UDP')
+    parser.add_argument('role', choices=['host', 'join'])
+    parser.add_argument('level', nargs='?', default='level1')
+    parser.add_argument('--host', default='127.0.0.1', help='адрес хоста (для join)')
+    parser.add_argument('--bind', default=NET_BIND, help='адрес, на котором хост ждёт клиента (для host)')
+    parser.add_argument('--port', type=int, default=NET_PORT)
+    parser.add_argument('--tick', type=int, default=TICK_RATE, help='снимков в секунду')
+    args = parser.parse_args()
+    import main
+    main.init_game()
+    if args.role == 'host':
+        main.coop = CoopHost(args.port, args.tick, args.bind)
+        main.level, main.n_level = args.level, main.list_of_levels.index(args.level)
+        main.run_level(args.level)
+    else:
+        main.run_guest(CoopClient((args.host, args.port), args.tick))
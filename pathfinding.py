@@ -0,0 +1,390 @@
+import heapq
+import threading
+from collections import OrderedDict
+import pytmx
+from constants import WALL_TILES
+
+INF = 10 ** 9
+NEIGHBOURS = ((1, 0), (0, 1), (-1, 0), (0, -1))
+
+
+def load_walkable(foldername: str, filename: str) -> list[list[bool]]:
+    """
+    Сетка проходимости уровня без загрузки картинок тайлов (для бенчмарков и инструментов).
+    :param foldername: Папка уровня в maps
+    :param filename: Имя файла .tmx
+    :returns: walkable[y][x] - True, если клетка не стена
+    """
+
+    tiled_map = pytmx.TiledMap(f'maps/{foldername}/{filename}')
+    return [[tiled_map.tiledgidmap[tiled_map.get_tile_gid(x, y, 0)] - 1 not in WALL_TILES
+             for x in range(tiled_map.width)] for y in range(tiled_map.height)]
+
+
+def bfs_path_step(walkable: list[list[bool]], start: tuple[int, int], target: tuple[int, int]) -> tuple[int, int]:
+    """
+    Поиск в ширину из start по всей карте (прежний Castle.find_path_step, эталон для бенчмарков).
+    :param walkable: Сетка проходимости
+    :param start: Клетка, из которой идёт объект
+    :param target: Клетка, к которой нужно идти
+    :returns: Следующая клетка пути или start, если пути нет
+    """
+
+    height, width = len(walkable), len(walkable[0])
+    x, y = start
+    distance = [[INF] * width for _ in range(height)]
+    distance[y][x] = 0
+    prev = [[(None, None)] * width for _ in range(height)]
+    queue = [(x, y)]
+    while queue:
+        x, y = queue.pop(0)
+        for dx, dy in NEIGHBOURS:
+            next_x, next_y = x + dx, y + dy
+            if 0 <= next_x < width and 0 <= next_y < height and \
+                    walkable[next_y][next_x] and distance[next_y][next_x] == INF:
+                distance[next_y][next_x] = distance[y][x] + 1
+                prev[next_y][next_x] = (x, y)
+                queue.append((next_x, next_y))
+    x, y = target
+    if distance[y][x] == INF or start == target:
+        return start
+    while prev[y][x] != start:
+        x, y = prev[y][x]
+    return x, y
+
+
+def build_flow_field(walkable: list[list[bool]], target: tuple[int, int]) -> list[list[int]]:
+    """
+    Поиск в ширину от целевой клетки по всей карте.
+    :param walkable: Сетка проходимости, walkable[y][x] - True, если клетка свободна
+    :param target: Клетка, к которой нужно идти
+    :returns: Расстояния от каждой клетки до цели (INF - цель недостижима)
+    """
+
+    height, width = len(walkable), len(walkable[0])
+    distance = [[INF] * width for _ in range(height)]
+    x, y = target
+    if not (0 <= x < width and 0 <= y < height) or not walkable[y][x]:
+        return distance
+    distance[y][x] = 0
+    queue = [(x, y)]
+    for x, y in queue:
+        next_distance = distance[y][x] + 1
+        for dx, dy in NEIGHBOURS:
+            next_x, next_y = x + dx, y + dy
+            if 0 <= next_x < width and 0 <= next_y < height and \
+                    walkable[next_y][next_x] and distance[next_y][next_x] == INF:
+                distance[next_y][next_x] = next_distance
+                queue.append((next_x, next_y))
+    return distance
+
+
+def step_on_field(field: list[list[int]], start: tuple[int, int]) -> tuple[int, int]:
+    """
+    Следующая клетка пути по готовому полю расстояний.
+    :param field: Поле расстояний из build_flow_field()
+    :param start: Клетка, из которой идёт объект
+    :returns: Соседняя клетка, которая ближе к цели, или start, если идти некуда
+    """
+
+    height, width = len(field), len(field[0])
+    x, y = start
+    best = field[y][x] if 0 <= x < width and 0 <= y < height else INF
+    step = start
+    for dx, dy in NEIGHBOURS:
+        next_x, next_y = x + dx, y + dy
+        if 0 <= next_x < width and 0 <= next_y < height and field[next_y][next_x] < best:
+            best = field[next_y][next_x]
+            step = next_x, next_y
+    return step
+
+
+class PathWorker(threading.Thread):
+    """
+    Фоновый поток, который считает поля путей для монстров
+
+    Атрибуты
+    ------
+    walkable : list
+        Снимок сетки проходимости уровня
+    fields : OrderedDict
+        Последние посчитанные поля расстояний по целевым клеткам
+    latest : list | None
+        Последнее опубликованное потоком поле (цель, известная монстрам)
+    pending : tuple[int, int] | None
+        Цель, которую нужно посчитать следующей
+
+    Методы
+    ------
+    request() :
+        Ставит цель в очередь (более старая непосчитанная цель заменяется)
+    get_field() :
+        Возвращает готовое поле для цели или None
+    compute() :
+        Считает поле сразу, в вызывающем потоке
+    stop() :
+        Останавливает поток
+    """
+
+    def __init__(self, walkable: list[list[bool]], cache_size: int = 8) -> None:
+        super().__init__(daemon=True)
+        self.walkable = [row[:] for row in walkable]
+        self.cache_size = cache_size
+        self.fields = OrderedDict()
+        self.latest = None
+        self.pending = None
+        self.running = True
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+
+    def request(self, target: tuple[int, int]) -> None:
+        with self.lock:
+            if target in self.fields or target == self.pending:
+                return
+            self.pending = target
+        self.wakeup.set()
+
+    def get_field(self, target: tuple[int, int]) -> list[list[int]] | None:
+        with self.lock:
+            return self.fields.get(target)
+
+    def compute(self, target: tuple[int, int]) -> list[list[int]]:
+        field = build_flow_field(self.walkable, target)
+        self.store(target, field)
+        return field
+
+    def store(self, target: tuple[int, int], field: list[list[int]]) -> None:
+        with self.lock:
+            self.fields[target] = field
+            self.fields.move_to_end(target)
+            while len(self.fields) > self.cache_size:
+                self.fields.popitem(last=False)
+
+    def run(self) -> None:
+        while True:
+            self.wakeup.wait()
+            self.wakeup.clear()
+            if not self.running:
+                return
+            with self.lock:
+                target, self.pending = self.pending, None
+            if target is None:
+                continue
+            field = build_flow_field(self.walkable, target)
+            self.store(target, field)
+            self.latest = field
+
+    def stop(self) -> None:
+        self.running = False
+        self.wakeup.set()
+
+
+class HierarchicalPathfinder:
+    """
+    Иерархический поиск пути: карта делится на кластеры, между соседними кластерами
+    ищутся входы, а стоимости путей между входами одного кластера считаются заранее.
+    Путь сначала ищется по абстрактному графу входов, затем уточняется внутри кластеров
+
+    Атрибуты
+    ------
+    walkable : list
+        Сетка проходимости, walkable[y][x] - True, если клетка свободна
+    cluster_size : int
+        Размер стороны кластера в клетках
+    edges : dict
+        Абстрактный граф: вход -> список пар (соседний вход, стоимость)
+    cluster_nodes : dict
+        Кластер -> список входов в нём
+    paths : OrderedDict
+        Последние найденные пути по целевым клеткам
+
+    Методы
+    ------
+    find_path() :
+        Полный путь по клеткам от start до target
+    find_path_step() :
+        Следующая клетка пути (как Castle.find_path_step)
+    """
+
+    def __init__(self, walkable: list[list[bool]], cluster_size: int = 10, cache_size: int = 8) -> None:
+        self.walkable = walkable
+        self.height, self.width = len(walkable), len(walkable[0])
+        self.cluster_size = cluster_size
+        self.cache_size = cache_size
+        self.edges = dict()
+        self.cluster_nodes = dict()
+        self.paths = OrderedDict()
+        self.build_entrances()
+        self.build_intra_edges()
+
+    def is_free(self, cell: tuple[int, int]) -> bool:
+        x, y = cell
+        return 0 <= x < self.width and 0 <= y < self.height and self.walkable[y][x]
+
+    def get_cluster(self, cell: tuple[int, int]) -> tuple[int, int]:
+        return cell[0] // self.cluster_size, cell[1] // self.cluster_size
+
+    def get_bounds(self, cluster: tuple[int, int]) -> tuple[int, int, int, int]:
+        x_min, y_min = cluster[0] * self.cluster_size, cluster[1] * self.cluster_size
+        return x_min, y_min, min(x_min + self.cluster_size, self.width), min(y_min + self.cluster_size, self.height)
+
+    def add_node(self, cell: tuple[int, int]) -> None:
+        if cell not in self.edges:
+            self.edges[cell] = []
+            self.cluster_nodes.setdefault(self.get_cluster(cell), []).append(cell)
+
+    def add_entrance(self, first: tuple[int, int], second: tuple[int, int]) -> None:
+        self.add_node(first)
+        self.add_node(second)
+        self.edges[first].append((second, 1))
+        self.edges[second].append((first, 1))
+
+    def build_entrances(self) -> None:
+        size = self.cluster_size
+        # Вертикальные границы: клетки (x, y) | (x + 1, y)
+        for x in range(size - 1, self.width - 1, size):
+            self.add_border_runs([((x, y), (x + 1, y)) for y in range(self.height)])
+        # Горизонтальные границы: клетки (x, y) над (x, y + 1)
+        for y in range(size - 1, self.height - 1, size):
+            self.add_border_runs([((x, y), (x, y + 1)) for x in range(self.width)])
+
+    def add_border_runs(self, pairs: list[tuple[tuple[int, int], tuple[int, int]]]) -> None:
+        run = []
+        for first, second in pairs:
+            open_pair = self.is_free(first) and self.is_free(second)
+            # Граница участка - стена или переход к следующему кластеру вдоль границы
+            breaks = run and self.get_cluster(first) != self.get_cluster(run[-1][0])
+            if run and (not open_pair or breaks):
+                self.add_run(run)
+                run = []
+            if open_pair:
+                run.append((first, second))
+        if run:
+            self.add_run(run)
+
+    def add_run(self, run: list[tuple[tuple[int, int], tuple[int, int]]]) -> None:
+        # Длинный проход получает два входа по краям, короткий - один посередине
+        if len(run) >= 6:
+            self.add_entrance(*run[0])
+            self.add_entrance(*run[-1])
+        else:
+            self.add_entrance(*run[len(run) // 2])
+
+    def local_search(self, start: tuple[int, int], bounds: tuple[int, int, int, int]) -> tuple[dict, dict]:
+        x_min, y_min, x_max, y_max = bounds
+        distance = {start: 0}
+        prev = {start: None}
+        queue = [start]
+        for x, y in queue:
+            for dx, dy in NEIGHBOURS:
+                cell = next_x, next_y = x + dx, y + dy
+                if x_min <= next_x < x_max and y_min <= next_y < y_max and \
+                        cell not in distance and self.walkable[next_y][next_x]:
+                    distance[cell] = distance[(x, y)] + 1
+                    prev[cell] = (x, y)
+                    queue.append(cell)
+        return distance, prev
+
+    def local_path(self, start: tuple[int, int], target: tuple[int, int]) -> list[tuple[int, int]] | None:
+        distance, prev = self.local_search(start, self.get_bounds(self.get_cluster(start)))
+        if target not in distance:
+            return None
+        path = [target]
+        while path[-1] != start:
+            path.append(prev[path[-1]])
+        return path[::-1]
+
+    def build_intra_edges(self) -> None:
+        for cluster, nodes in self.cluster_nodes.items():
+            bounds = self.get_bounds(cluster)
+            for node in nodes:
+                distance, _ = self.local_search(node, bounds)
+                for other in nodes:
+                    if other != node and other in distance:
+                        self.edges[node].append((other, distance[other]))
+
+    def find_path(self, start: tuple[int, int], target: tuple[int, int]) -> list[tuple[int, int]] | None:
+        if not self.is_free(start) or not self.is_free(target):
+            return None
+        if start == target:
+            return [start]
+        start_cluster, target_cluster = self.get_cluster(start), self.get_cluster(target)
+        if start_cluster == target_cluster:
+            path = self.local_path(start, target)
+            if path is not None:
+                return path
+
+        # Временно подключаем start и target к входам их кластеров
+        start_distance, _ = self.local_search(start, self.get_bounds(start_cluster))
+        target_distance, _ = self.local_search(target, self.get_bounds(target_cluster))
+        start_edges = [(node, start_distance[node]) for node in self.cluster_nodes.get(start_cluster, [])
+                       if node in start_distance]
+        to_target = {node: target_distance[node] for node in self.cluster_nodes.get(target_cluster, [])
+                     if node in target_distance}
+
+        # A* по абстрактному графу
+        heuristic = lambda cell: abs(cell[0] - target[0]) + abs(cell[1] - target[1])
+        cost = {start: 0}
+        prev = {start: None}
+        heap = [(heuristic(start), 0, start)]
+        while heap:
+            _, current_cost, node = heapq.heappop(heap)
+            if node == target:
+                break
+            if current_cost > cost[node]:
+                continue
+            neighbours = self.edges.get(node, [])
+            if node == start:
+                neighbours = neighbours + start_edges
+            if node in to_target:
+                neighbours = neighbours + [(target, to_target[node])]
+            for other, step_cost in neighbours:
+                new_cost = current_cost + step_cost
+                if new_cost < cost.get(other, INF):
+                    cost[other] = new_cost
+                    prev[other] = node
+                    heapq.heappush(heap, (new_cost + heuristic(other), new_cost, other))
+        if target not in prev:
+            return None
+        abstract = [target]
+        while abstract[-1] != start:
+            abstract.append(prev[abstract[-1]])
+        abstract.reverse()
+
+        # Уточняем путь внутри кластеров
+        path = [start]
+        for first, second in zip(abstract, abstract[1:]):
+            if abs(first[0] - second[0]) + abs(first[1] - second[1]) == 1:
+                path.append(second)
+            else:
+                path.extend(self.local_path(first, second)[1:])
+        return path
+
+    def find_path_step(self, start: tuple[int, int], target: tuple[int, int]) -> tuple[int, int]:
+        if start == target:
+            return start
+        cached = self.paths.get(target)
+        if cached is not None and start in cached[1]:
+            path, index = cached
+            if index[start] + 1 < len(path):
+                return path[index[start] + 1]
+        if not self.is_free(start):
+            # Угол объекта может оказаться в стене - шагаем в ту свободную соседнюю клетку,
+            # от которой путь до цели короче (как ход BFS)
+            best = None
+            for dx, dy in NEIGHBOURS:
+                path = self.find_path((start[0] + dx, start[1] + dy), target)
+                if path is not None and (best is None or len(path) < len(best)):
+                    best = path
+            if best is None:
+                return start
+            path = [start] + best
+        else:
+            path = self.find_path(start, target)
+            if path is None:
+                return start
+        self.paths[target] = path, {cell: ind for ind, cell in enumerate(path)}
+        self.paths.move_to_end(target)
+        while len(self.paths) > self.cache_size:
+            self.paths.popitem(last=False)
+        return path[1]
@@ -0,0 +1,45 @@
+class SpritePool:
+    """
+    Пул спрайтов, которые часто появляются и исчезают (дроп, выкинутые предметы, указатель).
+    Убранный из всех групп спрайт (kill()) считается свободным и при следующем запросе
+    возвращается на карту через respawn() вместо создания нового объекта
+
+    Атрибуты
+    ------
+    sprites : dict
+        (класс, имя картинки) -> все созданные пулом спрайты
+    created : int
+        Сколько спрайтов создано
+    reused : int
+        Сколько раз спрайт взят повторно
+
+    Методы
+    ------
+    acquire() :
+        Свободный спрайт нужного вида в заданной точке
+    """
+
+    def __init__(self) -> None:
+        self.sprites = dict()
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, cls, x: int, y: int, filename: str):
+        """
+        :param cls: Класс спрайта (наследник AnimatedObject)
+        :param x: Координата x
+        :param y: Координата y
+        :param filename: Имя картинки
+        :returns: Спрайт, уже добавленный в свои группы
+        """
+
+        bucket = self.sprites.setdefault((cls, filename), [])
+        for sprite in bucket:
+            if not sprite.alive():
+                sprite.respawn(x, y)
+                self.reused += 1
+                return sprite
+        sprite = cls(x, y, filename)
+        bucket.append(sprite)
+        self.created += 1
+        return sprite
@@ -0,0 +1,111 @@
+"""
+Профилирование живой игры по сценам (уровень, меню, затемнение и т.д.): запись cProfile включается
+и выключается клавишей F9 или ключом --profile при запуске и всегда относится к одной сцене.
+Каждая запись сохраняется в .pstats и в короткую текстовую сводку самых долгих функций
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import time
+from datetime import datetime
+from constants import *
+
+TOP_FUNCTIONS = 25  # строк в текстовой сводке
+
+
+class SceneProfiler:
+    """
+    Запись профиля текущей сцены. Сцена сообщает о себе каждый кадр через enter(),
+    и при смене сцены запись сохраняется
+
+    Атрибуты
+    ------
+    directory : str
+        Папка для записей
+    auto : bool
+        Записывать каждую сцену с её начала (ключ --profile)
+    current : str | None
+        Сцена, которая сейчас работает
+    scene : str | None
+        Сцена, которая записывается
+    profile : Profile | None
+        Идущая запись (None - профилирование выключено)
+    started : float
+        Время начала записи по perf_counter
+    frames : int
+        Кадров в записи
+    saved : list
+        Пути сохранённых записей (без расширения)
+
+    Методы
+    ------
+    enter() :
+        Отмечает кадр сцены
+    toggle() :
+        Включает или выключает запись (клавиша F9)
+    start() :
+        Начинает запись сцены
+    stop() :
+        Заканчивает запись и сохраняет её
+    """
+
+    def __init__(self, directory: str = PROFILE_DIR, auto: bool = False) -> None:
+        self.directory = directory
+        self.auto = auto
+        self.current = None
+        self.scene = None
+        self.profile = None
+        self.started = 0.0
+        self.frames = 0
+        self.saved = []
+
+    def enter(self, scene: str) -> None:
+        self.current = scene
+        if self.profile is not None and scene != self.scene:
+            self.stop()
+        if self.profile is None and self.auto:
+            self.start(scene)
+        if self.profile is not None:
+            self.frames += 1
+
+    def toggle(self) -> None:
+        if self.profile is None:
+            self.start(self.current or 'unknown')
+        else:
+            # Выключение клавишей выключает и запись каждой сцены
+            self.auto = False
+            self.stop()
+
+    def start(self, scene: str) -> None:
+        self.scene = scene
+        self.frames = 0
+        self.started = time.perf_counter()
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def stop(self) -> str | None:
+        """
+        :returns: Путь к записи без расширения (None, если запись не шла)
+        """
+
+        if self.profile is None:
+            return None
+        self.profile.disable()
+        profile, self.profile = self.profile, None
+        duration = time.perf_counter() - self.started
+        path = os.path.join(self.directory, f'{self.scene}_{datetime.now():%Y%m%d_%H%M%S_%f}')
+        os.makedirs(self.directory, exist_ok=True)
+        profile.dump_stats(path + '.pstats')
+        text = io.StringIO()
+        text.write(f'scene: {self.scene}\nduration: {duration:.3f} s\nframes: {self.frames}\n'
+                   f'avg frame: {duration / max(self.frames, 1) * 1000:.3f} ms\n')
+        stats = pstats.Stats(profile, stream=text).strip_dirs()
+        for key, title in (('tottime', 'own time'), ('cumulative', 'with callees')):
+            text.write(f'\n=== top {TOP_FUNCTIONS} by {title} ===\n')
+            stats.sort_stats(key).print_stats(TOP_FUNCTIONS)
+        with open(path + '.txt', 'w', encoding='utf8') as summary:
+            summary.write(text.getvalue())
+        self.saved.append(path)
+        return path
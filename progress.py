@@ -0,0 +1,161 @@
+"""
+Прогресс игрока в SQLite: открытые уровни и история очков по уровням.
+Записи копятся в памяти и пишутся одной транзакцией в конце уровня, поэтому падение игры
+посреди записи не оставит базу наполовину обновлённой.
+Таблица рекордов: python progress.py [уровень] [--top N]
+"""
+
+import argparse
+import os
+import sqlite3
+from datetime import datetime
+from constants import *
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS levels (
+    name TEXT PRIMARY KEY,
+    unlocked_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS scores (
+    id INTEGER PRIMARY KEY,
+    level TEXT NOT NULL,
+    score REAL NOT NULL,
+    killed INTEGER,
+    coins INTEGER,
+    hp_lost INTEGER,
+    play_time REAL,
+    collected INTEGER,
+    seed INTEGER,
+    date TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scores_by_level ON scores (level, score DESC);
+"""
+SCORE_FIELDS = ('killed', 'coins', 'hp_lost', 'play_time', 'collected', 'seed')
+
+
+class ProgressStore:
+    """
+    Открытые уровни и очки. Открытые уровни держатся в памяти, поэтому экран выбора уровней
+    не обращается к базе; рекорды берутся из базы по индексу (уровень, очки)
+
+    Атрибуты
+    ------
+    db : Connection
+        Соединение с базой
+    unlocked : set
+        Открытые уровни
+    pending_levels : list
+        Открытые, но ещё не записанные уровни
+    pending_scores : list
+        Ещё не записанные результаты
+
+    Методы
+    ------
+    is_unlocked() :
+        Открыт ли уровень
+    unlock() :
+        Открывает уровни
+    add_score() :
+        Добавляет результат прохождения уровня
+    flush() :
+        Записывает накопленное одной транзакцией
+    top() :
+        Лучшие результаты уровня
+    best() :
+        Рекорд уровня
+    close() :
+        Записывает накопленное и закрывает базу
+    """
+
+    def __init__(self, path: str = PROGRESS_DB, legacy_path: str = 'levels/available_levels.txt') -> None:
+        """
+        :param path: Путь к базе
+        :param legacy_path: Старый файл с открытыми уровнями (переносится в новую базу)
+        """
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.db = sqlite3.connect(path)
+        # Журнал WAL: прерванная транзакция откатывается, а чтение не ждёт записи
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        with self.db:
+            self.db.executescript(SCHEMA)
+        self.unlocked = {name for name, in self.db.execute('SELECT name FROM levels')}
+        self.pending_levels = []
+        self.pending_scores = []
+        if not self.unlocked:
+            self.unlock(*self.read_legacy(legacy_path))
+            self.flush()
+
+    @staticmethod
+    def read_legacy(path: str) -> list[str]:
+        try:
+            with open(path, encoding='utf8') as legacy:
+                names = [name.strip() for name in legacy.read().split(',')]
+        except OSError:
+            names = []
+        return [name for name in names if name] or ['level1']
+
+    def is_unlocked(self, name: str) -> bool:
+        return name in self.unlocked
+
+    def unlock(self, *names: str) -> None:
+        for name in names:
+            if name not in self.unlocked:
+                self.unlocked.add(name)
+                self.pending_levels.append(name)
+
+    def add_score(self, level: str, score: float, **fields) -> None:
+        """
+        :param level: Уровень
+        :param score: Очки
+        :param fields: Показатели из SCORE_FIELDS (убито, монеты, потеряно здоровья, время, предметы, зерно)
+        """
+
+        self.pending_scores.append((level, score, *[fields.get(field) for field in SCORE_FIELDS],
+                                    datetime.now().isoformat(timespec='seconds')))
+
+    def flush(self) -> None:
+        if not self.pending_levels and not self.pending_scores:
+            return
+        date = datetime.now().isoformat(timespec='seconds')
+        with self.db:
+            self.db.executemany('INSERT OR IGNORE INTO levels VALUES (?, ?)',
+                                [(name, date) for name in self.pending_levels])
+            self.db.executemany(f'INSERT INTO scores (level, score, {", ".join(SCORE_FIELDS)}, date) '
+                                f'VALUES ({", ".join("?" * (len(SCORE_FIELDS) + 3))})', self.pending_scores)
+        self.pending_levels.clear()
+        self.pending_scores.clear()
+
+    def top(self, level: str, n: int = 10) -> list[tuple[float, str]]:
+        """
+        :param level: Уровень
+        :param n: Сколько результатов нужно
+        :returns: Пары (очки, дата) по убыванию очков
+        """
+
+        return self.db.execute('SELECT score, date FROM scores WHERE level = ? ORDER BY score DESC LIMIT ?',
+                               (level, n)).fetchall()
+
+    def best(self, level: str) -> float | None:
+        return self.db.execute('SELECT MAX(score) FROM scores WHERE level = ?', (level,)).fetchone()[0]
+
+    def close(self) -> None:
+        self.flush()
+        self.db.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Таблица рекордов')
+    parser.add_argument('level', nargs='?', default=None)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+    store = ProgressStore()
+    names = [args.level] if args.level else sorted(name for name, in store.db.execute(
+        'SELECT DISTINCT level FROM scores'))
+    print('unlocked:', ', '.join(sorted(store.unlocked)))
+    for name in names:
+        print(f'{name}:')
+        for place, (points, when) in enumerate(store.top(name, args.top), 1):
+            print(f'    {place:>3}. {points:>10.2f}  {when}')
+    store.close()
@@ -0,0 +1,85 @@
+"""
+Регулятор качества: следит за временем последних кадров и, если они не укладываются в бюджет,
+по очереди отключает необязательную работу, а при появлении запаса времени возвращает её
+"""
+
+from constants import *
+
+# Шаги в порядке отключения: анимация декораций, частота обновления монстров вне боя,
+# плавное выдвижение нижней панели, освещение
+STEPS = ['decor', 'ai', 'hud', 'lighting']
+WINDOW = 30  # по скольким кадрам считается среднее время
+OVERLOAD = 1.0  # доля бюджета, выше которой качество понижается
+HEADROOM = 0.6  # доля бюджета, ниже которой качество повышается
+AI_SLOWDOWN = 3  # во сколько раз реже обновляются монстры вне боя при отключённом шаге 'ai'
+
+
+class QualityGovernor:
+    """
+    Уровень качества - сколько шагов из STEPS сейчас отключено (0 - всё включено).
+    Уровень меняется не больше чем на один шаг за WINDOW кадров, чтобы не дёргаться от единичных долгих кадров
+
+    Атрибуты
+    ------
+    budget : float
+        Бюджет кадра в секундах
+    level : int
+        Текущий уровень
+    worst : int
+        Самый низкий уровень качества (наибольшее число отключённых шагов) с последнего сброса
+    changes : int
+        Сколько раз уровень менялся с последнего сброса
+    samples : list
+        Время кадров текущего окна в секундах
+    average : float
+        Среднее время кадра в последнем окне в секундах (для диагностики)
+
+    Методы
+    ------
+    frame() :
+        Учитывает время кадра и при необходимости меняет уровень
+    sheds() :
+        Отключён ли шаг
+    reset() :
+        Забывает накопленное окно и статистику (например, при загрузке уровня)
+    summary() :
+        Показатели для журнала забегов
+    """
+
+    def __init__(self, budget: float = 1 / FPS) -> None:
+        self.budget = budget
+        self.level = 0
+        self.worst = 0
+        self.changes = 0
+        self.samples = []
+        self.average = 0.0
+
+    def frame(self, duration: float) -> None:
+        """
+        :param duration: Время работы кадра в секундах (без ожидания clock.tick)
+        """
+
+        self.samples.append(duration)
+        if len(self.samples) < WINDOW:
+            return
+        self.average = sum(self.samples) / len(self.samples)
+        self.samples.clear()
+        if self.average > self.budget * OVERLOAD and self.level < len(STEPS):
+            self.level += 1
+        elif self.average < self.budget * HEADROOM and self.level > 0:
+            self.level -= 1
+        else:
+            return
+        self.changes += 1
+        self.worst = max(self.worst, self.level)
+
+    def sheds(self, step: str) -> bool:
+        return STEPS.index(step) < self.level
+
+    def reset(self) -> None:
+        self.samples.clear()
+        self.worst = self.level
+        self.changes = 0
+
+    def summary(self) -> dict:
+        return {'quality_level': self.level, 'quality_worst': self.worst, 'quality_changes': self.changes}
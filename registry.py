@@ -0,0 +1,62 @@
+import itertools
+import pygame as pg
+
+
+class EntityRegistry(pg.sprite.AbstractGroup):
+    """
+    Группа всех объектов уровня с индексом по классу и номеру.
+    Как и у обычной группы, kill() убирает спрайт отсюда сам, поэтому поиск, удаление
+    и перебор объектов одного вида не зависят от того, сколько всего спрайтов на уровне
+
+    Атрибуты
+    ------
+    kinds : dict
+        Класс -> словарь его спрайтов (как упорядоченное множество)
+    by_id : dict
+        Номер -> спрайт
+    ids : count
+        Счётчик номеров
+
+    Методы
+    ------
+    of() :
+        Спрайты одного класса
+    count() :
+        Количество спрайтов одного класса
+    get() :
+        Спрайт по номеру
+    reset() :
+        Убирает все объекты уровня из всех групп
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.kinds = dict()
+        self.by_id = dict()
+        self.ids = itertools.count(1)
+
+    def add_internal(self, sprite, layer=None) -> None:
+        super().add_internal(sprite, layer)
+        if getattr(sprite, 'entity_id', None) is None:
+            sprite.entity_id = next(self.ids)
+        self.kinds.setdefault(type(sprite), dict())[sprite] = None
+        self.by_id[sprite.entity_id] = sprite
+
+    def remove_internal(self, sprite) -> None:
+        super().remove_internal(sprite)
+        self.kinds[type(sprite)].pop(sprite, None)
+        self.by_id.pop(sprite.entity_id, None)
+
+    def of(self, kind: type) -> list:
+        # Копия: по ней можно пройти, убивая спрайты
+        return list(self.kinds.get(kind, ()))
+
+    def count(self, kind: type) -> int:
+        return len(self.kinds.get(kind, ()))
+
+    def get(self, entity_id: int):
+        return self.by_id.get(entity_id)
+
+    def reset(self) -> None:
+        for sprite in self.sprites():
+            sprite.kill()
@@ -0,0 +1,291 @@
+"""
+Бэкенды отрисовки: программный (Surface.blit на экран pg.display) и текстурный (pygame._sdl2.video).
+Текстурный бэкенд рисует карту и спрайты копированием текстур, а всё остальное,
+что игра рисует на screen (текст, меню, эффекты), накладывает поверх одним слоем.
+Спрайты уровня не рисуются сразу: за кадр они собираются в список (по одной записи на спрайт),
+который выводится одним вызовом в порядке слоёв
+"""
+
+import weakref
+import pygame as pg
+import pytmx
+from pygame._sdl2 import video
+from pytmx.util_pygame import handle_transformation
+
+CHUNK_SIZE = 256  # сторона куска карты в пикселях
+BLEND = 1  # SDL_BLENDMODE_BLEND
+LAYER_ITEMS = 0  # сундуки, предметы, декорации
+LAYER_ACTORS = 1  # игроки и монстры
+LAYER_POINTER = 2  # указатель цели
+LAYER_EFFECTS = 3  # удары и крест над погибшим игроком
+
+
+class DrawList:
+    """
+    Спрайты кадра. Повторная отправка того же спрайта заменяет прежнюю запись,
+    поэтому спрайт рисуется за кадр один раз, в последнем положении
+
+    Атрибуты
+    ------
+    entries : dict
+        Спрайт -> (слой, картинка, позиция, кадр до отражения, отражение)
+
+    Методы
+    ------
+    post() :
+        Добавляет спрайт в кадр
+    take() :
+        Забирает записи кадра, отсортированные по слоям
+    """
+
+    def __init__(self) -> None:
+        self.entries = dict()
+
+    def post(self, key, image: pg.Surface, pos: tuple[float, float], frame: pg.Surface | None = None,
+             flip_x: bool = False, layer: int = LAYER_ITEMS) -> None:
+        self.entries[key] = layer, image, pos, frame, flip_x
+
+    def take(self) -> list[tuple]:
+        # sorted устойчив: внутри слоя остаётся порядок первой отправки
+        entries = sorted(self.entries.values(), key=lambda entry: entry[0])
+        self.entries.clear()
+        return entries
+
+
+class SurfaceBackend:
+    """
+    Программная отрисовка: всё рисуется на поверхность окна
+
+    Атрибуты
+    ------
+    screen : Surface
+        Поверхность окна
+    sprites : DrawList
+        Спрайты текущего кадра
+
+    Методы
+    ------
+    draw_map() :
+        Рисует фон карты
+    refresh_map() :
+        Учитывает перерисованные участки фона карты
+    draw_sprite() :
+        Рисует картинку сразу (интерфейс)
+    post() :
+        Добавляет спрайт в список кадра
+    flush_sprites() :
+        Рисует список кадра одним Surface.blits()
+    snapshot() :
+        Копия текущего кадра
+    present() :
+        Выводит кадр на экран
+    """
+
+    name = 'surface'
+
+    def __init__(self, size: tuple[int, int], caption: str) -> None:
+        pg.display.set_caption(caption)
+        self.screen = pg.display.set_mode(size)
+        self.sprites = DrawList()
+
+    def draw_map(self, castle) -> None:
+        self.screen.blit(castle.background, (0, 0))
+
+    def refresh_map(self, castle, areas: list[pg.Rect]) -> None:
+        # Фон и так копируется на экран целиком каждый кадр
+        pass
+
+    def draw_sprite(self, image: pg.Surface, pos: tuple[float, float],
+                    frame: pg.Surface | None = None, flip_x: bool = False) -> None:
+        self.screen.blit(image, pos)
+
+    def post(self, key, image: pg.Surface, pos: tuple[float, float], frame: pg.Surface | None = None,
+             flip_x: bool = False, layer: int = LAYER_ITEMS) -> None:
+        self.sprites.post(key, image, pos, frame, flip_x, layer)
+
+    def flush_sprites(self) -> None:
+        if self.sprites.entries:
+            self.screen.blits([(image, pos) for _, image, pos, _, _ in self.sprites.take()], doreturn=False)
+
+    def snapshot(self) -> pg.Surface:
+        self.flush_sprites()
+        return self.screen.copy()
+
+    def present(self) -> None:
+        self.flush_sprites()
+        pg.display.flip()
+
+
+class TextureBackend:
+    """
+    Отрисовка через SDL_Renderer. На машинах без видеокарты SDL сам выбирает программный рендерер
+
+    Атрибуты
+    ------
+    screen : Surface
+        Прозрачный слой для всего, что рисуется через Surface.blit (текст, меню, эффекты)
+    renderer : Renderer
+        Рендерер окна
+    target : Texture
+        Текстура, в которую собирается кадр (из неё же берутся снимки экрана)
+    overlay : Texture
+        Текстура, в которую каждый кадр загружается screen
+    sprites : DrawList
+        Спрайты текущего кадра
+    textures : WeakKeyDictionary
+        Поверхность (атлас или отдельная картинка) -> текстура
+    chunks : WeakKeyDictionary
+        Карта -> список (текстура куска фона, позиция)
+    fresh : bool
+        Кадр уже показан, и target нужно очистить перед следующим рисованием
+    """
+
+    name = 'texture'
+
+    def __init__(self, size: tuple[int, int], caption: str) -> None:
+        self.window = video.Window(caption, size)
+        self.renderer = video.Renderer(self.window, target_texture=True)
+        self.screen = pg.Surface(size, pg.SRCALPHA)
+        self.overlay = video.Texture(self.renderer, size, streaming=True)
+        self.overlay.blend_mode = BLEND
+        self.target = video.Texture(self.renderer, size, target=True)
+        self.sprites = DrawList()
+        self.textures = weakref.WeakKeyDictionary()
+        self.chunks = weakref.WeakKeyDictionary()
+        self.renderer.target = self.target
+        self.fresh = True
+
+    def begin(self) -> None:
+        if self.fresh:
+            self.renderer.target = self.target
+            self.renderer.draw_color = (0, 0, 0, 255)
+            self.renderer.clear()
+            self.fresh = False
+
+    def texture_for(self, image: pg.Surface) -> tuple[video.Texture, pg.Rect | None]:
+        # Кадры из атласов - подповерхности: все они рисуются из одной текстуры атласа
+        base, area = image, None
+        if image.get_parent() is not None:
+            area = pg.Rect(image.get_abs_offset(), image.get_size())
+            while base.get_parent() is not None:
+                base = base.get_parent()
+        texture = self.textures.get(base)
+        if texture is None:
+            texture = video.Texture.from_surface(self.renderer, base)
+            texture.blend_mode = BLEND
+            self.textures[base] = texture
+        return texture, area
+
+    def draw_map(self, castle) -> None:
+        self.begin()
+        chunks = self.chunks.get(castle)
+        if chunks is None:
+            chunks = []
+            width, height = castle.background.get_size()
+            for y in range(0, height, CHUNK_SIZE):
+                for x in range(0, width, CHUNK_SIZE):
+                    area = pg.Rect(x, y, min(CHUNK_SIZE, width - x), min(CHUNK_SIZE, height - y))
+                    chunks.append((video.Texture.from_surface(self.renderer, castle.background.subsurface(area)),
+                                   area))
+            self.chunks[castle] = chunks
+        for texture, area in chunks:
+            texture.draw(dstrect=area)
+
+    def refresh_map(self, castle, areas: list[pg.Rect]) -> None:
+        # Заново загружаются только куски, задетые перерисованными участками фона
+        chunks = self.chunks.get(castle)
+        if chunks is None:
+            return
+        for index, (texture, area) in enumerate(chunks):
+            if area.collidelist(areas) != -1:
+                chunks[index] = video.Texture.from_surface(self.renderer, castle.background.subsurface(area)), area
+
+    def draw_sprite(self, image: pg.Surface, pos: tuple[float, float],
+                    frame: pg.Surface | None = None, flip_x: bool = False) -> None:
+        """
+        Если передан frame (кадр до отражения), отражение делает сам рендерер,
+        и отражённые копии кадров не нужно загружать в текстуры
+        """
+        self.begin()
+        if frame is None:
+            frame, flip_x = image, False
+        texture, area = self.texture_for(frame)
+        texture.draw(srcrect=area, dstrect=pg.Rect(pos, frame.get_size()), flip_x=flip_x)
+
+    def post(self, key, image: pg.Surface, pos: tuple[float, float], frame: pg.Surface | None = None,
+             flip_x: bool = False, layer: int = LAYER_ITEMS) -> None:
+        self.sprites.post(key, image, pos, frame, flip_x, layer)
+
+    def flush_sprites(self) -> None:
+        for _, image, pos, frame, flip_x in self.sprites.take():
+            self.draw_sprite(image, pos, frame, flip_x)
+
+    def flush(self) -> None:
+        # Спрайты кадра ложатся под слой screen
+        self.flush_sprites()
+        self.begin()
+        self.overlay.update(self.screen)
+        self.overlay.draw()
+        self.screen.fill((0, 0, 0, 0))
+
+    def snapshot(self) -> pg.Surface:
+        # Сразу после present() в target ещё лежит показанный кадр
+        if not self.fresh or self.sprites.entries:
+            self.flush()
+        return self.renderer.to_surface()
+
+    def present(self) -> None:
+        self.flush()
+        self.renderer.target = None
+        self.target.draw()
+        self.renderer.present()
+        self.renderer.target = self.target
+        self.fresh = True
+
+
+def raw_image_loader(filename: str, colorkey: str | None, **kwargs):
+    """
+    Загрузчик тайлов для pytmx без convert(): у текстурного бэкенда нет окна pg.display.
+    :param filename: Путь к тайлсету
+    :param colorkey: Прозрачный цвет тайлсета
+    :returns: Функция, вырезающая тайл из тайлсета
+    """
+
+    image = pg.image.load(filename)
+    if colorkey:
+        image.set_colorkey(pg.Color(f'#{colorkey}'))
+
+    def load_tile(rect=None, flags=None) -> pg.Surface:
+        tile = image.subsurface(rect) if rect else image.copy()
+        if flags:
+            tile = handle_transformation(tile, flags)
+        return tile
+
+    return load_tile
+
+
+def load_map(path: str) -> pytmx.TiledMap:
+    """
+    Загрузка карты Tiled с картинками тайлов для любого бэкенда.
+    :param path: Путь к .tmx
+    :returns: TiledMap
+    """
+
+    if pg.display.get_surface() is not None:
+        return pytmx.load_pygame(path)
+    return pytmx.TiledMap(path, image_loader=raw_image_loader)
+
+
+BACKENDS = {backend.name: backend for backend in (SurfaceBackend, TextureBackend)}
+
+
+def create_backend(name: str, size: tuple[int, int], caption: str) -> SurfaceBackend | TextureBackend:
+    """
+    Создание бэкенда отрисовки по имени.
+    :param name: 'surface' или 'texture'
+    :param size: Размер окна
+    :param caption: Заголовок окна
+    :returns: Бэкенд
+    """
+
+    return BACKENDS[name](size, caption)
@@ -0,0 +1,108 @@
+import random
+import pygame as pg
+
+SPRITE_GROUPS_ATTR = '_Sprite__g'  # внутренний словарь групп pg.sprite.Sprite
+
+
+def set_state(obj, state: dict) -> None:
+    """
+    Возвращает объекту запомненные атрибуты и убирает появившиеся после снимка.
+    :param obj: Объект
+    :param state: Атрибуты из снимка
+    :returns: None
+    """
+
+    attrs = vars(obj)
+    for name in [name for name in attrs if name not in state and name != SPRITE_GROUPS_ATTR]:
+        del attrs[name]
+    attrs.update(copy_value(state))
+
+
+def copy_value(value):
+    """
+    Копия значения атрибута для снимка: контейнеры и Rect копируются,
+    всё остальное (картинки, маски, строки, спрайты) хранится по ссылке.
+    :param value: Значение атрибута
+    :returns: Копия, которую можно безопасно изменять
+    """
+
+    if isinstance(value, list):
+        return [copy_value(item) for item in value]
+    if isinstance(value, dict):
+        return {key: copy_value(item) for key, item in value.items()}
+    if isinstance(value, set):
+        return set(value)
+    if isinstance(value, pg.Rect):
+        return value.copy()
+    return value
+
+
+class LevelSnapshot:
+    """
+    Снимок начального состояния уровня (после расстановки всех объектов).
+    Перезапуск уровня возвращает спрайты в снимок на месте: без чтения карты,
+    json и картинок
+
+    Атрибуты
+    ------
+    groups : list
+        Группы спрайтов уровня
+    objects : dict
+        Имя -> объект, не являющийся спрайтом, состояние которого тоже нужно вернуть
+    sprites : list
+        Тройки (спрайт, состояние, группы спрайта)
+    states : dict
+        Объект внутри снимка (например, инвентарь игрока) -> его состояние
+    rng_state : tuple
+        Состояние random после расстановки объектов
+
+    Методы
+    ------
+    capture() :
+        Запоминает текущее состояние
+    restore() :
+        Возвращает уровень в запомненное состояние
+    """
+
+    def __init__(self, groups: list[pg.sprite.Group], **objects) -> None:
+        self.groups = groups
+        self.objects = objects
+        self.sprites = []
+        self.states = dict()
+        self.rng_state = None
+
+    def get_state(self, obj) -> dict:
+        state = dict()
+        for name, value in vars(obj).items():
+            if name == SPRITE_GROUPS_ATTR:
+                continue
+            if hasattr(value, '__dict__') and not isinstance(value, pg.sprite.Sprite):
+                # Вложенный объект (инвентарь) возвращается на месте, а не заменяется копией
+                self.states[value] = self.get_state(value)
+            state[name] = copy_value(value)
+        return state
+
+    def capture(self) -> None:
+        self.sprites.clear()
+        self.states.clear()
+        seen = set()
+        for group in self.groups:
+            for sprite in group:
+                if sprite not in seen:
+                    seen.add(sprite)
+                    groups = [g for g in self.groups if sprite in g]
+                    self.sprites.append((sprite, self.get_state(sprite), groups))
+        for obj in self.objects.values():
+            self.states[obj] = self.get_state(obj)
+        self.rng_state = random.getstate()
+
+    def restore(self) -> None:
+        # Спрайты, появившиеся после снимка (указатели, дроп), просто пропадают вместе с группами
+        for group in self.groups:
+            group.empty()
+        for obj, state in self.states.items():
+            set_state(obj, state)
+        for sprite, state, groups in self.sprites:
+            set_state(sprite, state)
+            sprite.add(*groups)
+        random.setstate(self.rng_state)
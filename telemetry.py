@@ -0,0 +1,169 @@
+"""
+Журнал забегов: по одной записи JSONL на каждый запуск уровня (счёт, время кадров, загрузка).
+Сводка по уровням: python telemetry.py [журнал ...]
+"""
+
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from constants import *
+
+PERCENTILES = (50, 90, 99)
+# Поле записи -> подпись в сводке
+SUMMARY_FIELDS = {'score': 'score', 'play_time': 'play time, s', 'avg_frame_ms': 'avg frame, ms',
+                  'worst_frame_ms': 'worst frame, ms', 'load_ms': 'load, ms'}
+
+
+class RunRecorder:
+    """
+    Собирает показатели одного забега по уровню и дописывает их в журнал при его окончании
+
+    Атрибуты
+    ------
+    path : str
+        Путь к журналу
+    record : dict | None
+        Запись текущего забега (None, если уровень не запущен)
+    frames : int
+        Количество кадров забега
+    frame_total : float
+        Суммарное время кадров в секундах (без ожидания clock.tick)
+    frame_worst : float
+        Самый долгий кадр в секундах
+    start_time : float
+        Время начала забега по perf_counter
+
+    Методы
+    ------
+    start() :
+        Начинает запись забега
+    frame() :
+        Учитывает время одного кадра
+    end() :
+        Заканчивает забег и дописывает запись в журнал
+    """
+
+    def __init__(self, path: str = TELEMETRY_LOG) -> None:
+        self.path = path
+        self.record = None
+        self.frames = 0
+        self.frame_total = 0.0
+        self.frame_worst = 0.0
+        self.start_time = 0.0
+
+    def start(self, level: str, seed: int, load_time: float, restart: bool = False) -> None:
+        """
+        :param level: Уровень
+        :param seed: Зерно random, с которым расставлены объекты уровня
+        :param load_time: Время загрузки уровня (или восстановления снимка) в секундах
+        :param restart: Уровень перезапущен из снимка
+        """
+
+        if self.record is not None:
+            self.end('abandoned')
+        self.record = {'date': datetime.now().isoformat(timespec='seconds'), 'level': level, 'seed': seed,
+                       'restart': restart, 'load_ms': round(load_time * 1000, 2)}
+        self.frames = 0
+        self.frame_total = self.frame_worst = 0.0
+        self.start_time = time.perf_counter()
+
+    def frame(self, duration: float) -> None:
+        self.frames += 1
+        self.frame_total += duration
+        self.frame_worst = max(self.frame_worst, duration)
+
+    def end(self, outcome: str, **fields) -> None:
+        """
+        :param outcome: Чем закончился забег: finished, died, abandoned или quit
+        :param fields: Показатели счёта (убито, монеты, потеряно здоровья, время игры, предметы, счёт)
+        """
+
+        if self.record is None:
+            return
+        record, self.record = self.record, None
+        record.update(outcome=outcome, duration=round(time.perf_counter() - self.start_time, 3), frames=self.frames,
+                      avg_frame_ms=round(self.frame_total / max(self.frames, 1) * 1000, 3),
+                      worst_frame_ms=round(self.frame_worst * 1000, 3), **fields)
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'a', encoding='utf8') as log:
+                log.write(json.dumps(record) + '\n')
+        except OSError:
+            # Журнал не должен мешать игре (например, папка только для чтения)
+            pass
+
+
+def read_log(path: str) -> list[dict]:
+    """
+    Чтение журнала. Повреждённые строки (например, оборванная последняя) пропускаются.
+    :param path: Путь к журналу
+    :returns: Список записей
+    """
+
+    records = []
+    with open(path, 'r', encoding='utf8') as log:
+        for line in log:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records
+
+
+def percentile(values: list[float], p: int) -> float:
+    """
+    Процентиль методом ближайшего ранга.
+    :param values: Отсортированные значения
+    :param p: Процент
+    :returns: Значение процентиля
+    """
+
+    rank = max(1, -(-p * len(values) // 100))
+    return values[rank - 1]
+
+
+def summarize(records: list[dict]) -> dict:
+    """
+    Сводка по уровням.
+    :param records: Записи журнала
+    :returns: Уровень -> {'runs', 'outcomes', поле -> {процентиль -> значение}}
+    """
+
+    summary = dict()
+    for record in records:
+        level = summary.setdefault(record['level'], {'runs': 0, 'outcomes': dict(), 'values': dict()})
+        level['runs'] += 1
+        level['outcomes'][record['outcome']] = level['outcomes'].get(record['outcome'], 0) + 1
+        for field in SUMMARY_FIELDS:
+            if record.get(field) is not None:
+                level['values'].setdefault(field, []).append(record[field])
+    for level in summary.values():
+        values = level.pop('values')
+        for field, items in values.items():
+            items.sort()
+            level[field] = {p: percentile(items, p) for p in PERCENTILES}
+    return summary
+
+
+def print_summary(summary: dict) -> None:
+    header = ''.join(f'{"p" + str(p):>10}' for p in PERCENTILES)
+    for name in sorted(summary):
+        level = summary[name]
+        outcomes = ', '.join(f'{outcome} {count}' for outcome, count in sorted(level['outcomes'].items()))
+        print(f'{name}: {level["runs"]} runs ({outcomes})')
+        print(f'    {"":<16}{header}')
+        for field, title in SUMMARY_FIELDS.items():
+            if field in level:
+                print(f'    {title:<16}' + ''.join(f'{level[field][p]:>10.2f}' for p in PERCENTILES))
+
+
+if __name__ == '__main__':
+    paths = sys.argv[1:] or [TELEMETRY_LOG]
+    all_records = []
+    for log_path in paths:
+        all_records.extend(read_log(log_path))
+    if not all_records:
+        print('no runs recorded')
+    print_summary(summarize(all_records))
@@ -0,0 +1,98 @@
+"""
+Прямая видимость на сетке карты. Для клетки один раз считается множество видимых из неё клеток
+в радиусе обзора, дальше проверка "видит ли монстр игрока" - поиск в множестве
+"""
+
+SIGHT_RADIUS = 7  # в клетках: покрывает обзор монстров (100 px) по каждой оси
+
+
+def line_of_sight(walkable: list[list[bool]], start: tuple[int, int], end: tuple[int, int]) -> bool:
+    """
+    Проходит отрезок между центрами клеток по всем клеткам, которые он задевает.
+    Сквозь угол между двумя клетками отрезок проходит, только если обе они свободны.
+    Сами start и end видимость не закрывают.
+    :param walkable: Сетка проходимости
+    :param start: Клетка, откуда смотрят
+    :param end: Клетка, куда смотрят
+    :returns: Видна ли end из start
+    """
+
+    x, y = start
+    dx, dy = end[0] - x, end[1] - y
+    nx, ny = abs(dx), abs(dy)
+    sx, sy = (1 if dx > 0 else -1), (1 if dy > 0 else -1)
+    ix = iy = 0
+    while ix < nx or iy < ny:
+        decision = (1 + 2 * ix) * ny - (1 + 2 * iy) * nx
+        if decision == 0:
+            if not (walkable[y][x + sx] and walkable[y + sy][x]):
+                return False
+            x, y = x + sx, y + sy
+            ix, iy = ix + 1, iy + 1
+        elif decision < 0:
+            x += sx
+            ix += 1
+        else:
+            y += sy
+            iy += 1
+        if (x, y) != end and not walkable[y][x]:
+            return False
+    return True
+
+
+class VisibilityMap:
+    """
+    Видимые клетки для каждой клетки карты (считаются при первом запросе и запоминаются)
+
+    Атрибуты
+    ------
+    walkable : list
+        Сетка проходимости
+    radius : int
+        Радиус обзора в клетках (квадрат, как у прежней проверки расстояния)
+    visible : dict
+        Клетка -> множество видимых из неё клеток
+
+    Методы
+    ------
+    visible_from() :
+        Множество клеток, видимых из клетки
+    sees() :
+        Видна ли одна клетка из другой
+    precompute() :
+        Считает видимость сразу для всех свободных клеток
+    invalidate() :
+        Забывает видимость клеток, на которую могли повлиять изменённые клетки
+    """
+
+    def __init__(self, walkable: list[list[bool]], radius: int = SIGHT_RADIUS) -> None:
+        self.walkable = walkable
+        self.radius = radius
+        self.visible = dict()
+
+    def visible_from(self, cell: tuple[int, int]) -> frozenset:
+        cells = self.visible.get(cell)
+        if cells is None:
+            height, width = len(self.walkable), len(self.walkable[0])
+            x, y = cell
+            cells = self.visible[cell] = frozenset(
+                (tx, ty) for ty in range(max(y - self.radius, 0), min(y + self.radius + 1, height))
+                for tx in range(max(x - self.radius, 0), min(x + self.radius + 1, width))
+                if line_of_sight(self.walkable, cell, (tx, ty)))
+        return cells
+
+    def sees(self, start: tuple[int, int], end: tuple[int, int]) -> bool:
+        if abs(start[0] - end[0]) > self.radius or abs(start[1] - end[1]) > self.radius:
+            return False
+        return end in self.visible_from(start)
+
+    def precompute(self) -> None:
+        for y, row in enumerate(self.walkable):
+            for x, free in enumerate(row):
+                if free:
+                    self.visible_from((x, y))
+
+    def invalidate(self, cells: list[tuple[int, int]]) -> None:
+        # Изменённая клетка влияет только на клетки, в квадрат обзора которых она попадает
+        self.visible = {cell: seen for cell, seen in self.visible.items()
+                        if all(abs(cell[0] - x) > self.radius or abs(cell[1] - y) > self.radius for x, y in cells)}